@@ -11,7 +11,8 @@ def searchMenu(menu):
     if len(item) > 0:
         item = item[0].upper() + item[1:]
         print(f"Results for: {item}\n")
-        menu.search(name=item)
+        for result in menu.search(name=item):
+            print(f"{result.name}\t{result.code}\t{result.price}")
         print()
     else:
         print("No Results")
@@ -0,0 +1,31 @@
+from pytest import fixture, importorskip
+
+importorskip('pytest_benchmark')
+
+from pizzapy.instrumentation import MetricsExporter, add_hook, remove_hook
+from pizzapy.urls import Urls
+from pizzapy.utils import request_json
+
+
+class CachedTransport:
+    """Answers every GET from memory, so only the code around the request is timed."""
+
+    def get_json(self, url, conditional=False, parse=None, event=None):
+        return {}
+
+
+@fixture
+def metrics():
+    hook = add_hook(MetricsExporter())
+    yield hook
+    remove_hook(hook)
+
+
+def bench_request_json_no_hooks(benchmark):
+    transport = CachedTransport()
+    benchmark(request_json, Urls('us').info_url(), transport=transport, store_id='4336')
+
+
+def bench_request_json_metrics(benchmark, metrics):
+    transport = CachedTransport()
+    benchmark(request_json, Urls('us').info_url(), transport=transport, store_id='4336')
@@ -0,0 +1,71 @@
+import io
+import json
+
+from pytest import importorskip
+
+importorskip('pytest_benchmark')
+
+from pizzapy.menu import MENU_SECTIONS, Menu
+from pizzapy.search import MenuIndex
+
+
+def bench_menu_init(benchmark, scaled_menu):
+    benchmark(Menu, scaled_menu)
+
+
+def bench_menu_init_lazy(benchmark, scaled_menu):
+    benchmark(Menu, scaled_menu, lazy=True)
+
+
+def bench_menu_decode(benchmark, scaled_menu):
+    body = json.dumps(scaled_menu).encode()
+    benchmark(lambda: Menu(json.loads(body), lazy=True))
+
+
+def bench_menu_from_stream(benchmark, scaled_menu):
+    body = json.dumps(scaled_menu).encode()
+    benchmark(lambda: Menu.from_stream(io.BytesIO(body), lazy=True, keep=MENU_SECTIONS))
+
+
+def bench_menu_from_snapshot(benchmark, scaled_menu, tmp_path):
+    path = str(tmp_path / 'menu.snapshot')
+    Menu(scaled_menu).export_snapshot(path)
+
+    def load():
+        menu = Menu.from_snapshot(path)
+        return menu.variants['P12IPAZA']
+
+    benchmark(load)
+
+
+def bench_menu_build_categories(benchmark, scaled_menu):
+    # build_categories appends to the items it links, so each round gets a
+    # fresh Menu whose items are parsed but not yet categorized.
+    def setup():
+        menu = Menu(scaled_menu, lazy=True)
+        for section in ('Products', 'Coupons', 'PreconfiguredProducts'):
+            menu.parse_items(scaled_menu.get(section, {}))
+        return (menu,), {}
+
+    def build(menu):
+        for category in scaled_menu['Categorization'].values():
+            menu.build_categories(category)
+
+    benchmark.pedantic(build, setup=setup, rounds=20)
+
+
+def bench_menu_search_index(benchmark, scaled_menu):
+    benchmark(MenuIndex, scaled_menu['Variants'], scaled_menu['Products'])
+
+
+def bench_menu_search(benchmark, scaled_menu):
+    menu = Menu(scaled_menu, lazy=True)
+    menu.index
+
+    def search():
+        menu.search('pizza')
+        menu.search('coke', max_price=3)
+        menu.search(product_type='Wings', size='8PCW')
+        menu.search(code='P12IPAZA')
+
+    benchmark(search)
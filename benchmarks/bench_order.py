@@ -0,0 +1,56 @@
+from pytest import fixture, importorskip
+
+importorskip('pytest_benchmark')
+
+from pizzapy.menu import Menu
+from pizzapy.transport import Transport
+from pizzapy.urls import register_country
+
+from benchmarks.conftest import menu_data
+from tests.conftest import new_order
+from tests.stub_server import StubServer
+
+
+CODES = ['P12IPAZA', 'P14IREPV', 'MARINARA', '20BCOKE', '2LCOKE', 'B8PCSCB', 'W08PHOTW', 'PSANSAPH']
+
+
+@fixture
+def menu():
+    return Menu(menu_data(1), lazy=True)
+
+
+def bench_order_add_remove_items(benchmark, menu):
+    order = new_order(menu)
+
+    def add_remove():
+        for code in CODES:
+            order.add_item(code)
+        for code in CODES:
+            order.remove_item(code)
+
+    benchmark(add_remove)
+
+
+def bench_order_validate(benchmark, menu):
+    routes = {'/power/validate-order': (200, {}, {'Status': 1, 'Order': {'Status': 1}})}
+    with StubServer(routes) as stub, Transport() as transport:
+        register_country('bench', stub.url)
+        order = new_order(menu, 'bench', transport)
+        for code in CODES:
+            order.add_item(code)
+
+        def validate():
+            order.responses.clear()
+            order.validate()
+
+        benchmark(validate)
+
+
+def bench_order_validate_unchanged(benchmark, menu):
+    routes = {'/power/validate-order': (200, {}, {'Status': 1, 'Order': {'Status': 1}})}
+    with StubServer(routes) as stub, Transport() as transport:
+        register_country('bench', stub.url)
+        order = new_order(menu, 'bench', transport)
+        for code in CODES:
+            order.add_item(code)
+        benchmark(order.validate)
@@ -0,0 +1,53 @@
+import random
+
+from pytest import importorskip
+
+importorskip('pytest_benchmark')
+
+from pizzapy.address import Address
+from pizzapy.cache import get_locator_cache
+from pizzapy.directory import StoreDirectory
+from pizzapy.store import StoreLocator
+
+
+def bench_store_locator_nearby_stores(benchmark, scaled_stores):
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408')
+    get_locator_cache().set(address.locator_key('Delivery'), scaled_stores, ttl=float('inf'))
+    benchmark(StoreLocator.nearby_stores, address)
+
+
+def bench_address_nearby_stores(benchmark, scaled_stores):
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408')
+    get_locator_cache().set(address.locator_key('Carryout'), scaled_stores, ttl=float('inf'))
+    benchmark(address.nearby_stores, 'Carryout')
+
+
+def bench_address_nearby_stores_all(benchmark, scaled_stores):
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408')
+    get_locator_cache().set(address.locator_key('Carryout'), scaled_stores, ttl=float('inf'))
+    benchmark(lambda: list(address.nearby_stores('Carryout')))
+
+
+def bench_address_closest_store(benchmark, scaled_stores):
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408')
+    get_locator_cache().set(address.locator_key('Carryout'), scaled_stores, ttl=float('inf'))
+    benchmark(address.closest_store, 'Carryout')
+
+
+def _directory(n):
+    rng = random.Random(n)
+    return StoreDirectory({'StoreID': str(i), 'StoreCoordinates': {'StoreLatitude': rng.uniform(25, 49),
+                                                                   'StoreLongitude': rng.uniform(-124, -67)}}
+                          for i in range(n))
+
+
+def bench_store_directory_nearest(benchmark):
+    directory = _directory(10000)
+    directory.nearest(38.9, -77.03)
+    benchmark(directory.nearest, 38.9, -77.03, 5)
+
+
+def bench_store_directory_within(benchmark):
+    directory = _directory(10000)
+    directory.nearest(38.9, -77.03)
+    benchmark(directory.within, 38.9, -77.03, 25)
@@ -0,0 +1,35 @@
+from pytest import fixture, importorskip
+
+importorskip('pytest_benchmark')
+
+import xmltodict
+
+from pizzapy.track import parse_order_statuses
+
+from benchmarks.conftest import SCALES
+from tests.conftest import fixture_bytes
+
+
+def tracker_xml(scale):
+    """The tracker fixture with its OrderStatus records repeated to make scale * 2 of them."""
+    body = fixture_bytes('tracker.xml')
+    start = body.index(b'<OrderStatus>')
+    end = body.rindex(b'</OrderStatuses>')
+    return body[:start] + body[start:end] * scale + body[end:]
+
+
+@fixture(params=SCALES, ids=['x{}'.format(s) for s in SCALES])
+def scaled_tracker(request):
+    return tracker_xml(request.param)
+
+
+def bench_track_xmltodict(benchmark, scaled_tracker):
+    def parse():
+        data = xmltodict.parse(scaled_tracker.decode())
+        return data['soap:Envelope']['soap:Body']['GetTrackerDataResponse']['OrderStatuses']['OrderStatus']
+
+    benchmark(parse)
+
+
+def bench_track_order_statuses(benchmark, scaled_tracker):
+    benchmark(parse_order_statuses, scaled_tracker)
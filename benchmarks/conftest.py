@@ -0,0 +1,43 @@
+from pytest import fixture
+
+from benchmarks.synthetic import scale_menu, scale_stores
+from pizzapy.cache import set_locator_cache, set_menu_cache
+from tests.conftest import load_fixture
+
+
+SCALES = (1, 10, 100)
+
+
+_menus = {}
+_stores = {}
+
+
+def menu_data(scale):
+    if scale not in _menus:
+        _menus[scale] = scale_menu(load_fixture('menu.json'), scale)
+    return _menus[scale]
+
+
+def stores_data(scale):
+    if scale not in _stores:
+        _stores[scale] = scale_stores(load_fixture('stores.json'), scale)
+    return _stores[scale]
+
+
+@fixture(params=SCALES, ids=['x{}'.format(s) for s in SCALES])
+def scaled_menu(request):
+    return menu_data(request.param)
+
+
+@fixture(params=SCALES, ids=['x{}'.format(s) for s in SCALES])
+def scaled_stores(request):
+    return stores_data(request.param)
+
+
+@fixture(autouse=True)
+def fresh_caches():
+    set_menu_cache(None)
+    set_locator_cache(None)
+    yield
+    set_menu_cache(None)
+    set_locator_cache(None)
@@ -0,0 +1,69 @@
+"""Measure how much memory a parsed, cached menu costs.
+
+Run from the repository root:
+
+    python benchmarks/menu_memory.py
+
+This builds a Menu from tests/fixtures/menu.json, parses its items and
+category tree, and reports the bytes allocated for that on top of the
+decoded JSON. It also builds Stores from tests/fixtures/stores.json and
+reports what they keep alive once the locator response is dropped.
+
+Each is measured with keep_raw=True (which keeps the raw dicts, as every
+MenuItem and Store used to) and without it, and the bytes saved are shown.
+The menu's raw dicts stay alive in the decoded response either way, so
+for the menu that difference is only the references.
+"""
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pizzapy.menu import Menu  # noqa: E402
+from pizzapy.store import Store  # noqa: E402
+from tests.conftest import fixture_bytes, load_fixture  # noqa: E402
+
+
+def measure(build):
+    build()  # warm up, so one-off caches aren't counted
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def report(name, before, after, count, unit):
+    print('{:<7} keep_raw {:>9,} bytes, default {:>9,} bytes, saved {:>9,} bytes ({:.0%}, {:,.0f} per {})'.format(
+        name + ':', before, after, before - after, (before - after) / before, (before - after) / count, unit))
+
+
+def main():
+    menu_data = load_fixture('menu.json')
+
+    def parse(keep_raw):
+        menu = Menu(menu_data, keep_raw=keep_raw)
+        menu.root_categories
+        return menu
+
+    raw = fixture_bytes('stores.json')
+
+    def locate(keep_raw):
+        # The locator response is decoded here and dropped on return, so
+        # only what the Stores keep is counted.
+        return [Store(x, keep_raw=keep_raw) for x in json.loads(raw)['Stores']]
+
+    _, menu_before = measure(lambda: parse(True))
+    menu, menu_after = measure(lambda: parse(False))
+    _, stores_before = measure(lambda: locate(True))
+    stores, stores_after = measure(lambda: locate(False))
+
+    report('menu', menu_before, menu_after, menu.get_item_count(), 'item')
+    report('stores', stores_before, stores_after, len(stores), 'store')
+
+
+if __name__ == '__main__':
+    main()
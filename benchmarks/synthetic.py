@@ -0,0 +1,52 @@
+"""Build larger menus and locator responses from the test fixtures."""
+import copy
+from typing import Any, Dict
+
+
+ITEM_SECTIONS = ('Variants', 'Products', 'Coupons', 'PreconfiguredProducts')
+
+
+def scale_menu(data: Dict[str, Any], factor: int) -> Dict[str, Any]:
+    """Return a copy of a menu response with every item repeated factor times.
+
+    Copies get their code suffixed with _<n>, products list their copied
+    variants, and every category lists the copied products, so the
+    category tree keeps its shape but holds factor times as many items.
+    """
+    scaled = copy.deepcopy(data)
+    if factor <= 1:
+        return scaled
+    for section in ITEM_SECTIONS:
+        items = scaled[section]
+        for code, item in list(items.items()):
+            for n in range(1, factor):
+                clone = copy.deepcopy(item)
+                clone['Code'] = '{}_{}'.format(code, n)
+                if section == 'Variants':
+                    clone['ProductCode'] = '{}_{}'.format(item.get('ProductCode', ''), n)
+                elif section == 'Products':
+                    clone['Variants'] = ['{}_{}'.format(v, n) for v in item.get('Variants', [])]
+                items[clone['Code']] = clone
+
+    def scale_category(category: Dict[str, Any]) -> None:
+        category['Products'] = [
+            '{}_{}'.format(code, n) if n else code for n in range(factor) for code in category['Products']
+        ]
+        for subcategory in category['Categories']:
+            scale_category(subcategory)
+
+    for category in scaled['Categorization'].values():
+        scale_category(category)
+    return scaled
+
+
+def scale_stores(data: Dict[str, Any], factor: int) -> Dict[str, Any]:
+    """Return a copy of a store-locator response with factor times as many stores."""
+    scaled = copy.deepcopy(data)
+    stores = scaled['Stores']
+    for n in range(1, factor):
+        for store in data['Stores']:
+            clone = copy.deepcopy(store)
+            clone['StoreID'] = '{}{:03d}'.format(store['StoreID'], n)
+            stores.append(clone)
+    return scaled
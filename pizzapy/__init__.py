@@ -1,11 +1,18 @@
 from .address import Address
+from .bulk import BulkPlacer
+from .cache import MenuCache, TTLCache, get_locator_cache, get_menu_cache, set_locator_cache, set_menu_cache
 from .coupon import Coupon
 from .customer import Customer
+from .directory import StoreDirectory
+from .instrumentation import Callbacks, Hook, MetricsExporter, RequestEvent, add_hook, remove_hook
 from .menu import Menu
 from .order import Order
 from .payment import CreditCard
+from .pipeline import OrderPipeline
 from .store import Store, StoreLocator
 from .track import track_by_order, track_by_phone
+from .transport import Transport, get_transport, set_transport
+from .urls import Urls, register_country
 from .utils import request_json, request_xml
 from .console import ConsoleInput
 
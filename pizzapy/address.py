@@ -1,8 +1,34 @@
-from typing import List, Union, Dict
-from .store import Store
+import re
+from typing import Any, Optional, Tuple, Union, Dict
+from .cache import get_locator_cache
+from .store import Store, StoreList, is_available
+from .transport import Transport
 from .utils import request_json
 from .urls import Urls, COUNTRY_USA
 
+ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'parkway': 'pkwy', 'highway': 'hwy', 'terrace': 'ter',
+    'circle': 'cir', 'square': 'sq', 'trail': 'trl', 'way': 'wy', 'expressway': 'expy', 'freeway': 'fwy',
+    'suite': 'ste', 'apartment': 'apt', 'building': 'bldg', 'floor': 'fl',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+}
+ZIP_PLUS_FOUR = re.compile(r'\b(\d{5})-\d{4}\b')
+WORD = re.compile(r'[\w#-]+')
+
+
+def normalize_address_line(line: str) -> str:
+    """Normalize one line of an address, for comparing and caching.
+
+    Lowercases the line, collapses whitespace and punctuation, abbreviates
+    street suffixes and directions, and trims ZIP+4 codes to five digits,
+    so '700 Pennsylvania Avenue N.W.' and '700  pennsylvania ave nw' match.
+    """
+    line = ZIP_PLUS_FOUR.sub(r'\1', line.lower().replace('.', ''))
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in WORD.findall(line))
+
+
 class Address:
     """Create an address, for finding stores and placing orders.
 
@@ -17,15 +43,20 @@ class Address:
         zip (str): North American ZIP code
         urls (Urls): Country-specific URLs
         country (str): Country
+        transport (Transport): Transport for API calls, or None for the shared default
+        coordinates (tuple): (latitude, longitude), if known, for StoreDirectory lookups
     """
 
-    def __init__(self, street: str, city: str, region: str = '', zip: Union[str, int] = '', country: str = COUNTRY_USA) -> None:
+    def __init__(self, street: str, city: str, region: str = '', zip: Union[str, int] = '', country: str = COUNTRY_USA,
+                 transport: Optional[Transport] = None, coordinates: Optional[Tuple[float, float]] = None) -> None:
         self.street: str = street.strip()
         self.city: str = city.strip()
         self.region: str = region.strip()
         self.zip: str = str(zip).strip()
         self.urls: Urls = Urls(country)
         self.country: str = country
+        self.transport: Optional[Transport] = transport
+        self.coordinates: Optional[Tuple[float, float]] = coordinates
 
     def __repr__(self) -> str:
         return ", ".join([self.street, self.city, self.region, self.zip])
@@ -43,19 +74,36 @@ class Address:
     def line2(self) -> str:
         return '{City}, {Region}, {PostalCode}'.format(**self.data)
 
-    def nearby_stores(self, service: str = 'Delivery') -> List[Store]:
+    def locator_key(self, service: str = 'Delivery') -> Tuple[str, str, str, str]:
+        """The key this address's store-locator results are cached under."""
+        return (self.country, normalize_address_line(self.line1), normalize_address_line(self.line2), service)
+
+    def nearby_stores(self, service: str = 'Delivery') -> StoreList:
         """Query the API to find nearby stores.
 
         nearby_stores will filter the information we receive from the API
         to exclude stores that are not currently online (!['IsOnlineNow']),
         and stores that are not currently in service (!['ServiceIsOpen']).
+
+        Store-locator responses are cached briefly (see
+        pizzapy.cache.get_locator_cache), keyed by the normalized address.
+        The stores come back as a lazy StoreList, which only filters and
+        builds as many stores as are used.
         """
-        data = request_json(self.urls.find_url(), line1=self.line1, line2=self.line2, type=service)
-        return [Store(x, self.country) for x in data['Stores']
-                if x['IsDeliveryStore'] and x['IsOnlineNow'] and x['ServiceIsOpen'][service]] \
-            if service == 'Delivery' else \
-            [Store(x, self.country) for x in data['Stores']
-             if x['IsOnlineNow'] and x['ServiceIsOpen'][service]]
+        return self._stores_from(self._locate(service), service)
+
+    def _locate(self, service: str) -> Dict[str, Any]:
+        cache = get_locator_cache()
+        key = self.locator_key(service)
+        data = cache.get(key)
+        if data is None:
+            data = request_json(self.urls.find_url(), transport=self.transport, line1=self.line1, line2=self.line2,
+                                type=service)
+            cache.set(key, data)
+        return data
+
+    def _stores_from(self, data: Dict[str, Any], service: str) -> StoreList:
+        return StoreList(data['Stores'], is_available(service, delivery_store=True), self.country, self.transport)
 
     def closest_store(self, service: str = 'Delivery') -> Store:
         stores = self.nearby_stores(service=service)
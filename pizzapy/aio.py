@@ -0,0 +1,230 @@
+"""Asyncio versions of the blocking API calls.
+
+The AsyncClient mirrors Address.nearby_stores, Store.get_menu,
+Store.get_details, Order.validate/pay_with/place and the track functions,
+but awaits the network instead of blocking a thread on it. Responses are
+parsed by the same code the sync classes use, so an order priced through
+the AsyncClient ends up in exactly the same state as one priced with
+Order.pay_with.
+
+This module needs aiohttp (pip install pizzapy[async]).
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    import aiohttp
+except ImportError as e:  # pragma: no cover
+    raise ImportError('pizzapy.aio requires aiohttp: pip install pizzapy[async]') from e
+import xmltodict
+
+from .address import Address
+from .cache import get_locator_cache, get_menu_cache
+from .codec import JsonCodec, default_codec
+from .customer import Customer
+from .instrumentation import RequestEvent, observe_async, start
+from .menu import Menu
+from .order import Order
+from .payment import CreditCard
+from .singleflight import AsyncSingleFlight
+from .store import Store, StoreList
+from .track import OrderStatus, parse_order_statuses
+from .urls import Urls, COUNTRY_USA
+
+
+class AsyncClient:
+    """An asyncio client for the API.
+
+    One AsyncClient holds one pooled aiohttp session, so a single event
+    loop can drive thousands of concurrent lookups and orders over a
+    bounded set of keep-alive connections. GETs are retried with
+    exponential backoff on connection errors and 5xx responses; POSTs are
+    never retried. Identical GETs made by concurrent tasks share one
+    request and its decoded response.
+
+    Use it as an async context manager, or call close() when done.
+
+    Attributes:
+        limit (int): Maximum number of open connections
+        limit_per_host (int): Maximum open connections per host (0 for no limit)
+        retries (int): How many times a GET is retried
+        backoff_factor (float): Base delay between retries, doubled each time
+        timeout (aiohttp.ClientTimeout): Timeout for every request
+        codec (JsonCodec): Decodes responses and encodes request bodies
+        flights (AsyncSingleFlight): Coalesces concurrent GETs, or None
+    """
+
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        retries: int = 3,
+        backoff_factor: float = 0.3,
+        timeout: float = 30,
+        codec: Optional[JsonCodec] = None,
+        single_flight: bool = True,
+    ) -> None:
+        self._session = session
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.codec = codec or default_codec
+        self.flights: Optional[AsyncSingleFlight] = AsyncSingleFlight() if single_flight else None
+
+    async def __aenter__(self) -> 'AsyncClient':
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    async def _get(self, url: str, event: Optional[RequestEvent] = None, **kwargs: Any) -> bytes:
+        formatted_url = url.format(**kwargs)
+        started = time.perf_counter() if event is not None else 0.0
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.get(formatted_url) as response:
+                    if response.status < 500 or attempt == self.retries:
+                        if event is None:
+                            response.raise_for_status()
+                            return await response.read()
+                        body = await response.read()
+                        event.responded(response.status, len(body), time.perf_counter() - started)
+                        response.raise_for_status()
+                        return body
+            except aiohttp.ClientConnectionError:
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+        raise AssertionError('unreachable')
+
+    async def _coalesce(self, key: Any, fn: Callable[[], Awaitable[Any]],
+                        event: Optional[RequestEvent] = None) -> Any:
+        call = fn() if self.flights is None else self.flights.do(key, fn)
+        return await (call if event is None else observe_async(event, call))
+
+    async def _fetch(self, url: str, decode: Callable[[bytes], Any], event: Optional[RequestEvent]) -> Any:
+        body = await self._get(url, event)
+        if event is None:
+            return decode(body)
+        received = time.perf_counter()
+        value = decode(body)
+        event.parse_time = time.perf_counter() - received
+        return value
+
+    async def request_json(self, url: str, **kwargs: Any) -> Dict[str, Any]:
+        """Awaitable version of pizzapy.utils.request_json."""
+        formatted_url = url.format(**kwargs)
+        event = start('GET', url, formatted_url)
+        data: Dict[str, Any] = await self._coalesce(
+            ('json', formatted_url), lambda: self._fetch(formatted_url, self.codec.loads, event), event)
+        return data
+
+    async def request_xml(self, url: str, **kwargs: Any) -> Dict[str, Any]:
+        """Awaitable version of pizzapy.utils.request_xml."""
+        formatted_url = url.format(**kwargs)
+        event = start('GET', url, formatted_url)
+        data: Dict[str, Any] = await self._coalesce(
+            ('xml', formatted_url), lambda: self._fetch(formatted_url, xmltodict.parse, event), event)
+        return data
+
+    async def _post(self, order: Order, url: str, event: Optional[RequestEvent]) -> Dict[str, Any]:
+        body = self.codec.dumps(order._payload())
+        started = time.perf_counter() if event is not None else 0.0
+        async with self.session.post(url, headers=order.headers, data=body) as response:
+            if event is None:
+                response.raise_for_status()
+                json_data: Dict[str, Any] = self.codec.loads(await response.read())
+                return json_data
+            content = await response.read()
+            received = time.perf_counter()
+            event.responded(response.status, len(content), received - started)
+            response.raise_for_status()
+        json_data = self.codec.loads(content)
+        event.parse_time = time.perf_counter() - received
+        return json_data
+
+    async def _send(self, order: Order, url: str, merge: bool, memoize: bool = False) -> Dict[str, Any]:
+        key, json_data = order._recall(url) if memoize else (None, None)
+        if json_data is None:
+            event = start('POST', url)
+            posting = self._post(order, url, event)
+            json_data = await (posting if event is None else observe_async(event, posting))
+            if memoize:
+                order._remember(key, json_data)
+        return order._merge(json_data, merge)
+
+    async def nearby_stores(self, address: Address, service: str = 'Delivery') -> StoreList:
+        cache = get_locator_cache()
+        key = address.locator_key(service)
+        data = cache.get(key)
+        if data is None:
+            data = await self.request_json(address.urls.find_url(), line1=address.line1, line2=address.line2,
+                                           type=service)
+            cache.set(key, data)
+        return address._stores_from(data, service)
+
+    async def closest_store(self, address: Address, service: str = 'Delivery') -> Store:
+        stores = await self.nearby_stores(address, service=service)
+        if not stores:
+            raise Exception('No local stores are currently open')
+        return stores[0]
+
+    async def get_details(self, store: Store) -> Dict[str, Any]:
+        return await self.request_json(store.urls.info_url(), store_id=store.id)
+
+    async def get_menu(self, store: Store, lang: str = 'en', refresh: bool = False) -> Menu:
+        cache = get_menu_cache()
+        key = cache.key(store.id, lang, store.country)
+        menu = None if refresh else cache.get(key)
+        if menu is None:
+            response = None if refresh else cache.load_raw(key)
+            if response is None:
+                response = await self.request_json(store.urls.menu_url(), store_id=store.id, lang=lang)
+                cache.save_raw(key, response)
+            menu = Menu(response, store.country, lazy=True)
+            cache.set(key, menu)
+        return menu
+
+    async def begin_customer_order(self, customer: Customer, store: Store, country: str = COUNTRY_USA) -> Order:
+        """Create an Order, fetching the store's menu without blocking."""
+        menu = await self.get_menu(store)
+        return Order(store, customer, country=country, menu=menu)
+
+    async def validate(self, order: Order) -> bool:
+        response = await self._send(order, order.urls.validate_url(), True, memoize=True)
+        return bool(response['Status'] != -1)
+
+    async def pay_with(self, order: Order, card: Optional[CreditCard]) -> Dict[str, Any]:
+        response = await self._send(order, order.urls.price_url(), True, memoize=True)
+        order._apply_payment(response, card)
+        return response
+
+    async def place(self, order: Order, card: Optional[CreditCard]) -> Dict[str, Any]:
+        await self.pay_with(order, card)
+        return await self._send(order, order.urls.place_url(), False)
+
+    async def track_by_phone(self, phone: str, country: str = COUNTRY_USA) -> List[OrderStatus]:
+        template = Urls(country).track_by_phone()
+        url = template.format(phone=str(phone).strip())
+        event = start('GET', template, url)
+        statuses: List[OrderStatus] = await self._coalesce(
+            ('tracker', url), lambda: self._fetch(url, parse_order_statuses, event), event)
+        return statuses
+
+    async def track_by_order(self, store_id: str, order_key: str, country: str = COUNTRY_USA) -> Dict[str, Any]:
+        return await self.request_json(Urls(country).track_by_order(), store_id=store_id, order_key=order_key)
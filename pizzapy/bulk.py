@@ -0,0 +1,177 @@
+"""Placing many orders at once.
+
+BulkPlacer runs validate, price and place for each order on a thread
+pool. It caps how many orders are in flight overall and per store, rate
+limits each endpoint with a token bucket, and retries validate and price
+on connection errors and 5xx responses. Placing is never retried, so an
+order can't be placed twice.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, TypeVar, Union
+
+import requests
+
+from .order import Order
+from .payment import CreditCard
+
+T = TypeVar('T')
+
+STEPS = ('validate', 'price', 'place')
+
+
+class TokenBucket:
+    """A thread-safe token bucket: rate tokens a second, up to capacity.
+
+    acquire blocks until a token is free. The bucket starts full, so up
+    to capacity calls go through at once before the rate kicks in.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, rate) if capacity is None else capacity
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, waiting for one if needed. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class BulkResult(NamedTuple):
+    """How one order in a bulk run went.
+
+    step is the last step attempted: 'validate', 'price' or 'place'. An
+    order was placed if error is None; response is then the place-order
+    response. attempts counts requests made across all steps.
+    """
+    order: Order
+    step: str
+    response: Optional[Dict[str, Any]]
+    error: Optional[BaseException]
+    attempts: int
+    elapsed: float
+
+    @property
+    def placed(self) -> bool:
+        return self.error is None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed request is worth another try."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+class BulkPlacer:
+    """Validate, price and place many orders concurrently.
+
+    At most max_workers orders are in flight at once, and at most
+    per_store of them for any one store. rate_limits maps a step name
+    ('validate', 'price', 'place') to the requests per second allowed for
+    it across all orders. Validate and price are retried up to retries
+    times, backing off backoff_factor * 2 ** attempt seconds in between.
+
+    For example:
+
+        placer = BulkPlacer(max_workers=20, per_store=2, rate_limits={'place': 5})
+        for result in placer.place_all(orders, card=card):
+            print(result.order, result.step, result.error)
+    """
+
+    def __init__(self, max_workers: int = 10, per_store: int = 2, rate_limits: Optional[Mapping[str, float]] = None,
+                 retries: int = 3, backoff_factor: float = 0.5, sleep: Callable[[float], None] = time.sleep) -> None:
+        for step in rate_limits or {}:
+            if step not in STEPS:
+                raise ValueError('Unknown step {!r}, expected one of {}'.format(step, ', '.join(STEPS)))
+        self.max_workers = max_workers
+        self.per_store = per_store
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.buckets = {step: TokenBucket(rate, sleep=sleep) for step, rate in (rate_limits or {}).items()}
+        self._sleep = sleep
+
+    def _call(self, step: str, call: Callable[[], T], attempts: List[int]) -> T:
+        bucket = self.buckets.get(step)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            attempts[0] += 1
+            try:
+                return call()
+            except Exception as e:
+                if step == 'place' or attempt >= self.retries or not is_retryable(e):
+                    raise
+            self._sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+    def _run(self, order: Order, card: Optional[CreditCard]) -> BulkResult:
+        start = time.monotonic()
+        attempts = [0]
+        step = STEPS[0]
+        try:
+            if not self._call(step, order.validate, attempts):
+                raise Exception('order failed validation')
+            step = 'price'
+            self._call(step, lambda: order.pay_with(card), attempts)
+            step = 'place'
+            response = self._call(step, lambda: order._send(order.urls.place_url(), False), attempts)
+        except Exception as e:
+            return BulkResult(order, step, None, e, attempts[0], time.monotonic() - start)
+        return BulkResult(order, step, response, None, attempts[0], time.monotonic() - start)
+
+    def place_all(self, orders: Iterable[Union[Order, Tuple[Order, Optional[CreditCard]]]],
+                  card: Optional[CreditCard] = None) -> Iterator[BulkResult]:
+        """Place every order, yielding a BulkResult for each as it finishes.
+
+        orders holds Orders, paid for with card (cash if None), or
+        (order, card) pairs. Orders are started in the order given, except
+        that a store's orders wait while per_store of them are running.
+        """
+        queues: Dict[str, List[Tuple[Order, Optional[CreditCard]]]] = {}
+        for item in orders:
+            order, order_card = item if isinstance(item, tuple) else (item, card)
+            queues.setdefault(str(order.store.id), []).append((order, order_card))
+        for queue in queues.values():
+            queue.reverse()
+        running = dict.fromkeys(queues, 0)
+        futures: Dict['Future[BulkResult]', str] = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while queues or futures:
+                for store_id in list(queues):
+                    if len(futures) >= self.max_workers:
+                        break
+                    queue = queues[store_id]
+                    while queue and running[store_id] < self.per_store and len(futures) < self.max_workers:
+                        futures[executor.submit(self._run, *queue.pop())] = store_id
+                        running[store_id] += 1
+                    if not queue:
+                        del queues[store_id]
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running[futures.pop(future)] -= 1
+                    yield future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .menu import Menu
+
+
+V = TypeVar('V')
+
+MenuKey = Tuple[str, str, str]
+
+
+class TTLCache(Generic[V]):
+    """A thread-safe, size-bounded LRU cache whose entries expire.
+
+    Entries are evicted least-recently-used first once the cache holds
+    maxsize of them, and are dropped on lookup once they are older than
+    ttl seconds. A maxsize of 0 disables the cache.
+
+    Attributes:
+        maxsize (int): Maximum number of entries
+        ttl (float): Seconds an entry stays fresh
+        hits (int): Lookups that found a fresh entry
+        misses (int): Lookups that found nothing, or an expired entry
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, Tuple[float, V]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: Hashable) -> Optional[V]:
+        """The entry for key even if it has expired, without counting a lookup."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+class MenuCache(TTLCache['Menu']):
+    """Parsed menus keyed by (store_id, lang, country).
+
+    Menu.from_store, Store.get_menu and Order all look here before
+    downloading a menu. If a directory is given, the raw menu responses are
+    also written there, so a restarted worker can rebuild its menus without
+    going back to the API for disk_ttl seconds.
+
+    Attributes:
+        directory (str): Where raw menus are kept on disk, or None
+        disk_ttl (float): Seconds a menu on disk stays fresh
+        disk_hits (int): Memory misses served from disk
+    """
+
+    def __init__(self, maxsize: int = 64, ttl: float = 300.0, directory: Optional[str] = None,
+                 disk_ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__(maxsize, ttl, clock)
+        self.directory = directory
+        self.disk_ttl = ttl if disk_ttl is None else disk_ttl
+        self.disk_hits = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(store_id: str, lang: str, country: str) -> MenuKey:
+        return (str(store_id), lang, country)
+
+    def _path(self, key: MenuKey) -> str:
+        return os.path.join(self.directory or '', '{2}-{0}-{1}.json'.format(*key))
+
+    def load_raw(self, key: MenuKey) -> Optional[Dict[str, Any]]:
+        """Read a raw menu response from disk, if it's there and fresh."""
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.disk_ttl <= time.time():
+                return None
+            with open(path) as f:
+                data: Dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        return data
+
+    def save_raw(self, key: MenuKey, data: Dict[str, Any]) -> None:
+        """Write a raw menu response to disk, atomically."""
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp = '{}.{}.tmp'.format(path, threading.get_ident())
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def invalidate(self, key: Hashable) -> None:
+        super().invalidate(key)
+        if self.directory and isinstance(key, tuple):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+_default_menu_cache: Optional[MenuCache] = None
+
+
+def get_menu_cache() -> MenuCache:
+    """Return the process-wide MenuCache, creating it on first use."""
+    global _default_menu_cache
+    if _default_menu_cache is None:
+        _default_menu_cache = MenuCache()
+    return _default_menu_cache
+
+
+def set_menu_cache(cache: Optional[MenuCache]) -> None:
+    """Replace the process-wide MenuCache.
+
+    Use MenuCache(maxsize=0) to turn menu caching off. Passing None drops
+    the current cache; a fresh default one is created the next time it is
+    needed.
+    """
+    global _default_menu_cache
+    _default_menu_cache = cache
+
+
+_default_locator_cache: Optional[TTLCache[Dict[str, Any]]] = None
+
+
+def get_locator_cache() -> TTLCache[Dict[str, Any]]:
+    """Return the process-wide store-locator cache, creating it on first use.
+
+    Locator responses are keyed by (country, line1, line2, service) of the
+    normalized address. The default TTL is short, because IsOnlineNow and
+    ServiceIsOpen change during the day.
+    """
+    global _default_locator_cache
+    if _default_locator_cache is None:
+        _default_locator_cache = TTLCache(maxsize=1024, ttl=60.0)
+    return _default_locator_cache
+
+
+def set_locator_cache(cache: Optional[TTLCache[Dict[str, Any]]]) -> None:
+    """Replace the process-wide store-locator cache.
+
+    Use TTLCache(maxsize=0) to turn locator caching off. Passing None
+    drops the current cache; a fresh default one is created the next time
+    it is needed.
+    """
+    global _default_locator_cache
+    _default_locator_cache = cache
@@ -0,0 +1,130 @@
+from typing import Any, Dict, Hashable, Iterator, List, Mapping, Optional, Tuple, Union
+
+Options = Union[Mapping[str, Any], List[str]]
+
+
+def normalize_options(options: Optional[Options]) -> Dict[str, Dict[str, str]]:
+    """Turn topping overrides into the API's Options shape.
+
+    Accepts the API shape ({'X': {'1/1': '1.5'}}), a plain amount per
+    topping ({'P': '1', 'C': '0'}) or a list of topping codes to add
+    (['P', 'M']). An amount of '0' takes a default topping off; '1/2'
+    and '2/2' portions cover half the pizza.
+    """
+    if not options:
+        return {}
+    if isinstance(options, list):
+        return {code: {'1/1': '1'} for code in options}
+    return {code: dict(amount) if isinstance(amount, Mapping) else {'1/1': str(amount)}
+            for code, amount in options.items()}
+
+
+class LineItem:
+    """One line in a Cart: a variant, a quantity and its topping overrides.
+
+    The variant dict is copied when the line is added, so a menu shared
+    between orders is never changed by one of them.
+    """
+    __slots__ = ('id', 'code', 'qty', 'options', 'data')
+
+    def __init__(self, line_id: int, variant: Mapping[str, Any], qty: int = 1,
+                 options: Optional[Options] = None) -> None:
+        self.id = line_id
+        self.data: Dict[str, Any] = dict(variant)
+        self.code: str = self.data['Code']
+        self.qty = qty
+        self.options = normalize_options(options)
+
+    def __repr__(self) -> str:
+        return 'LineItem({}, {!r}, qty={})'.format(self.id, self.code, self.qty)
+
+    def fingerprint(self) -> Tuple[Hashable, ...]:
+        """What the line contributes to the price: code, quantity and options."""
+        options = tuple(sorted((code, tuple(sorted(portions.items()))) for code, portions in self.options.items()))
+        return (self.code, self.qty, options)
+
+    def to_json(self) -> Dict[str, Any]:
+        item = dict(self.data)
+        item.update(ID=self.id, isNew=True, Qty=self.qty, AutoRemove=False)
+        if self.options:
+            item['Options'] = self.options
+        return item
+
+
+class Cart:
+    """The lines of an order, keyed by line ID.
+
+    Adding, removing and updating a line are all O(1): lines live in an
+    insertion-ordered dict by ID, and each code maps to the IDs of the
+    lines holding it, oldest first. Each line gets its own ID, which is
+    what the API's ID field carries once the cart is serialized.
+    """
+
+    def __init__(self) -> None:
+        self._lines: Dict[int, LineItem] = {}
+        self._by_code: Dict[str, Dict[int, None]] = {}
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self) -> Iterator[LineItem]:
+        return iter(self._lines.values())
+
+    def __contains__(self, line_id: object) -> bool:
+        return line_id in self._lines
+
+    def __getitem__(self, line_id: int) -> LineItem:
+        return self._lines[line_id]
+
+    def add(self, variant: Mapping[str, Any], qty: int = 1, options: Optional[Options] = None) -> LineItem:
+        line = LineItem(self._next_id, variant, qty, options)
+        self._next_id += 1
+        self._lines[line.id] = line
+        self._by_code.setdefault(line.code, {})[line.id] = None
+        return line
+
+    def remove(self, line_id: int) -> LineItem:
+        line = self._lines.pop(line_id)
+        ids = self._by_code[line.code]
+        del ids[line_id]
+        if not ids:
+            del self._by_code[line.code]
+        return line
+
+    def remove_code(self, code: str) -> LineItem:
+        """Remove the oldest line holding code. Raises KeyError if there is none."""
+        ids = self._by_code.get(code)
+        if not ids:
+            raise KeyError(code)
+        return self.remove(next(iter(ids)))
+
+    def update_quantity(self, line_id: int, qty: int) -> Optional[LineItem]:
+        """Change a line's quantity; a quantity of 0 or less removes it."""
+        if qty <= 0:
+            self.remove(line_id)
+            return None
+        line = self._lines[line_id]
+        line.qty = qty
+        return line
+
+    def set_options(self, line_id: int, options: Optional[Options]) -> LineItem:
+        """Replace a line's topping overrides."""
+        line = self._lines[line_id]
+        line.options = normalize_options(options)
+        return line
+
+    def clear(self) -> None:
+        self._lines.clear()
+        self._by_code.clear()
+
+    def fingerprint(self) -> Tuple[Hashable, ...]:
+        """A hashable summary of the cart that changes whenever its price could.
+
+        Line IDs are left out, so removing a line and adding it back gives
+        the same fingerprint.
+        """
+        return tuple(sorted(line.fingerprint() for line in self._lines.values()))
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        return [line.to_json() for line in self._lines.values()]
@@ -0,0 +1,58 @@
+import json
+import os
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+
+class JsonCodec(NamedTuple):
+    """How API responses are decoded and order bodies are encoded.
+
+    loads takes the raw response body (bytes or str); dumps returns bytes.
+    """
+    name: str
+    loads: Callable[[Union[bytes, str]], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib() -> JsonCodec:
+    return JsonCodec('json', json.loads, lambda obj: json.dumps(obj, separators=(',', ':')).encode())
+
+
+def _orjson() -> JsonCodec:
+    import orjson
+    return JsonCodec('orjson', orjson.loads, orjson.dumps)
+
+
+def _ujson() -> JsonCodec:
+    import ujson  # type: ignore
+    return JsonCodec('ujson', ujson.loads, lambda obj: ujson.dumps(obj).encode())
+
+
+CODECS: Dict[str, Callable[[], JsonCodec]] = {
+    'orjson': _orjson,
+    'ujson': _ujson,
+    'json': _stdlib,
+}
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """Return the named codec, or the fastest one that is installed.
+
+    Without a name, this tries orjson, then ujson, then falls back to the
+    stdlib json module. An unknown name raises ValueError; so does
+    PIZZAPY_JSON naming one, when pizzapy is imported.
+    """
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError('unknown JSON codec {!r}, expected one of: {}'.format(name, ', '.join(sorted(CODECS))))
+        return CODECS[name]()
+    for factory in CODECS.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+    return _stdlib()
+
+
+# Picked once, at import time. Set PIZZAPY_JSON=json (or orjson, ujson) to
+# choose one; pass codec= to a Transport or AsyncClient to override it there.
+default_codec: JsonCodec = get_codec(os.environ.get('PIZZAPY_JSON') or None)
@@ -0,0 +1,219 @@
+"""A local directory of stores, searchable by location.
+
+The store locator only answers "which stores serve this address", one
+address and one round trip at a time. A StoreDirectory is built from the
+store data collected along the way (locator results and Store.get_details
+profiles both carry StoreCoordinates) and keeps a k-d tree over the
+stores' positions, so nearest-store and within-radius queries are
+answered locally. Areas the directory doesn't cover fall back to the live
+locator, whose results are then added to the directory.
+"""
+import heapq
+import math
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .store import Store, StoreList
+from .transport import Transport
+from .urls import COUNTRY_USA
+
+EARTH_RADIUS_MILES = 3958.8
+Point = Tuple[float, float, float]
+
+
+def store_coordinates(data: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """The (latitude, longitude) in a store's locator or profile data, if any."""
+    coordinates = data.get('StoreCoordinates') or {}
+    try:
+        return float(coordinates['StoreLatitude']), float(coordinates['StoreLongitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _point(latitude: float, longitude: float) -> Point:
+    # Points on the unit sphere: straight-line distance between them grows
+    # with the great-circle distance, so the tree can use plain Euclidean
+    # distance and still return the nearest stores on the map.
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _chord(miles: float) -> float:
+    return 2 * math.sin(min(miles / EARTH_RADIUS_MILES, math.pi) / 2)
+
+
+def _miles(chord: float) -> float:
+    return 2 * math.asin(min(chord / 2, 1.0)) * EARTH_RADIUS_MILES
+
+
+def _offers(data: Dict[str, Any], service: str) -> bool:
+    return bool(data.get('Allow{}Orders'.format(service), True) and data.get('IsOnlineNow', True)
+                and (data.get('ServiceIsOpen') or {}).get(service, True))
+
+
+class NearbyStore(NamedTuple):
+    store: Store
+    distance: float
+
+
+class _KDTree:
+    """A static 3-d tree over points, built once by median splits.
+
+    Nodes are stored flat: the node for order[start:end] splits on
+    axes[(start, end)] at the point in the middle of that range.
+    """
+
+    def __init__(self, points: Sequence[Point]) -> None:
+        self.points = points
+        self.order = list(range(len(points)))
+        self.axes: Dict[Tuple[int, int], int] = {}
+        pending = [(0, len(points), 0)]
+        while pending:
+            start, end, depth = pending.pop()
+            if end - start <= 1:
+                continue
+            axis = depth % 3
+            self.order[start:end] = sorted(self.order[start:end], key=lambda i: points[i][axis])
+            self.axes[(start, end)] = axis
+            middle = (start + end) // 2
+            pending.append((start, middle, depth + 1))
+            pending.append((middle + 1, end, depth + 1))
+
+    @staticmethod
+    def _distance(a: Point, b: Point) -> float:
+        return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
+
+    def nearest(self, target: Point, k: int, limit: float = math.inf) -> List[Tuple[float, int]]:
+        """The k points nearest target and within limit, as sorted (distance, index)."""
+        best: List[Tuple[float, int]] = []  # max-heap by negated distance
+        pending = [(0, len(self.points))]
+        while pending:
+            start, end = pending.pop()
+            if start >= end:
+                continue
+            middle = (start + end) // 2
+            index = self.order[middle]
+            point = self.points[index]
+            distance = self._distance(target, point)
+            if distance <= limit:
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, index))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, index))
+            axis = self.axes.get((start, end))
+            if axis is None:
+                continue
+            diff = target[axis] - point[axis]
+            near, far = ((start, middle), (middle + 1, end)) if diff < 0 else ((middle + 1, end), (start, middle))
+            bound = limit if len(best) < k else min(limit, -best[0][0])
+            if abs(diff) <= bound:
+                pending.append(far)
+            pending.append(near)
+        return sorted((-negated, index) for negated, index in best)
+
+    def within(self, target: Point, radius: float) -> List[Tuple[float, int]]:
+        return self.nearest(target, len(self.points), radius)
+
+
+class StoreDirectory:
+    """Stores indexed by location, for nearest and within-radius lookups.
+
+    Add store data with add or add_many; each store is kept once, by
+    StoreID, with later data merged over earlier. Stores without
+    StoreCoordinates are kept but can't be found by location. The tree is
+    rebuilt on the first query after stores are added. The Stores it
+    returns share the directory's merged data as Store.data.
+
+    Distances are in miles, like the locator's MinDistance and MaxDistance.
+
+    Attributes:
+        country (str): Country of the stores
+        transport (Transport): Given to the Stores returned, and used for fallbacks
+        coverage (float): How close the nearest known store must be for an
+            address to count as covered by the directory
+        fallbacks (int): Lookups that went to the live locator
+    """
+
+    def __init__(self, stores: Iterable[Dict[str, Any]] = (), country: str = COUNTRY_USA,
+                 transport: Optional[Transport] = None, coverage: float = 10.0) -> None:
+        self.country = country
+        self.transport = transport
+        self.coverage = coverage
+        self.fallbacks = 0
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._located: Dict[str, Point] = {}
+        self._ids: List[str] = []
+        self._tree: Optional[_KDTree] = None
+        self._lock = threading.Lock()
+        self.add_many(stores)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, store_id: object) -> bool:
+        return str(store_id) in self._data
+
+    def add(self, data: Dict[str, Any]) -> None:
+        """Add or update a store from its locator entry or its profile."""
+        store_id = str(data['StoreID'])
+        with self._lock:
+            merged = self._data.setdefault(store_id, {})
+            merged.update(data)
+            coordinates = store_coordinates(merged)
+            if coordinates is not None and self._located.get(store_id) != _point(*coordinates):
+                self._located[store_id] = _point(*coordinates)
+                self._tree = None
+
+    def add_many(self, stores: Iterable[Dict[str, Any]]) -> None:
+        for data in stores:
+            self.add(data)
+
+    def get(self, store_id: str) -> Optional[Store]:
+        data = self._data.get(str(store_id))
+        return None if data is None else Store(data, self.country, self.transport, keep_raw=True)
+
+    def _index(self) -> Tuple[_KDTree, List[str]]:
+        with self._lock:
+            if self._tree is None:
+                self._ids = list(self._located)
+                self._tree = _KDTree([self._located[store_id] for store_id in self._ids])
+            return self._tree, self._ids
+
+    def _results(self, matches: List[Tuple[float, int]], ids: List[str]) -> List[NearbyStore]:
+        return [NearbyStore(Store(self._data[ids[index]], self.country, self.transport, keep_raw=True), _miles(chord))
+                for chord, index in matches]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_distance: Optional[float] = None) -> List[NearbyStore]:
+        """The k stores nearest a point, closest first, optionally within max_distance miles."""
+        tree, ids = self._index()
+        limit = math.inf if max_distance is None else _chord(max_distance)
+        return self._results(tree.nearest(_point(latitude, longitude), k, limit), ids)
+
+    def within(self, latitude: float, longitude: float, radius: float) -> List[NearbyStore]:
+        """Every store within radius miles of a point, closest first."""
+        tree, ids = self._index()
+        return self._results(tree.within(_point(latitude, longitude), _chord(radius)), ids)
+
+    def nearby_stores(self, address: Any, k: int = 1, service: str = 'Delivery') -> List[Store]:
+        """Up to k stores near an address, from the directory if it covers the address.
+
+        An address is covered when it has coordinates and a known store
+        within coverage miles offers the service. Whether a store offers
+        it comes from the store's data as last seen (AllowDeliveryOrders,
+        IsOnlineNow, ServiceIsOpen), so it can be as old as that data.
+        Anything else goes to the live locator, and the stores it returns
+        are added to the directory.
+        """
+        coordinates = getattr(address, 'coordinates', None)
+        if coordinates is not None:
+            candidates = self.within(coordinates[0], coordinates[1], self.coverage)
+            stores = [nearby.store for nearby in candidates if _offers(self._data[nearby.store.id], service)]
+            if stores:
+                return stores[:k]
+
+        self.fallbacks += 1
+        data = address._locate(service)
+        self.add_many(data['Stores'])
+        found: StoreList = address._stores_from(data, service)
+        return found[:k]
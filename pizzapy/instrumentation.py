@@ -0,0 +1,360 @@
+"""Hooks around every API request, for metrics and tracing.
+
+Register a Hook with add_hook and its before() and after() are called
+around each request sent by request_json, request_xml, track_by_phone,
+Order.validate/pay_with/place and the AsyncClient. Both get the same
+RequestEvent; by after() it holds the response status and size, and the
+request's latency split into time on the network and time parsing.
+
+    add_hook(Callbacks(after=lambda event: print(event.endpoint, event.latency)))
+
+With no hooks registered no event is made, and requests take their
+uninstrumented path.
+
+Three hooks are built in: MetricsExporter keeps Prometheus-style counters
+and histograms and renders them in the Prometheus text format,
+StatsdExporter sends each request's timings to a StatsD server over UDP,
+and OpenTelemetryHook records each request as a span (it needs
+opentelemetry-api, pip install pizzapy[otel]).
+"""
+import logging
+import socket
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from .urls import endpoint_of
+
+T = TypeVar('T')
+
+logger = logging.getLogger(__name__)
+
+# URL template name -> endpoint name in events. Anything else is 'other'.
+ENDPOINTS = {
+    'find_url': 'find',
+    'menu_url': 'menu',
+    'info_url': 'info',
+    'price_url': 'price',
+    'validate_url': 'validate',
+    'place_url': 'place',
+    'coupon_url': 'coupon',
+    'track_by_order': 'track',
+    'track_by_phone': 'track',
+}
+
+
+class RequestEvent:
+    """One API request, as seen by hooks.
+
+    Times are in seconds. network_time covers sending the request and
+    reading the response; parse_time covers decoding it. Both are None
+    when the request failed before getting that far, and when the
+    response was shared from an identical request already in flight
+    (shared is then True). status and bytes are likewise unset for
+    shared responses.
+
+    Hooks can keep their own per-request state in context, keyed by
+    the hook.
+    """
+    __slots__ = ('endpoint', 'country', 'method', 'url', 'status', 'bytes', 'latency', 'network_time',
+                 'parse_time', 'shared', 'error', 'context', 'hooks')
+
+    def __init__(self, endpoint: str, country: str, method: str, url: str, hooks: Sequence['Hook'] = ()) -> None:
+        self.endpoint = endpoint
+        self.country = country
+        self.method = method
+        self.url = url
+        self.status: Optional[int] = None
+        self.bytes = 0
+        self.latency = 0.0
+        self.network_time: Optional[float] = None
+        self.parse_time: Optional[float] = None
+        self.shared = False
+        self.error: Optional[BaseException] = None
+        self.context: Dict[Any, Any] = {}
+        self.hooks = hooks
+
+    def __repr__(self) -> str:
+        return 'RequestEvent({} {} {}, status={}, latency={:.4f})'.format(
+            self.method, self.endpoint, self.country, self.status, self.latency)
+
+    def responded(self, status: int, size: int, network_time: float) -> None:
+        self.status = status
+        self.bytes = size
+        self.network_time = network_time
+
+
+class Hook:
+    """Base class for hooks; override before, after, or both."""
+
+    def before(self, event: RequestEvent) -> None:
+        pass
+
+    def after(self, event: RequestEvent) -> None:
+        pass
+
+
+class Callbacks(Hook):
+    """A hook made of plain functions, each taking the RequestEvent."""
+
+    def __init__(self, before: Optional[Callable[[RequestEvent], Any]] = None,
+                 after: Optional[Callable[[RequestEvent], Any]] = None) -> None:
+        self._before = before
+        self._after = after
+
+    def before(self, event: RequestEvent) -> None:
+        if self._before is not None:
+            self._before(event)
+
+    def after(self, event: RequestEvent) -> None:
+        if self._after is not None:
+            self._after(event)
+
+
+_hooks: Tuple[Hook, ...] = ()
+_hooks_lock = threading.Lock()
+
+
+def add_hook(hook: Hook) -> Hook:
+    """Call hook around every request from now on. Returns the hook."""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+    return hook
+
+
+def remove_hook(hook: Hook) -> None:
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+
+
+def get_hooks() -> Tuple[Hook, ...]:
+    return _hooks
+
+
+def start(method: str, template: str, url: Optional[str] = None) -> Optional[RequestEvent]:
+    """An event for a request to a URL template, or None when there are no hooks."""
+    hooks = _hooks
+    if not hooks:
+        return None
+    country, name = endpoint_of(template) or ('', '')
+    return RequestEvent(ENDPOINTS.get(name, 'other'), country, method, url or template, hooks)
+
+
+def _dispatch(event: RequestEvent, stage: str) -> None:
+    # A failing hook must not fail the request: an order could be placed
+    # and then reported as failed, and placed again.
+    for hook in event.hooks:
+        try:
+            getattr(hook, stage)(event)
+        except Exception:
+            logger.exception('%s hook %r failed', stage, hook)
+
+
+def _finish(event: RequestEvent, started: float) -> None:
+    event.latency = time.perf_counter() - started
+    if event.network_time is None:
+        event.shared = event.error is None
+    elif event.parse_time is None and event.error is None:
+        # Streamed responses are parsed as they arrive; whatever wasn't
+        # spent waiting on the network was spent parsing.
+        event.parse_time = max(0.0, event.latency - event.network_time)
+    _dispatch(event, 'after')
+
+
+def observe(event: RequestEvent, fn: Callable[..., T], *args: Any) -> T:
+    """Call fn(*args) as the request event describes, with the hooks around it."""
+    _dispatch(event, 'before')
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    except BaseException as e:
+        event.error = e
+        raise
+    finally:
+        _finish(event, started)
+
+
+async def observe_async(event: RequestEvent, awaitable: Awaitable[T]) -> T:
+    """Await awaitable as the request event describes, with the hooks around it."""
+    _dispatch(event, 'before')
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    except BaseException as e:
+        event.error = e
+        raise
+    finally:
+        _finish(event, started)
+
+
+def _outcome(event: RequestEvent) -> str:
+    if event.error is not None and event.status is None:
+        return 'error'
+    if event.shared:
+        return 'shared'
+    return str(event.status)
+
+
+class MetricsExporter(Hook):
+    """Aggregates requests into Prometheus-style metrics.
+
+    Metrics are labelled by endpoint and country, and request counts
+    also by status ('error' for requests that got no response, 'shared'
+    for responses shared with an identical request). prometheus() gives
+    them in the Prometheus text exposition format, for serving on a
+    /metrics page.
+
+    Attributes:
+        buckets (tuple): Upper bounds of the latency histogram, in seconds
+        prefix (str): Prefix of every metric name
+    """
+
+    def __init__(self, buckets: Sequence[float] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+                 prefix: str = 'pizzapy') -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._bytes: Dict[Tuple[str, str], int] = {}
+        self._network: Dict[Tuple[str, str], float] = {}
+        self._parse: Dict[Tuple[str, str], float] = {}
+        self._latency: Dict[Tuple[str, str], List[float]] = {}  # bucket counts, then count and sum
+        self._lock = threading.Lock()
+
+    def after(self, event: RequestEvent) -> None:
+        labels = (event.endpoint, event.country)
+        with self._lock:
+            key = labels + (_outcome(event),)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._bytes[labels] = self._bytes.get(labels, 0) + event.bytes
+            self._network[labels] = self._network.get(labels, 0.0) + (event.network_time or 0.0)
+            self._parse[labels] = self._parse.get(labels, 0.0) + (event.parse_time or 0.0)
+            histogram = self._latency.get(labels)
+            if histogram is None:
+                histogram = self._latency[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if event.latency <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += event.latency
+
+    def requests(self, endpoint: str, country: str = '', status: Optional[str] = None) -> int:
+        """How many requests to an endpoint were seen, optionally of one country or status."""
+        with self._lock:
+            return sum(n for (e, c, s), n in self._requests.items()
+                       if e == endpoint and (not country or c == country) and (status is None or s == status))
+
+    def prometheus(self) -> str:
+        name = self.prefix
+        with self._lock:
+            lines = ['# HELP {}_requests_total API requests sent.'.format(name),
+                     '# TYPE {}_requests_total counter'.format(name)]
+            for (endpoint, country, status), n in sorted(self._requests.items()):
+                lines.append('{}_requests_total{{endpoint="{}",country="{}",status="{}"}} {}'.format(
+                    name, endpoint, country, status, n))
+            for metric, help_text, values in (
+                ('response_bytes_total', 'Bytes of response bodies received.', self._bytes),
+                ('network_seconds_total', 'Seconds spent sending requests and reading responses.', self._network),
+                ('parse_seconds_total', 'Seconds spent decoding responses.', self._parse),
+            ):
+                lines += ['# HELP {}_{} {}'.format(name, metric, help_text),
+                          '# TYPE {}_{} counter'.format(name, metric)]
+                for (endpoint, country), value in sorted(values.items()):
+                    lines.append('{}_{}{{endpoint="{}",country="{}"}} {}'.format(
+                        name, metric, endpoint, country, value))
+            lines += ['# HELP {}_request_seconds Request latency, parsing included.'.format(name),
+                      '# TYPE {}_request_seconds histogram'.format(name)]
+            for (endpoint, country), histogram in sorted(self._latency.items()):
+                labels = 'endpoint="{}",country="{}"'.format(endpoint, country)
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append('{}_request_seconds_bucket{{{},le="{}"}} {:g}'.format(name, labels, bound, count))
+                lines.append('{}_request_seconds_bucket{{{},le="+Inf"}} {:g}'.format(name, labels, histogram[-2]))
+                lines.append('{}_request_seconds_count{{{}}} {:g}'.format(name, labels, histogram[-2]))
+                lines.append('{}_request_seconds_sum{{{}}} {}'.format(name, labels, histogram[-1]))
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdExporter(Hook):
+    """Sends each request's metrics to a StatsD server, in one UDP packet.
+
+    Metric names are prefix.country.endpoint.metric: a requests counter
+    (with the status in the name, like requests.200), bytes, and latency,
+    network and parse timers in milliseconds. Send errors are ignored,
+    as StatsD clients do.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8125, prefix: str = 'pizzapy') -> None:
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def lines(self, event: RequestEvent) -> List[str]:
+        name = '{}.{}.{}'.format(self.prefix, event.country or 'unknown', event.endpoint)
+        lines = ['{}.requests.{}:1|c'.format(name, _outcome(event)),
+                 '{}.latency:{:.3f}|ms'.format(name, event.latency * 1000)]
+        if event.network_time is not None:
+            lines.append('{}.network:{:.3f}|ms'.format(name, event.network_time * 1000))
+            lines.append('{}.bytes:{}|c'.format(name, event.bytes))
+        if event.parse_time is not None:
+            lines.append('{}.parse:{:.3f}|ms'.format(name, event.parse_time * 1000))
+        return lines
+
+    def after(self, event: RequestEvent) -> None:
+        try:
+            self._socket.sendto('\n'.join(self.lines(event)).encode(), self.address)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class OpenTelemetryHook(Hook):
+    """Records each request as an OpenTelemetry client span.
+
+    Spans are named after the endpoint ('pizzapy menu', ...) and carry
+    the HTTP method, URL and status, plus the response size and the
+    network and parse times as pizzapy.* attributes. Without a tracer,
+    one is taken from the global tracer provider.
+    """
+
+    def __init__(self, tracer: Any = None) -> None:
+        try:
+            from opentelemetry import trace  # type: ignore
+        except ImportError as e:
+            if tracer is None:
+                raise ImportError('OpenTelemetryHook requires opentelemetry-api: pip install pizzapy[otel]') from e
+            self._kind: Any = None
+            self._error: Any = None
+        else:
+            self._kind = trace.SpanKind.CLIENT
+            self._error = trace.Status(trace.StatusCode.ERROR)
+        self.tracer = tracer if tracer is not None else trace.get_tracer('pizzapy')
+
+    def before(self, event: RequestEvent) -> None:
+        attributes = {'http.request.method': event.method, 'url.full': event.url,
+                      'pizzapy.endpoint': event.endpoint, 'pizzapy.country': event.country}
+        if self._kind is None:
+            span = self.tracer.start_span('pizzapy ' + event.endpoint, attributes=attributes)
+        else:
+            span = self.tracer.start_span('pizzapy ' + event.endpoint, kind=self._kind, attributes=attributes)
+        event.context[self] = span
+
+    def after(self, event: RequestEvent) -> None:
+        span = event.context.pop(self, None)
+        if span is None:
+            return
+        if event.status is not None:
+            span.set_attribute('http.response.status_code', event.status)
+        span.set_attribute('pizzapy.bytes', event.bytes)
+        span.set_attribute('pizzapy.shared', event.shared)
+        if event.network_time is not None:
+            span.set_attribute('pizzapy.network_time', event.network_time)
+        if event.parse_time is not None:
+            span.set_attribute('pizzapy.parse_time', event.parse_time)
+        if event.error is not None:
+            span.record_exception(event.error)
+            if self._error is not None:
+                span.set_status(self._error)
+        span.end()
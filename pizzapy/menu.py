@@ -1,9 +1,20 @@
-from typing import Dict, List, Optional, Any, Union, cast
+import threading
+from typing import Collection, Dict, List, Optional, Any, Union, cast
 from typing_extensions import TypedDict
 
 
+from .cache import get_menu_cache
+from .instrumentation import observe, start
+from .search import MenuIndex, SearchResult
+from .snapshot import MenuSnapshot, write_snapshot
+from .streaming import Stream, load_menu
+from .transport import Transport, Validated, get_transport
 from .urls import Urls, COUNTRY_USA
-from .utils import request_json
+from .utils import request_validated
+
+
+# The sections of a menu response that Menu and Order read.
+MENU_SECTIONS = ('Variants', 'Products', 'Coupons', 'PreconfiguredProducts', 'Categorization')
 
 
 class VariantInfo(TypedDict):
@@ -15,24 +26,42 @@ class VariantInfo(TypedDict):
 
 
 class MenuCategory:
-    def __init__(self, menu_data: Dict[str, Any] = {}, parent: Optional['MenuCategory'] = None) -> None:
-        self.menu_data = menu_data
+    """A category in a menu's Categorization tree.
+
+    path is the slash-separated codes from the root down, like
+    'Food/Pizza/Specialty'; it is worked out once, when the category is
+    built. The raw category dict is only kept (as menu_data) if the menu
+    was built with keep_raw=True; otherwise menu_data is None.
+    """
+    __slots__ = ('subcategories', 'products', 'parent', 'code', 'name', 'path', 'menu_data')
+
+    def __init__(self, menu_data: Dict[str, Any] = {}, parent: Optional['MenuCategory'] = None,
+                 keep_raw: bool = True) -> None:
+        self.menu_data: Optional[Dict[str, Any]] = menu_data if keep_raw else None
         self.subcategories: List['MenuCategory'] = []
         self.products: List['MenuItem'] = []
         self.parent = parent
-        self.code = menu_data['Code']
-        self.name = menu_data['Name']
+        self.code: str = menu_data['Code']
+        self.name: str = menu_data['Name']
+        self.path: str = self.code if parent is None else parent.path + '/' + self.code
 
     def get_category_path(self) -> str:
-        path = '' if not self.parent else self.parent.get_category_path()
-        return str(path + self.code)
+        """The codes from the root down, run together, like 'FoodPizzaSpecialty'."""
+        return self.path.replace('/', '')
 
 
 class MenuItem:
-    def __init__(self, data: Dict[str, Any] = {}) -> None:
-        self.code = data['Code']
-        self.name = data['Name']
-        self.menu_data = data
+    """A product, coupon or preconfigured product from a menu.
+
+    The raw item dict is only kept (as menu_data) if the menu was built
+    with keep_raw=True; otherwise menu_data is None.
+    """
+    __slots__ = ('code', 'name', 'menu_data', 'categories')
+
+    def __init__(self, data: Dict[str, Any] = {}, keep_raw: bool = True) -> None:
+        self.code: str = data['Code']
+        self.name: str = data['Name']
+        self.menu_data: Optional[Dict[str, Any]] = data if keep_raw else None
         self.categories: List[MenuCategory] = []
 
 
@@ -44,45 +73,265 @@ class Menu:
 
     Next time I get pizza, there is a lot of work to be done in
     documenting this class.
+
+    A lazy Menu only keeps the raw response until something asks for
+    more than the variants: products, coupons, preconfigured products and
+    the category tree are built together the first time any of them is
+    accessed. Variant lookups, which is all Order.add_item needs, work
+    straight from the raw dict.
+
+    MenuItems and MenuCategories only carry the fields we use. Pass
+    keep_raw=True to also keep each one's raw dict as menu_data.
+
+    A Menu from Menu.from_store keeps the ETag and Last-Modified of the
+    response it was built from, so that it can be revalidated while it
+    sits in the menu cache.
     """
-    def __init__(self, data: Dict[str, Any] = {}, country: str = COUNTRY_USA) -> None:
+    def __init__(self, data: Dict[str, Any] = {}, country: str = COUNTRY_USA, lazy: bool = False,
+                 keep_raw: bool = False) -> None:
         self.variants: Dict[str, VariantInfo] = data.get('Variants', {})
-        self.menu_by_code: Dict[str, MenuItem] = {}
-        self.root_categories: Dict[str, MenuCategory] = {}
-        self.country = COUNTRY_USA
+        self.country = country
+        self.keep_raw = keep_raw
+        self._data = data
+        self._menu_by_code: Dict[str, MenuItem] = {}
+        self._root_categories: Dict[str, MenuCategory] = {}
+        self._categories_by_path: Dict[str, MenuCategory] = {}
+        self._categories_by_code: Dict[str, MenuCategory] = {}
+        self._products_by_path: Dict[str, List[MenuItem]] = {}
+        self._products: List[MenuItem] = []
+        self._coupons: List[MenuItem] = []
+        self._preconfigured: List[MenuItem] = []
+        self._parsed = False
+        self._index: Optional[MenuIndex] = None
+        self._lock = threading.Lock()
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self._snapshot: Optional[MenuSnapshot] = None
+
+        if not lazy:
+            self._parse()
+
+    def _parse(self) -> None:
+        with self._lock:
+            if self._parsed:
+                return
+            if self.variants:
+                self._products = self.parse_items(self._data.get('Products', {}))
+                self._coupons = self.parse_items(self._data.get('Coupons', {}))
+                self._preconfigured = self.parse_items(self._data.get('PreconfiguredProducts', {}))
+                for key, value in self._data.get('Categorization', {}).items():
+                    self._root_categories[key] = self.build_categories(value)
+                self._collect_products()
+            self._parsed = True
+
+    def _collect_products(self) -> None:
+        # Children come after their parents in _categories_by_path, so one
+        # pass in reverse gathers each category's products bottom-up.
+        for path, category in reversed(list(self._categories_by_path.items())):
+            products = dict.fromkeys(category.products)
+            for subcategory in category.subcategories:
+                products.update(dict.fromkeys(self._products_by_path[subcategory.path]))
+            self._products_by_path[path] = list(products)
+
+    @property
+    def products(self) -> List[MenuItem]:
+        if not self._parsed:
+            self._parse()
+        return self._products
+
+    @property
+    def coupons(self) -> List[MenuItem]:
+        if not self._parsed:
+            self._parse()
+        return self._coupons
+
+    @property
+    def preconfigured(self) -> List[MenuItem]:
+        if not self._parsed:
+            self._parse()
+        return self._preconfigured
+
+    @property
+    def menu_by_code(self) -> Dict[str, MenuItem]:
+        if not self._parsed:
+            self._parse()
+        return self._menu_by_code
+
+    @property
+    def root_categories(self) -> Dict[str, MenuCategory]:
+        if not self._parsed:
+            self._parse()
+        return self._root_categories
+
+    @property
+    def categories_by_path(self) -> Dict[str, MenuCategory]:
+        """Every category, keyed by its path, like 'Food/Pizza'."""
+        if not self._parsed:
+            self._parse()
+        return self._categories_by_path
 
-        if self.variants:
-            self.products = self.parse_items(data['Products'])
-            self.coupons = self.parse_items(data['Coupons'])
-            self.preconfigured = self.parse_items(data['PreconfiguredProducts'])
-            for key, value in data['Categorization'].items():
-                self.root_categories[key] = self.build_categories(value)
+    @property
+    def categories_by_code(self) -> Dict[str, MenuCategory]:
+        """Every category, keyed by its code.
+
+        A few codes are used more than once (Food/Sandwich/Sandwich); the
+        first one in menu order wins.
+        """
+        if not self._parsed:
+            self._parse()
+        return self._categories_by_code
+
+    def get_category(self, path_or_code: str) -> Optional[MenuCategory]:
+        """Look a category up by its path ('Food/Pizza') or its code ('Pizza')."""
+        category = self.categories_by_path.get(path_or_code)
+        return category if category is not None else self._categories_by_code.get(path_or_code)
+
+    def get_products(self, path_or_code: str) -> List[MenuItem]:
+        """Every product in a category and its subcategories, in menu order.
+
+        Returns an empty list for an unknown category. For example:
+
+            menu.get_products('Food/Pizza')
+
+        On a menu from a snapshot, a category path is answered from the
+        snapshot's index of each category's products, decoding only those
+        products; until something builds the full menu, their categories
+        lists are left empty.
+        """
+        if self._snapshot is not None and not self._parsed:
+            products = self._snapshot_products(path_or_code)
+            if products is not None:
+                return products
+        category = self.get_category(path_or_code)
+        return [] if category is None else self._products_by_path[category.path]
+
+    def _snapshot_products(self, path: str) -> Optional[List[MenuItem]]:
+        products = self._products_by_path.get(path)
+        if products is not None or self._snapshot is None:
+            return products
+        codes = self._snapshot.category_products(path)
+        if not codes:
+            return None
+        sections = [self._data[name] for name in ('Products', 'Coupons', 'PreconfiguredProducts') if name in self._data]
+        products = []
+        for code in codes:
+            section = next((section for section in sections if code in section), None)
+            if section is not None:
+                products.append(MenuItem(section[code], self.keep_raw))
+        self._products_by_path[path] = products
+        return products
+
+    @classmethod
+    def from_stream(cls, stream: Stream, country: str = COUNTRY_USA, lazy: bool = False, keep_raw: bool = False,
+                    skip: Collection[str] = (), keep: Optional[Collection[str]] = None) -> 'Menu':
+        """Build a Menu from a raw menu response that is read as it arrives.
+
+        stream is a file or an iterable of bytes chunks. Each section is
+        decoded entry by entry, so the whole response is never held as
+        text. Sections named in skip, or missing from keep if it is given,
+        are scanned over without being decoded; pass keep=MENU_SECTIONS to
+        drop everything Menu doesn't use.
+        """
+        return cls(load_menu(stream, skip, keep), country, lazy, keep_raw)
 
     @classmethod
-    def from_store(cls, store_id: str, lang: str = 'en', country: str = COUNTRY_USA) -> 'Menu':
-        response = request_json(Urls(country).menu_url(), store_id=store_id, lang=lang)
-        menu = cls(response)
+    def from_snapshot(cls, snapshot: Union[str, MenuSnapshot], lazy: bool = True, keep_raw: bool = False) -> 'Menu':
+        """Build a Menu over a snapshot written by export_snapshot.
+
+        snapshot is a path or an open MenuSnapshot. Nothing is decoded up
+        front: variants and the other sections are read from the mapped
+        file as they are looked up, so the snapshot must stay open for as
+        long as the Menu is used. get_products uses the snapshot's
+        category index rather than building the category tree.
+        """
+        if not isinstance(snapshot, MenuSnapshot):
+            snapshot = MenuSnapshot(snapshot)
+        menu = cls(snapshot.data(), snapshot.meta.get('country', COUNTRY_USA), lazy, keep_raw)
+        menu._snapshot = snapshot
+        return menu
+
+    def export_snapshot(self, path: str, **meta: Any) -> None:
+        """Write this menu to path as a snapshot, for Menu.from_snapshot.
+
+        Any keyword arguments (say store_id and lang) are stored with it,
+        in MenuSnapshot.meta.
+        """
+        categories = {path: [product.code for product in self.get_products(path)] for path in self.categories_by_path}
+        write_snapshot(path, self._data, categories, dict(meta, country=self.country))
+
+    @classmethod
+    def from_store(cls, store_id: str, lang: str = 'en', country: str = COUNTRY_USA,
+                   transport: Optional[Transport] = None, refresh: bool = False, stream: bool = False) -> 'Menu':
+        """Get a store's menu, from the menu cache if it's there.
+
+        Pass refresh=True to skip the cache. The menu is then revalidated
+        with the API, and the previously parsed Menu is reused if the API
+        says it hasn't changed. A cached menu that has expired is
+        revalidated the same way, for as long as the cache still holds it.
+
+        With stream=True a menu that isn't cached is streamed and parsed as
+        it downloads, keeping only MENU_SECTIONS. Streamed menus are not
+        revalidated.
+        """
+        cache = get_menu_cache()
+        key = cache.key(store_id, lang, country)
+        stale = cache.peek(key)
+        menu = None if refresh else cache.get(key)
+        if menu is None:
+            response = None if refresh else cache.load_raw(key)
+            if response is not None:
+                menu = cls(response, country, lazy=True)
+            elif stream:
+                template = Urls(country).menu_url()
+                url = template.format(store_id=store_id, lang=lang)
+                get_stream = (transport or get_transport()).get_stream
+                event = start('GET', template, url)
+                if event is None:
+                    response = load_menu(get_stream(url), keep=MENU_SECTIONS)
+                else:
+                    response = observe(event, lambda: load_menu(get_stream(url, event=event), keep=MENU_SECTIONS))
+                cache.save_raw(key, response)
+                menu = cls(response, country, lazy=True)
+            else:
+                def parse(data: Dict[str, Any]) -> 'Menu':
+                    cache.save_raw(key, data)
+                    return cls(data, country, lazy=True)
+                previous = None
+                if stale is not None and (stale.etag or stale.last_modified):
+                    previous = Validated(stale.etag, stale.last_modified, stale)
+                template = Urls(country).menu_url()
+                validated = request_validated(template, previous, transport, parse,
+                                              (template.format(store_id=store_id, lang=lang), cls),
+                                              store_id=store_id, lang=lang)
+                menu = validated.value
+                menu.etag, menu.last_modified = validated.etag, validated.last_modified
+            cache.set(key, menu)
         return menu
 
     def build_categories(self, category_data: Dict[str, Any], parent: Optional[MenuCategory] = None) -> MenuCategory:
-        category = MenuCategory(category_data, parent)
-        for subcategory in category_data['Categories']:
-            new_subcategory = self.build_categories(subcategory, category)
-            category.subcategories.append(new_subcategory)
-        for product_code in category_data['Products']:
-            if product_code not in self.menu_by_code:
-                #raise Exception('PRODUCT NOT FOUND: %s %s' % (product_code, category.code))
-                continue
-            product = self.menu_by_code[product_code]
-            category.products.append(product)
-            product.categories.append(category)
-        return category
+        root = MenuCategory(category_data, parent, self.keep_raw)
+        pending = [(root, category_data)]
+        while pending:
+            category, data = pending.pop()
+            self._categories_by_path[category.path] = category
+            self._categories_by_code.setdefault(category.code, category)
+            for product_code in data['Products']:
+                if product_code not in self._menu_by_code:
+                    #raise Exception('PRODUCT NOT FOUND: %s %s' % (product_code, category.code))
+                    continue
+                product = self._menu_by_code[product_code]
+                category.products.append(product)
+                product.categories.append(category)
+            subcategories = [MenuCategory(subcategory, category, self.keep_raw) for subcategory in data['Categories']]
+            category.subcategories.extend(subcategories)
+            pending.extend(reversed(list(zip(subcategories, data['Categories']))))
+        return root
 
     def parse_items(self, parent_data: Dict[str, Any]) -> List[MenuItem]:
         items = []
         for code in parent_data.keys():
-            obj = MenuItem(parent_data[code])
-            self.menu_by_code[obj.code] = obj
+            obj = MenuItem(parent_data[code], self.keep_raw)
+            self._menu_by_code[obj.code] = obj
             items.append(obj)
         return items
 
@@ -103,17 +352,33 @@ class Menu:
         print_category(self.root_categories['Food'])
 
 
-    def search(self, name: str) -> None:
-        for variant in self.variants.values():
-            default_toppings = variant['Tags']['DefaultToppings'].split(',')
-            variant['Toppings'] = {
-                x.split('=', 1)[0]: x.split('=', 1)[1] for x in default_toppings if x
-            }
+    @property
+    def index(self) -> MenuIndex:
+        """The search index over this menu's variants, built on first use."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = MenuIndex(self.variants, self._data.get('Products'))
+        return self._index
+
+    def search(
+        self,
+        name: Optional[str] = None,
+        code: Optional[str] = None,
+        product_type: Optional[str] = None,
+        size: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[SearchResult]:
+        """Find variants by name, code, product type, size and price.
 
-            is_match = variant['Name'].find(name) != -1
-            if is_match:
-                print(f"{variant['Name']}\t{variant['Code']}\t{variant['Price']}")
+        Name matching is case-insensitive, and each word of the query can
+        be the start of a word in the variant's name. All the given
+        filters must match. For example:
 
+            menu.search('coke', size='2LTB', max_price=3)
+        """
+        return self.index.search(name, code, product_type, size, min_price, max_price)
 
     def get_item_count(self) -> int:
         return len(self.menu_by_code)
@@ -1,6 +1,9 @@
-import requests
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, Hashable, Optional, Tuple
+from .cache import TTLCache
+from .cart import Cart, LineItem, Options
+from .instrumentation import observe, start
 from .menu import Menu
+from .transport import Transport, get_transport
 from .urls import Urls, COUNTRY_USA
 from .customer import Customer
 from .store import Store
@@ -9,12 +12,34 @@ from .payment import CreditCard
 
 
 class Order:
-    def __init__(self, store: Store, customer: Customer, country: str = COUNTRY_USA) -> None:
+    """An order for one customer from one store.
+
+    Items and coupons live in two Carts, keyed by line ID, and are only
+    turned into the API's Products and Coupons lists when the order is
+    sent.
+
+    Successful validate and price responses are remembered by the order's
+    fingerprint, so calling validate() or pay_with() again on an order
+    that hasn't changed (or has changed back) skips the round trip. Only
+    merge_fields of a response are merged into data.
+    """
+    headers: Dict[str, str] = {
+        'Referer': 'https://order.dominos.com/en/pages/order/',
+        'Content-Type': 'application/json'
+    }
+    merge_fields = ('Amounts', 'AmountsBreakdown', 'EstimatedWaitMinutes', 'OrderID', 'Status')
+
+    def __init__(self, store: Store, customer: Customer, country: str = COUNTRY_USA,
+                 transport: Optional[Transport] = None, menu: Optional[Menu] = None) -> None:
         self.store = store
-        self.menu = Menu.from_store(store_id=store.id, country=country)
+        self.transport = transport or store.transport
+        self.menu = menu or Menu.from_store(store_id=store.id, country=country, transport=self.transport)
         self.customer = customer
         self.address = customer.address
         self.urls = Urls(country)
+        self.cart = Cart()
+        self.coupons = Cart()
+        self.responses: TTLCache[Dict[str, Any]] = TTLCache(maxsize=16, ttl=300.0)
         self.data: Dict[str, Any] = {
             'Address': {'Street': self.address.street,
                         'City': self.address.city,
@@ -33,32 +58,32 @@ class Order:
         }
 
     @staticmethod
-    def begin_customer_order(customer: Customer, store: Store, country: str = COUNTRY_USA) -> 'Order':
-        return Order(store, customer, country=country)
+    def begin_customer_order(customer: Customer, store: Store, country: str = COUNTRY_USA,
+                             transport: Optional[Transport] = None) -> 'Order':
+        return Order(store, customer, country=country, transport=transport)
 
     def __repr__(self) -> str:
-        return f"An order for {self.customer.first_name} with {len(self.data['Products']) if self.data['Products'] else 'no'} items in it"
+        return f"An order for {self.customer.first_name} with {len(self.cart) if self.cart else 'no'} items in it"
 
-    def add_item(self, code: str, qty: int = 1, options: List[str] = []) -> Dict[str, Any]:
-        item = self.menu.variants[code]
-        item.update(ID=1, isNew=True, Qty=qty, AutoRemove=False)
-        print('appending', item)
-        self.data['Products'].append(item)
-        return item
+    def add_item(self, code: str, qty: int = 1, options: Optional[Options] = None) -> LineItem:
+        """Add a variant to the cart, with optional topping overrides like {'P': '1', 'C': '0'}."""
+        return self.cart.add(self.menu.variants[code], qty, options)
 
-    def remove_item(self, code: str) -> Dict[str, Any]:
-        codes = [x['Code'] for x in self.data['Products']]
-        return self.data['Products'].pop(codes.index(code))
+    def remove_item(self, code: str) -> LineItem:
+        """Remove the first line holding code."""
+        return self.cart.remove_code(code)
 
-    def add_coupon(self, code: str, qty: int = 1) -> Dict[str, Any]:
-        item = self.menu.variants[code]
-        item.update(ID=1, isNew=True, Qty=qty, AutoRemove=False)
-        self.data['Coupons'].append(item)
-        return item
+    def remove_line(self, line_id: int) -> LineItem:
+        return self.cart.remove(line_id)
 
-    def remove_coupon(self, code: str) -> Dict[str, Any]:
-        codes = [x['Code'] for x in self.data['Coupons']]
-        return self.data['Coupons'].pop(codes.index(code))
+    def update_quantity(self, line_id: int, qty: int) -> Optional[LineItem]:
+        return self.cart.update_quantity(line_id, qty)
+
+    def add_coupon(self, code: str, qty: int = 1) -> LineItem:
+        return self.coupons.add(self.menu.variants[code], qty)
+
+    def remove_coupon(self, code: str) -> LineItem:
+        return self.coupons.remove_code(code)
 
     def changeToCarryout(self) -> None:
         self.data['ServiceMethod'] = 'Carryout'
@@ -66,36 +91,64 @@ class Order:
     def changeToDelivery(self) -> None:
         self.data['ServiceMethod'] = 'Delivery'
 
-    def _send(self, url: str, merge: bool) -> Dict[str, Any]:
+    def fingerprint(self) -> Tuple[Hashable, ...]:
+        """A hashable summary of everything that goes into the order's price."""
+        address = self.data['Address']
+        return (self.store.id, self.data['ServiceMethod'], tuple(sorted(address.items())),
+                self.cart.fingerprint(), self.coupons.fingerprint())
+
+    def _recall(self, url: str) -> Tuple[Hashable, Optional[Dict[str, Any]]]:
+        key = (url, self.fingerprint())
+        return key, self.responses.get(key)
+
+    def _remember(self, key: Hashable, json_data: Dict[str, Any]) -> None:
+        if json_data.get('Status') != -1:
+            self.responses.set(key, json_data)
+
+    def _send(self, url: str, merge: bool, memoize: bool = False,
+              payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Build the payload even when the response is recalled, so that
+        # data['Products'] always describes the cart that was priced.
+        body = payload or self._payload()
+        key, json_data = self._recall(url) if memoize else (None, None)
+        if json_data is None:
+            transport = self.transport or get_transport()
+            event = start('POST', url)
+            if event is None:
+                json_data = transport.post_json(url, body, self.headers)
+            else:
+                json_data = observe(event, transport.post_json, url, body, self.headers, event)
+            if memoize:
+                self._remember(key, json_data)
+        return self._merge(json_data, merge)
+
+    def _payload(self) -> Dict[str, Any]:
         self.data.update(
             StoreID=self.store.id,
             Email=self.customer.email,
             FirstName=self.customer.first_name,
             LastName=self.customer.last_name,
             Phone=self.customer.phone,
+            Products=self.cart.to_json(),
+            Coupons=self.coupons.to_json(),
         )
 
         for key in ('Products', 'StoreID', 'Address'):
             if key not in self.data or not self.data[key]:
                 raise Exception(f'order has invalid value for key "{key}"')
 
-        headers = {
-            'Referer': 'https://order.dominos.com/en/pages/order/',
-            'Content-Type': 'application/json'
-        }
-
-        r = requests.post(url=url, headers=headers, json={'Order': self.data})
-        r.raise_for_status()
-        json_data = r.json()
+        return {'Order': self.data}
 
+    def _merge(self, json_data: Dict[str, Any], merge: bool) -> Dict[str, Any]:
         if merge:
-            for key, value in json_data['Order'].items():
-                if value or not isinstance(value, list):
-                    self.data[key] = value
-        return json_data #type: ignore
+            order = json_data.get('Order', {})
+            for key in self.merge_fields:
+                if key in order:
+                    self.data[key] = order[key]
+        return json_data
 
     def validate(self) -> bool:
-        response = self._send(self.urls.validate_url(), True)
+        response = self._send(self.urls.validate_url(), True, memoize=True)
         return bool(response['Status'] != -1)
 
     def place(self, card: Optional[CreditCard]) -> Dict[str, Any]:
@@ -104,8 +157,11 @@ class Order:
         return response
 
     def pay_with(self, card: Optional[CreditCard]) -> Dict[str, Any]:
-        response = self._send(self.urls.price_url(), True)
+        response = self._send(self.urls.price_url(), True, memoize=True)
+        self._apply_payment(response, card)
+        return response
 
+    def _apply_payment(self, response: Dict[str, Any], card: Optional[CreditCard]) -> None:
         if response['Status'] == -1:
             raise Exception(f'get price failed: {response}')
 
@@ -127,5 +183,3 @@ class Order:
                     'PostalCode': int(card.zip)
                 }
             ]
-
-        return response
@@ -0,0 +1,171 @@
+"""Placing one order with its independent requests overlapped.
+
+Order.place and the steps before it run one request after another: find
+the store, fetch its menu, validate, price, place. An OrderPipeline runs
+them as a dependency graph instead:
+
+    locate --+-- menu ---- validate ---- price ---- place
+             +-- details ---------------------------+
+
+The menu and the store's profile are fetched together, and the profile
+keeps loading while the order is validated and priced. Price waits for
+validate, because it posts the order with the OrderID and Status that
+validate returned, as Order.validate then Order.pay_with would. Given a
+store to expect up front (store_id, or a StoreDirectory that covers the
+address), the menu and profile are fetched while the store locator is
+still answering; if the locator picks another store, they're fetched
+again for that one.
+
+Each run reports when every stage started and finished:
+
+    result = OrderPipeline().run(customer, ['14SCREEN', '2LCOKE'], card)
+    print(result.report())
+"""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, TypeVar, Union
+
+from .customer import Customer
+from .directory import StoreDirectory
+from .menu import Menu
+from .order import Order
+from .payment import CreditCard
+from .store import Store
+
+T = TypeVar('T')
+Item = Union[str, Tuple[Any, ...]]
+
+
+class Stage(NamedTuple):
+    """When a stage ran, in seconds since its pipeline started."""
+    name: str
+    start: float
+    end: float
+
+    @property
+    def elapsed(self) -> float:
+        return self.end - self.start
+
+
+class PipelineResult(NamedTuple):
+    """One order run through an OrderPipeline.
+
+    response is the place-order response, or None if the order wasn't
+    placed. prefetched is True when the menu and profile fetched for the
+    expected store could be used.
+    """
+    order: Order
+    store: Store
+    details: Dict[str, Any]
+    response: Optional[Dict[str, Any]]
+    stages: Dict[str, Stage]
+    elapsed: float
+    prefetched: bool
+
+    def report(self) -> str:
+        """The stages as a table, in the order they started, with a bar showing when each ran."""
+        width = 40
+        scale = width / self.elapsed if self.elapsed else 0
+        lines = []
+        for stage in sorted(self.stages.values(), key=lambda s: s.start):
+            start = int(stage.start * scale)
+            bar = ' ' * start + '#' * max(1, int(stage.end * scale) - start)
+            lines.append('{:<9}{:>9.1f} ms  |{:<{width}}|'.format(stage.name, stage.elapsed * 1000, bar, width=width))
+        lines.append('{:<9}{:>9.1f} ms'.format('total', self.elapsed * 1000))
+        return '\n'.join(lines)
+
+
+class OrderPipeline:
+    """Runs an order from address to placed order, overlapping what it can.
+
+    Attributes:
+        max_workers (int): Threads per run; four are enough for the widest stage
+        service (str): 'Delivery' or 'Carryout'
+        directory (StoreDirectory): Where to look up the store to expect, if given
+        lang (str): Menu language
+    """
+
+    def __init__(self, max_workers: int = 4, service: str = 'Delivery', directory: Optional[StoreDirectory] = None,
+                 lang: str = 'en', clock: Callable[[], float] = time.perf_counter) -> None:
+        self.max_workers = max_workers
+        self.service = service
+        self.directory = directory
+        self.lang = lang
+        self._clock = clock
+
+    def _expected_store(self, customer: Customer, store_id: Optional[str]) -> Optional[Store]:
+        address = customer.address
+        if store_id is not None:
+            return Store({'StoreID': str(store_id)}, address.country, address.transport)
+        coordinates = getattr(address, 'coordinates', None)
+        if self.directory is None or coordinates is None:
+            return None
+        nearest = self.directory.nearest(coordinates[0], coordinates[1], 1, self.directory.coverage)
+        return Store({'StoreID': nearest[0].store.id}, address.country, address.transport) if nearest else None
+
+    def run(self, customer: Customer, items: Iterable[Item], card: Optional[CreditCard] = None,
+            coupons: Iterable[str] = (), store_id: Optional[str] = None, place: bool = True) -> PipelineResult:
+        """Locate the customer's store, then build, validate, price and (with place) place the order.
+
+        Each item is a variant code, or a tuple of Order.add_item's
+        arguments, like ('P12IPAZA', 2, {'P': '1'}). Errors are raised as
+        Order's own methods raise them; an order the API won't validate
+        raises before it is placed.
+        """
+        started = self._clock()
+        stages: Dict[str, Stage] = {}
+        guessed: Dict[str, Stage] = {}
+
+        def timed(name: str, fn: Callable[..., T], *args: Any, into: Dict[str, Stage] = stages) -> Callable[[], T]:
+            def call() -> T:
+                start = self._clock()
+                try:
+                    return fn(*args)
+                finally:
+                    into[name] = Stage(name, start - started, self._clock() - started)
+            return call
+
+        address = customer.address
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            def prefetch(store: Store, into: Dict[str, Stage]) -> Tuple['Future[Menu]', 'Future[Dict[str, Any]]']:
+                menu = executor.submit(timed('menu', Menu.from_store, store.id, self.lang, store.country,
+                                             store.transport, into=into))
+                details = executor.submit(timed('details', store.get_details, into=into))
+                return menu, details
+
+            expected = self._expected_store(customer, store_id)
+            located = executor.submit(timed('locate', address.closest_store, self.service))
+            guess = None if expected is None else (expected.id, prefetch(expected, guessed))
+            store = located.result()
+            prefetched = guess is not None and guess[0] == store.id
+            # A guess for the wrong store is left to finish on its own;
+            # its menu still lands in the menu cache.
+            menu, details = guess[1] if guess is not None and prefetched else prefetch(store, stages)
+
+            order = Order(store, customer, country=store.country, menu=menu.result())
+            if self.service == 'Carryout':
+                order.changeToCarryout()
+            for item in items:
+                if isinstance(item, str):
+                    order.add_item(item)
+                else:
+                    order.add_item(*item)
+            for code in coupons:
+                order.add_coupon(code)
+
+            # Price posts the order as validate left it (with its OrderID
+            # and Status), exactly as validate() then pay_with() would.
+            validated = timed('validate', order._send, order.urls.validate_url(), True, True)()
+            if validated['Status'] == -1:
+                raise Exception(f'order validation failed: {validated}')
+            priced = timed('price', order._send, order.urls.price_url(), True, True)()
+            order._apply_payment(priced, card)
+
+            response = timed('place', order._send, order.urls.place_url(), False)() if place else None
+            profile = details.result()
+            if prefetched:
+                stages.update(guessed)
+            return PipelineResult(order, store, profile, response, stages, self._clock() - started, prefetched)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,119 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_toppings(default_toppings: str) -> Dict[str, str]:
+    """Turn a DefaultToppings string like 'X=1,C=1' into {'X': '1', 'C': '1'}."""
+    return dict(x.split('=', 1) for x in default_toppings.split(',') if '=' in x)
+
+
+class SearchResult(NamedTuple):
+    code: str
+    name: str
+    price: float
+    size_code: str
+    product_code: str
+    product_type: str
+    toppings: Dict[str, str]
+
+
+class MenuIndex:
+    """A search index over a menu's variants.
+
+    The index is built once, from the raw Variants and Products dicts, and
+    answers repeated queries without rescanning the menu. Names are matched
+    case-insensitively, token by token, and each query token matches any
+    name token it is a prefix of: 'pan piz' finds 'Pan Pizza'. Results can
+    be narrowed by product type, size code and price range, and are
+    returned in menu order. The variant dicts are never modified.
+    """
+
+    def __init__(self, variants: Dict[str, Any], products: Optional[Dict[str, Any]] = None) -> None:
+        products = products or {}
+        self.results: List[SearchResult] = []
+        self.by_code: Dict[str, int] = {}
+        by_token: Dict[str, Set[int]] = {}
+        self.by_type: Dict[str, Set[int]] = {}
+        self.by_size: Dict[str, Set[int]] = {}
+
+        for position, variant in enumerate(variants.values()):
+            product_code = variant.get('ProductCode', '')
+            result = SearchResult(
+                code=variant['Code'],
+                name=variant['Name'],
+                price=float(variant.get('Price') or 0),
+                size_code=variant.get('SizeCode', ''),
+                product_code=product_code,
+                product_type=products.get(product_code, {}).get('ProductType', ''),
+                toppings=parse_toppings(variant.get('Tags', {}).get('DefaultToppings', '')),
+            )
+            self.results.append(result)
+            self.by_code[result.code.upper()] = position
+            for token in tokenize(result.name):
+                by_token.setdefault(token, set()).add(position)
+            self.by_type.setdefault(result.product_type.lower(), set()).add(position)
+            self.by_size.setdefault(result.size_code.lower(), set()).add(position)
+
+        self.tokens: List[str] = sorted(by_token)
+        self.token_positions: List[Set[int]] = [by_token[token] for token in self.tokens]
+        by_price = sorted(range(len(self.results)), key=lambda i: self.results[i].price)
+        self.prices: List[float] = [self.results[i].price for i in by_price]
+        self.price_positions: List[int] = by_price
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def _prefix(self, prefix: str) -> Set[int]:
+        start = bisect_left(self.tokens, prefix)
+        end = bisect_left(self.tokens, prefix + '\U0010ffff', start)
+        if end - start == 1:
+            return self.token_positions[start]
+        matches: Set[int] = set()
+        for positions in self.token_positions[start:end]:
+            matches |= positions
+        return matches
+
+    def _price_range(self, min_price: Optional[float], max_price: Optional[float]) -> Set[int]:
+        start = 0 if min_price is None else bisect_left(self.prices, min_price)
+        end = len(self.prices) if max_price is None else bisect_right(self.prices, max_price)
+        return set(self.price_positions[start:end])
+
+    def search(
+        self,
+        name: Optional[str] = None,
+        code: Optional[str] = None,
+        product_type: Optional[str] = None,
+        size: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[SearchResult]:
+        candidates: List[Set[int]] = []
+        if code is not None:
+            position = self.by_code.get(code.upper())
+            candidates.append(set() if position is None else {position})
+        if name is not None:
+            candidates.extend(self._prefix(token) for token in tokenize(name))
+        if product_type is not None:
+            candidates.append(self.by_type.get(product_type.lower(), set()))
+        if size is not None:
+            candidates.append(self.by_size.get(size.lower(), set()))
+        if min_price is not None or max_price is not None:
+            candidates.append(self._price_range(min_price, max_price))
+
+        if not candidates:
+            return list(self.results)
+        candidates.sort(key=len)
+        matches = set(candidates[0])
+        for positions in candidates[1:]:
+            matches &= positions
+            if not matches:
+                break
+        return [self.results[i] for i in sorted(matches)]
@@ -0,0 +1,95 @@
+"""Coalescing of concurrent identical requests.
+
+When many callers ask for the same thing at once (say 50 workers starting
+orders at the same busy store, all missing the menu cache together), only
+the first one makes the request; the rest wait for it and share its
+result, or its exception. Once the call finishes the key is forgotten, so
+the next caller makes a fresh request.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class _Call(Generic[T]):
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key across threads.
+
+    Attributes:
+        calls (int): Calls made through do
+        coalesced (int): Calls that shared another call's result
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, _Call[Any]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Return fn(), or the result of a call with the same key already in flight."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value  # type: ignore
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent calls with the same key across asyncio tasks.
+
+    The shared call runs as its own task, so cancelling the caller that
+    started it doesn't cancel it for everyone else.
+
+    Attributes:
+        calls (int): Calls made through do
+        coalesced (int): Calls that shared another call's result
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, 'asyncio.Future[Any]'] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await fn(), or the result of a call with the same key already in flight."""
+        self.calls += 1
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        result: T = await asyncio.shield(task)
+        return result
@@ -0,0 +1,243 @@
+"""A compact binary snapshot of a menu, loaded with mmap.
+
+Writing a snapshot once (Menu.export_snapshot) lets a worker load the
+menu later without fetching or decoding it: opening a snapshot maps the
+file read-only and reads nothing else up front. Each section (Variants,
+Products, ...) is an index of entries in menu order plus a sorted
+permutation of them for binary search, so a lookup by code decodes just
+that one entry. Codes, category paths and the product codes under each
+category live once each in a shared string table.
+
+Since the file is mapped read-only, a pre-fork server can open every
+snapshot before forking and its workers all share the same pages.
+
+Layout, all integers little-endian uint32:
+
+    MAGIC, directory offset, directory length
+    string table:  count, count + 1 offsets, utf-8 bytes
+    each section:  count, count * (key id, value offset, value length),
+                   count sorted positions, then the values
+    directory:     JSON, {"meta": ..., "strings": offset, "sections": {name: [offset, kind]}}
+
+Values are compact JSON with each object key replaced by its string id,
+or (kind "strings") a run of string ids.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+MAGIC = b'PZSNAP1\x00'
+HEADER = struct.Struct('<8sII')
+ENTRY = struct.Struct('<III')
+UINT = struct.Struct('<I')
+
+JSON_VALUES = 'json'
+STRING_VALUES = 'strings'
+CATEGORIES = '_CategoryProducts'
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.strings: Dict[str, int] = {}
+        self.chunks: List[bytes] = []
+        self.size = HEADER.size
+
+    def intern(self, text: str) -> int:
+        return self.strings.setdefault(text, len(self.strings))
+
+    def pack(self, value: Any) -> Any:
+        """Replace every object key in value with its string id."""
+        if isinstance(value, Mapping):
+            return {str(self.intern(key)): self.pack(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.pack(item) for item in value]
+        return value
+
+    def append(self, chunk: bytes) -> int:
+        offset = self.size
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        return offset
+
+    def section(self, entries: Sequence[Tuple[str, bytes]]) -> int:
+        ids = [self.intern(key) for key, _ in entries]
+        offset = self.size
+        index_size = UINT.size + len(entries) * (ENTRY.size + UINT.size)
+        value_offset = offset + index_size
+        index = [UINT.pack(len(entries))]
+        for key_id, (_, value) in zip(ids, entries):
+            index.append(ENTRY.pack(key_id, value_offset, len(value)))
+            value_offset += len(value)
+        order = sorted(range(len(entries)), key=lambda i: entries[i][0].encode())
+        index.extend(UINT.pack(i) for i in order)
+        self.append(b''.join(index))
+        for _, value in entries:
+            self.append(value)
+        return offset
+
+    def string_table(self) -> int:
+        encoded = [text.encode() for text in self.strings]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        return self.append(UINT.pack(len(encoded)) + b''.join(UINT.pack(o) for o in offsets) + b''.join(encoded))
+
+
+def write_snapshot(path: str, data: Mapping[str, Any], categories: Optional[Mapping[str, Sequence[str]]] = None,
+                   meta: Optional[Mapping[str, Any]] = None) -> None:
+    """Write a raw menu response to path as a snapshot, atomically.
+
+    Every section of data that is an object is kept. categories maps a
+    category path to the product codes under it, as Menu.get_products
+    gives them.
+    """
+    writer = _Writer()
+    sections: Dict[str, Tuple[int, str]] = {}
+    for name, section in data.items():
+        if isinstance(section, Mapping):
+            entries = [(key, json.dumps(writer.pack(value), separators=(',', ':')).encode())
+                       for key, value in section.items()]
+            sections[name] = (writer.section(entries), JSON_VALUES)
+    if categories is not None:
+        entries = [(category, b''.join(UINT.pack(writer.intern(code)) for code in codes))
+                   for category, codes in categories.items()]
+        sections[CATEGORIES] = (writer.section(entries), STRING_VALUES)
+    strings = writer.string_table()
+    directory = json.dumps({'meta': dict(meta or {}), 'strings': strings, 'sections': sections}).encode()
+    directory_offset = writer.append(directory)
+
+    tmp = '{}.{}.tmp'.format(path, threading.get_ident())
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, directory_offset, len(directory)))
+        f.writelines(writer.chunks)
+    os.replace(tmp, path)
+
+
+class SnapshotSection(Mapping[str, Any]):
+    """One section of a snapshot, as a read-only mapping from code to entry.
+
+    Iterates in menu order. Looking a code up is a binary search over the
+    section's sorted index, and decodes only that entry, afresh each time.
+    """
+
+    def __init__(self, snapshot: 'MenuSnapshot', offset: int, kind: str) -> None:
+        self._snapshot = snapshot
+        self._buf = snapshot._buf
+        self._count: int = UINT.unpack_from(self._buf, offset)[0]
+        self._entries = offset + UINT.size
+        self._order = self._entries + self._count * ENTRY.size
+        self._kind = kind
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, position: int) -> Tuple[int, int, int]:
+        entry: Tuple[int, int, int] = ENTRY.unpack_from(self._buf, self._entries + position * ENTRY.size)
+        return entry
+
+    def _find(self, key: str) -> Optional[int]:
+        target = key.encode()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            position = UINT.unpack_from(self._buf, self._order + middle * UINT.size)[0]
+            found = self._snapshot._string_bytes(self._entry(position)[0])
+            if found == target:
+                return int(position)
+            if found < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __getitem__(self, key: str) -> Any:
+        position = self._find(key) if isinstance(key, str) else None
+        if position is None:
+            raise KeyError(key)
+        _, offset, length = self._entry(position)
+        if self._kind == STRING_VALUES:
+            return [self._snapshot.string(UINT.unpack_from(self._buf, offset + i)[0])
+                    for i in range(0, length, UINT.size)]
+        return self._snapshot._decode(self._buf[offset:offset + length])
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(self._count):
+            yield self._snapshot.string(self._entry(position)[0])
+
+
+class MenuSnapshot:
+    """A menu snapshot file, mapped read-only.
+
+    Attributes:
+        path (str): The snapshot file
+        meta (dict): Whatever was stored with it, such as its country
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError('{} is not a menu snapshot'.format(path))
+        self._buf = memoryview(self._mmap)
+        _, directory_offset, directory_length = HEADER.unpack_from(self._buf, 0)
+        directory = json.loads(bytes(self._buf[directory_offset:directory_offset + directory_length]))
+        self.meta: Dict[str, Any] = directory['meta']
+        self._strings: int = directory['strings'] + UINT.size
+        self._string_data = self._strings + (UINT.unpack_from(self._buf, directory['strings'])[0] + 1) * UINT.size
+        self._sections = {name: SnapshotSection(self, offset, kind)
+                          for name, (offset, kind) in directory['sections'].items()}
+        # Object keys are string ids; each is looked up once, and then
+        # shared by every entry decoded, so repeated keys ('Code', 'Name',
+        # ...) are stored once.
+        keys: Dict[str, str] = {}
+
+        def key(string_id: str) -> str:
+            text = keys.get(string_id)
+            if text is None:
+                text = keys[string_id] = self.string(int(string_id))
+            return text
+        self._decoder = json.JSONDecoder(object_pairs_hook=lambda pairs: {key(k): v for k, v in pairs})
+
+    def __enter__(self) -> 'MenuSnapshot':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _string_bytes(self, string_id: int) -> bytes:
+        start, end = struct.unpack_from('<II', self._buf, self._strings + string_id * UINT.size)
+        return bytes(self._buf[self._string_data + start:self._string_data + end])
+
+    def string(self, string_id: int) -> str:
+        return self._string_bytes(string_id).decode()
+
+    def _decode(self, value: memoryview) -> Any:
+        return self._decoder.decode(str(value, 'utf-8'))
+
+    def section(self, name: str) -> SnapshotSection:
+        return self._sections[name]
+
+    def data(self) -> Dict[str, SnapshotSection]:
+        """The menu's sections, in the shape of a raw menu response."""
+        return {name: section for name, section in self._sections.items() if name != CATEGORIES}
+
+    def category_products(self, path: str) -> List[str]:
+        """The codes of every product under a category path, like 'Food/Pizza'."""
+        section = self._sections.get(CATEGORIES)
+        if section is None or path not in section:
+            return []
+        codes: List[str] = section[path]
+        return codes
+
+    def close(self) -> None:
+        self._sections.clear()
+        self._buf.release()
+        self._mmap.close()
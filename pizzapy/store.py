@@ -1,43 +1,164 @@
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union,
+                    TYPE_CHECKING, overload)
 
 from .menu import Menu
+from .transport import Transport
 from .urls import Urls, COUNTRY_USA
 from .utils import request_json
 
+if TYPE_CHECKING:
+    from .directory import StoreDirectory
+
 
 class Store:
     """The interface to the Store API
 
     You can use this to find store information about stores near an
     address, or to find the closest store to an address.
+
+    A Store only keeps the fields it uses from the locator entry (or
+    profile) it was made from. Pass keep_raw=True to also keep that dict
+    as data; otherwise data is None.
     """
+    __slots__ = ('id', 'country', 'address_description', 'is_open', 'data', 'transport')
 
-    def __init__(self, data: Optional[Dict[str, Any]] = None, country: str = COUNTRY_USA) -> None:
+    def __init__(self, data: Optional[Dict[str, Any]] = None, country: str = COUNTRY_USA,
+                 transport: Optional[Transport] = None, keep_raw: bool = False) -> None:
         data = data or {}
         self.id: str = str(data.get('StoreID', -1))
         self.country: str = country
-        self.urls: Urls = Urls(country)
-        self.data: Dict[str, Any] = data
+        self.address_description: str = data.get('AddressDescription', '')
+        self.is_open: bool = bool(data.get('IsOpen', False))
+        self.data: Optional[Dict[str, Any]] = data if keep_raw else None
+        self.transport: Optional[Transport] = transport
+
+    @property
+    def urls(self) -> Urls:
+        return Urls(self.country)
 
     def __repr__(self) -> str:
         return "Store #{}\nAddress:{}\nOpen Now: {}".format(
             self.id,
-            self.data['AddressDescription'],
-            'Yes' if self.data.get('IsOpen', False) else 'No',
+            self.address_description,
+            'Yes' if self.is_open else 'No',
         )
 
     def get_details(self) -> Dict[str, Any]:
-        details = request_json(self.urls.info_url(), store_id=self.id)
+        details: Dict[str, Any] = request_json(self.urls.info_url(), transport=self.transport, conditional=True,
+                                               store_id=self.id)
         return details
 
     def place_order(self, order: Any, card: Any) -> Any:
         print('Order placed for {}'.format(order.customer.first_name))
         return order.place(card=card)
 
-    def get_menu(self, lang: str = 'en') -> Menu:
-        response = request_json(self.urls.menu_url(), store_id=self.id, lang=lang)
-        menu = Menu(response, self.country)
-        return menu
+    def get_menu(self, lang: str = 'en', refresh: bool = False, stream: bool = False) -> Menu:
+        return Menu.from_store(self.id, lang, self.country, self.transport, refresh=refresh, stream=stream)
+
+
+def is_available(service: str = 'Delivery', delivery_store: bool = False) -> Callable[[Dict[str, Any]], bool]:
+    """A filter for locator entries: online now and open for the service.
+
+    With delivery_store, delivery lookups also require IsDeliveryStore.
+    """
+    if delivery_store and service == 'Delivery':
+        return lambda x: bool(x['IsDeliveryStore'] and x['IsOnlineNow'] and x['ServiceIsOpen'][service])
+    return lambda x: bool(x['IsOnlineNow'] and x['ServiceIsOpen'][service])
+
+
+class StoreList(Sequence[Store]):
+    """The stores in a locator response that pass a filter, built as they're used.
+
+    The raw entries are filtered in one pass, only as far as the stores
+    asked for, and a Store is made for an entry only when it's accessed
+    (then kept, so stores[0] is stores[0]). Taking the closest store, or
+    the first k, never looks at the rest of the response; len() and
+    negative indexes filter all of it.
+
+    The Stores keep their raw entries as data only with keep_raw=True.
+    """
+
+    def __init__(self, entries: Sequence[Dict[str, Any]], predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 country: str = COUNTRY_USA, transport: Optional[Transport] = None, keep_raw: bool = False) -> None:
+        self.entries = entries
+        self.predicate = predicate
+        self.country = country
+        self.transport = transport
+        self.keep_raw = keep_raw
+        self._matches: List[int] = []  # positions in entries that passed the filter
+        self._scanned = 0
+        self._stores: Dict[int, Store] = {}
+
+    def _scan(self, count: Optional[int] = None) -> int:
+        """Filter entries until count of them have matched (or all, for None); return how many did."""
+        entries, predicate, matches = self.entries, self.predicate, self._matches
+        position = self._scanned
+        while position < len(entries) and (count is None or len(matches) < count):
+            if predicate is None or predicate(entries[position]):
+                matches.append(position)
+            position += 1
+        self._scanned = position
+        return len(matches)
+
+    def _store(self, index: int) -> Store:
+        store = self._stores.get(index)
+        if store is None:
+            store = self._stores[index] = Store(self.entries[self._matches[index]], self.country, self.transport,
+                                                self.keep_raw)
+        return store
+
+    def __len__(self) -> int:
+        return self._scan()
+
+    def __bool__(self) -> bool:
+        return self._scan(1) > 0
+
+    @overload
+    def __getitem__(self, index: int) -> Store: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Store]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Store, List[Store]]:
+        if isinstance(index, slice):
+            start, stop, step = index.start, index.stop, index.step
+            if stop is None or stop < 0 or (start or 0) < 0 or (step or 1) < 0:
+                self._scan()
+            else:
+                self._scan(stop)
+            return [self._store(i) for i in range(*index.indices(len(self._matches)))]
+        if index < 0:
+            index += self._scan()
+        else:
+            self._scan(index + 1)
+        if not 0 <= index < len(self._matches):
+            raise IndexError('store index out of range')
+        return self._store(index)
+
+    def __iter__(self) -> Iterator[Store]:
+        index = 0
+        while index < len(self._matches) or self._scan(index + 1) > index:
+            yield self._store(index)
+            index += 1
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def filter(self, predicate: Callable[[Dict[str, Any]], bool]) -> 'StoreList':
+        """The stores here whose raw entries also pass predicate, as another lazy StoreList."""
+        if self.predicate is None:
+            combined = predicate
+        else:
+            first = self.predicate
+            combined = lambda x: first(x) and predicate(x)  # noqa: E731
+        return StoreList(self.entries, combined, self.country, self.transport)
+
+
+class LocatorResult(NamedTuple):
+    address: Any
+    stores: List[Store]
+    error: Optional[BaseException]
 
 
 class StoreLocator:
@@ -46,16 +167,51 @@ class StoreLocator:
         return 'I locate stores and nothing else'
 
     @staticmethod
-    def nearby_stores(address: Any, service: str = 'Delivery') -> List[Store]:
+    def nearby_stores(address: Any, service: str = 'Delivery') -> StoreList:
         """Query the API to find nearby stores.
 
         nearby_stores will filter the information we receive from the API
         to exclude stores that are not currently online (!['IsOnlineNow']),
         and stores that are not currently in service (!['ServiceIsOpen']).
+        The result is a lazy StoreList.
         """
-        data = request_json(address.urls.find_url(), line1=address.line1, line2=address.line2, type=service)
-        return [Store(x, address.country) for x in data['Stores']
-                if x['IsOnlineNow'] and x['ServiceIsOpen'][service]]
+        data = address._locate(service)
+        return StoreList(data['Stores'], is_available(service), address.country, address.transport)
+
+    @staticmethod
+    def nearby_stores_batch(addresses: Iterable[Any], service: str = 'Delivery',
+                            max_workers: int = 10) -> Iterator[LocatorResult]:
+        """Find nearby stores for many addresses at once.
+
+        Lookups run concurrently on up to max_workers threads, and results
+        are yielded as they finish, one LocatorResult per address. An
+        address whose lookup failed gets an empty store list and the
+        exception in error, without stopping the rest of the batch.
+        Addresses that normalize to the same line1, line2 and country are
+        only looked up once.
+
+        Each lookup is Address.nearby_stores, so keep max_workers within
+        the transport's pool_maxsize to reuse connections.
+        """
+        pending: Dict[Tuple[str, str, str, str], List[Any]] = {}
+        for address in addresses:
+            pending.setdefault(address.locator_key(service), []).append(address)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            # The StoreList is materialized in the worker, so that a bad
+            # entry fails that address's future rather than the generator.
+            futures = {
+                executor.submit(lambda address: list(address.nearby_stores(service)), group[0]): group
+                for group in pending.values()
+            }
+            for future in as_completed(futures):
+                error = future.exception()
+                stores = [] if error else future.result()
+                for address in futures[future]:
+                    yield LocatorResult(address, list(stores), error)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     @staticmethod
     def find_closest_store_to_customer(customer: Any, service: str = 'Delivery') -> Store:
@@ -65,8 +221,18 @@ class StoreLocator:
         return stores[0]
 
     @staticmethod
-    def find_k_closest_stores_to_customer(customer: Any, k: int, service: str = "Delivery") -> List[Store]:
-        stores = StoreLocator.nearby_stores(customer.address, service=service)
+    def find_k_closest_stores_to_customer(customer: Any, k: int, service: str = "Delivery",
+                                          directory: Optional['StoreDirectory'] = None) -> List[Store]:
+        """The k stores closest to the customer's address.
+
+        With a StoreDirectory, addresses it covers are answered from it
+        without calling the store locator.
+        """
+        stores: Sequence[Store]
+        if directory is not None:
+            stores = directory.nearby_stores(customer.address, k, service)
+        else:
+            stores = StoreLocator.nearby_stores(customer.address, service=service)
         if not stores:
             raise Exception('No local stores are currently open')
-        return stores[:k]
+        return list(stores[:k])
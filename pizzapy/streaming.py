@@ -0,0 +1,177 @@
+"""Incremental parsing of large JSON objects, like the structured menu.
+
+The menu response is one JSON object whose members (Variants, Products,
+Coupons, Categorization, ...) are each a large object of their own. Rather
+than buffering the whole body and decoding it in one go, iter_members reads
+the stream a chunk at a time and decodes one member at a time; with
+depth=2 it also builds each member object entry by entry, so only one
+entry's text is ever buffered. Members the caller skips are scanned over
+without being decoded, and dropped from the buffer as they are read.
+"""
+import codecs
+import json
+import re
+from typing import Any, Collection, Dict, IO, Iterable, Iterator, Optional, Tuple, Union
+
+Stream = Union[IO[bytes], IO[str], Iterable[bytes]]
+
+CHUNK_SIZE = 64 * 1024
+TOKENS = re.compile(r'["\\{}\[\],]')
+STRING_TOKENS = re.compile(r'["\\]')
+WHITESPACE = ' \t\n\r'
+
+
+def _chunks(stream: Stream, chunk_size: int) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    if hasattr(stream, 'read'):
+        def read() -> Any:
+            return stream.read(chunk_size)
+        chunks: Iterable[Any] = iter(read, b'')
+    else:
+        chunks = stream
+    for chunk in chunks:
+        if not chunk:
+            break
+        yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class _Reader:
+    def __init__(self, stream: Stream, chunk_size: int) -> None:
+        self.chunks = _chunks(stream, chunk_size)
+        self.buf = ''
+        self.pos = 0
+        # Each entry is decoded on its own, so json's per-call key memo
+        # doesn't help: share one memo so repeated keys ('Code', 'Name',
+        # ...) are stored once across the whole menu.
+        keys: Dict[str, str] = {}
+        self.decode = json.JSONDecoder(
+            object_pairs_hook=lambda pairs: {keys.setdefault(k, k): v for k, v in pairs}).decode
+
+    def fill(self) -> bool:
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError('unexpected end of JSON stream')
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError('expected {!r} at offset {}, got {!r}'.format(char, self.pos, self.buf[self.pos]))
+        self.pos += 1
+
+    def _discard(self, scan: int) -> int:
+        self.buf = self.buf[scan:]
+        self.pos = 0
+        return 0
+
+    def value_end(self, discard: bool = False) -> int:
+        """Find where the JSON value starting at pos ends, reading as needed.
+
+        With discard, the text scanned so far is dropped before each read,
+        so a value that won't be decoded is never buffered whole; pos then
+        no longer points at the value's start.
+        """
+        self.peek()
+        depth = 0
+        in_string = False
+        scan = self.pos
+        while True:
+            match = (STRING_TOKENS if in_string else TOKENS).search(self.buf, scan)
+            if match is None:
+                scan = len(self.buf)
+                if discard:
+                    scan = self._discard(scan)
+                if not self.fill():
+                    if depth == 0 and not in_string:
+                        return len(self.buf)
+                    raise ValueError('unexpected end of JSON stream')
+                continue
+            char = match.group()
+            scan = match.end()
+            if in_string:
+                if char == '\\':
+                    if scan >= len(self.buf):
+                        if discard:
+                            scan = self._discard(scan)
+                        if not self.fill():
+                            raise ValueError('unexpected end of JSON stream')
+                    scan += 1
+                elif char == '"':
+                    in_string = False
+                    if depth == 0:
+                        return scan
+            elif char == '"':
+                in_string = True
+            elif char in '{[':
+                depth += 1
+            elif char in '}]':
+                if depth == 0:
+                    return match.start()
+                depth -= 1
+                if depth == 0:
+                    return scan
+            elif char == ',' and depth == 0:
+                return match.start()
+
+    def value(self, decode: bool = True) -> Any:
+        end = self.value_end(discard=not decode)
+        value = self.decode(self.buf[self.pos:end]) if decode else None
+        if end > CHUNK_SIZE and end * 2 > len(self.buf):
+            self.buf = self.buf[end:]
+            end = 0
+        self.pos = end
+        return value
+
+    def members(self) -> Iterator[str]:
+        """Yield each key of the object starting at pos, leaving pos at its value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+
+def iter_members(stream: Stream, skip: Collection[str] = (), keep: Optional[Collection[str]] = None,
+                 depth: int = 1, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """Yield (key, value) for each member of the top-level JSON object.
+
+    stream can be a binary or text file, or an iterable of bytes chunks
+    such as requests' Response.iter_content(). Members named in skip, or
+    missing from keep if it is given, are not decoded or yielded. With
+    depth=2, member values that are objects are built entry by entry
+    instead of being decoded in one piece.
+    """
+    reader = _Reader(stream, chunk_size)
+    for key in reader.members():
+        if key in skip or (keep is not None and key not in keep):
+            reader.value(decode=False)
+        elif depth > 1 and reader.peek() == '{':
+            yield key, {name: reader.value() for name in reader.members()}
+        else:
+            yield key, reader.value()
+
+
+def load_menu(stream: Stream, skip: Collection[str] = (), keep: Optional[Collection[str]] = None,
+              chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """Read a structured menu response from a stream, without the skipped sections."""
+    return dict(iter_members(stream, skip, keep, depth=2, chunk_size=chunk_size))
@@ -1,29 +1,141 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+from xml.parsers import expat
+
+from .instrumentation import observe, start
+from .transport import Transport, get_transport
 from .urls import Urls, COUNTRY_USA
-from .utils import request_xml, request_json
+from .utils import request_json
 
 
-def track_by_phone(phone, country=COUNTRY_USA):
-    """Query the API to get tracking information.
+class OrderStatus(NamedTuple):
+    """One order in a track_by_phone response.
 
-    Not quite sure what this gets you - problem to solve for next time I get pizza. 
+    Times are the tracker's local ISO timestamps, as strings; fields the
+    tracker left empty are None.
     """
-    phone = str(phone).strip()
-    data = request_xml(
-        Urls(country).track_by_phone(), 
-        phone=phone
-    )['soap:Envelope']['soap:Body']
+    store_id: Optional[str] = None
+    order_id: Optional[str] = None
+    order_key: Optional[str] = None
+    phone: Optional[str] = None
+    service_method: Optional[str] = None
+    status: Optional[str] = None
+    description: Optional[str] = None
+    start_time: Optional[str] = None
+    make_time: Optional[str] = None
+    oven_time: Optional[str] = None
+    rack_time: Optional[str] = None
+    route_time: Optional[str] = None
+    delivery_time: Optional[str] = None
+    driver_id: Optional[str] = None
+    driver_name: Optional[str] = None
+
+
+# Tracker XML element -> OrderStatus field. Other elements are skipped.
+STATUS_FIELDS = {
+    'StoreID': 'store_id',
+    'OrderID': 'order_id',
+    'OrderKey': 'order_key',
+    'Phone': 'phone',
+    'ServiceMethod': 'service_method',
+    'OrderStatus': 'status',
+    'OrderDescription': 'description',
+    'StartTime': 'start_time',
+    'MakeTime': 'make_time',
+    'OvenTime': 'oven_time',
+    'RackTime': 'rack_time',
+    'RouteTime': 'route_time',
+    'DeliveryTime': 'delivery_time',
+    'DriverID': 'driver_id',
+    'DriverName': 'driver_name',
+}
+
+
+class _TrackerParser:
+    """Pulls the OrderStatus records out of a tracker SOAP response.
+
+    Runs on expat callbacks as the response is fed in, and only keeps the
+    text of the fields in STATUS_FIELDS, so the envelope is never built
+    as a tree.
+    """
+
+    def __init__(self) -> None:
+        self.parser = expat.ParserCreate(namespace_separator='}')
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+        self.parser.CharacterDataHandler = self.data
+        self.path: List[str] = []
+        self.statuses: List[OrderStatus] = []
+        self.record: Optional[Dict[str, Optional[str]]] = None
+        self.depth = 0
+        self.field: Optional[str] = None
+        self.text: List[str] = []
+
+    def start(self, name: str, attrs: Dict[str, str]) -> None:
+        local = name.rpartition('}')[2]
+        if self.record is not None and len(self.path) == self.depth:
+            self.field = STATUS_FIELDS.get(local)
+            self.text = []
+        elif local == 'OrderStatus' and self.path and self.path[-1] == 'OrderStatuses':
+            self.record = {}
+            self.depth = len(self.path) + 1
+        self.path.append(local)
+
+    def end(self, name: str) -> None:
+        self.path.pop()
+        if self.record is None:
+            return
+        if len(self.path) == self.depth:
+            if self.field is not None:
+                self.record[self.field] = ''.join(self.text) or None
+                self.field = None
+        elif len(self.path) == self.depth - 1:
+            self.statuses.append(OrderStatus(**self.record))
+            self.record = None
 
-    response = data['GetTrackerDataResponse']['OrderStatuses']['OrderStatus']
+    def data(self, text: str) -> None:
+        if self.field is not None:
+            self.text.append(text)
 
-    return response
+    def feed(self, chunk: bytes, final: bool = False) -> None:
+        self.parser.Parse(chunk, final)
 
 
-def track_by_order(store_id, order_key, country=COUNTRY_USA):
+def parse_order_statuses(body: Union[bytes, Iterable[bytes]]) -> List[OrderStatus]:
+    """Parse a track_by_phone response into a list of OrderStatus.
+
+    body is the raw XML, or an iterable of chunks of it, as they arrive.
+    A response holding one order and one holding several both give a
+    list; one holding none gives an empty list.
+    """
+    parser = _TrackerParser()
+    for chunk in [body] if isinstance(body, bytes) else body:
+        parser.feed(chunk)
+    parser.feed(b'', final=True)
+    return parser.statuses
+
+
+def track_by_phone(phone: str, country: str = COUNTRY_USA, transport: Optional[Transport] = None) -> List[OrderStatus]:
+    """Query the API to get tracking information.
+
+    Returns the status of each of the phone number's current orders.
+    """
+    phone = str(phone).strip()
+    template = Urls(country).track_by_phone()
+    url = template.format(phone=phone)
+    transport = transport or get_transport()
+    event = start('GET', template, url)
+    if event is None:
+        return parse_order_statuses(transport.get_stream(url))
+    return observe(event, lambda: parse_order_statuses(transport.get_stream(url, event=event)))
+
+
+def track_by_order(store_id, order_key, country=COUNTRY_USA, transport=None):
     """Query the API to get tracking information.
     """
     return request_json(
         Urls(country).track_by_order(),
+        transport=transport,
         store_id=store_id,
         order_key=order_key
     )
-
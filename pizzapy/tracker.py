@@ -0,0 +1,271 @@
+"""Following many orders at once.
+
+A Tracker holds any number of subscriptions, by (store_id, order_key) or
+by phone number, and polls them all from one asyncio scheduler. How
+often an order is polled depends on its last status: slowly while it is
+being made and baked, quickly once it is out the door. Intervals are
+jittered so that orders tracked together don't stay in lockstep, and at
+most `concurrency` polls are in flight at once. Orders are dropped once
+they reach a finished status.
+
+Status changes go to callbacks registered with on_change, and to anyone
+iterating over changes():
+
+    tracker = Tracker(client)
+    tracker.track_order('4336', order_key)
+    async for change in tracker.changes():
+        print(change.target, change.old, '->', change.new)
+
+Polling goes through an AsyncClient, which needs aiohttp
+(pip install pizzapy[async]).
+"""
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import random
+from typing import Any, AsyncIterator, Callable, Collection, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from .urls import COUNTRY_USA
+
+INTERVALS: Mapping[str, float] = {
+    'Order Placed': 30.0,
+    'Prep': 30.0,
+    'Bake': 60.0,
+    'Quality Check': 20.0,
+    'Out the Door': 10.0,
+    'Routing Station': 10.0,
+}
+FINISHED: Collection[str] = frozenset(['Complete', 'Delivered', 'Cancelled', 'Void'])
+
+logger = logging.getLogger(__name__)
+
+
+class Target(NamedTuple):
+    """What a subscription follows: an order (store_id, order_key) or a phone."""
+    store_id: Optional[str]
+    order_key: Optional[str]
+    phone: Optional[str]
+    country: str
+
+
+class StatusChange(NamedTuple):
+    """A tracked order's status changed, or tracking it failed for good.
+
+    new is None, and error is set, when the target was dropped after too
+    many failed polls in a row.
+    """
+    target: Target
+    old: Optional[str]
+    new: Optional[str]
+    data: Any
+    error: Optional[BaseException]
+
+
+def status_of(data: Any) -> Optional[str]:
+    """The status in a tracker response: the latest one if there are several."""
+    if isinstance(data, list):
+        data = data[-1] if data else None
+    if data is None:
+        return None
+    if isinstance(data, Mapping):
+        status = data.get('OrderStatus')
+    else:
+        status = getattr(data, 'status', None)
+    return None if status is None else str(status)
+
+
+class _Subscription:
+    __slots__ = ('target', 'status', 'errors')
+
+    def __init__(self, target: Target) -> None:
+        self.target = target
+        self.status: Optional[str] = None
+        self.errors = 0
+
+
+class Tracker:
+    """Polls many tracked orders from one asyncio scheduler.
+
+    Attributes:
+        concurrency (int): Most polls in flight at once
+        intervals (Mapping): Seconds between polls, by last status
+        default_interval (float): Seconds between polls for other statuses
+        jitter (float): Each interval is scaled by a random 1 +/- jitter
+        finished (Collection): Statuses after which an order is dropped
+        max_errors (int): Failed polls in a row before an order is dropped
+        polls (int): Polls made so far
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        concurrency: int = 20,
+        intervals: Optional[Mapping[str, float]] = None,
+        default_interval: float = 30.0,
+        jitter: float = 0.1,
+        finished: Collection[str] = FINISHED,
+        max_errors: int = 5,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.client = client
+        self.concurrency = concurrency
+        self.intervals = INTERVALS if intervals is None else intervals
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.finished = finished
+        self.max_errors = max_errors
+        self.polls = 0
+        self._rng = rng or random.Random()
+        self._subscriptions: Dict[Target, _Subscription] = {}
+        self._heap: List[Tuple[float, int, _Subscription]] = []
+        self._counter = itertools.count()
+        self._callbacks: List[Callable[[StatusChange], Any]] = []
+        self._queues: List['asyncio.Queue[Optional[StatusChange]]'] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._running = False
+        self._stopped = False
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def _now(self) -> float:
+        try:
+            return asyncio.get_running_loop().time()
+        except RuntimeError:
+            return 0.0
+
+    def _schedule(self, subscription: _Subscription, delay: float) -> None:
+        heapq.heappush(self._heap, (self._now() + delay, next(self._counter), subscription))
+        if self._wake is not None:
+            self._wake.set()
+
+    def _add(self, target: Target) -> Target:
+        if target not in self._subscriptions:
+            subscription = self._subscriptions[target] = _Subscription(target)
+            self._schedule(subscription, 0)
+        return target
+
+    def track_order(self, store_id: str, order_key: str, country: str = COUNTRY_USA) -> Target:
+        return self._add(Target(str(store_id), order_key, None, country))
+
+    def track_phone(self, phone: str, country: str = COUNTRY_USA) -> Target:
+        return self._add(Target(None, None, str(phone).strip(), country))
+
+    def untrack(self, target: Target) -> None:
+        self._subscriptions.pop(target, None)
+
+    def on_change(self, callback: Callable[[StatusChange], Any]) -> None:
+        """Call callback(change) on every status change. It may be a coroutine function.
+
+        A callback that raises is logged and doesn't stop the tracker.
+        """
+        self._callbacks.append(callback)
+
+    def interval(self, status: Optional[str]) -> float:
+        base = self.intervals.get(status or '', self.default_interval)
+        return base * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _emit(self, change: StatusChange) -> None:
+        for queue in self._queues:
+            queue.put_nowait(change)
+        for callback in self._callbacks:
+            try:
+                result = callback(change)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception('on_change callback %r failed', callback)
+
+    async def _poll(self, subscription: _Subscription, semaphore: asyncio.Semaphore) -> None:
+        target = subscription.target
+        async with semaphore:
+            self.polls += 1
+            try:
+                if target.phone is not None:
+                    data = await self.client.track_by_phone(target.phone, target.country)
+                else:
+                    data = await self.client.track_by_order(target.store_id, target.order_key, target.country)
+            except Exception as e:
+                subscription.errors += 1
+                if subscription.errors >= self.max_errors:
+                    self.untrack(target)
+                    await self._emit(StatusChange(target, subscription.status, None, None, e))
+                else:
+                    self._schedule(subscription, self.interval(subscription.status))
+                return
+
+        subscription.errors = 0
+        status = status_of(data)
+        if status is not None and status in self.finished:
+            self.untrack(target)
+        elif target in self._subscriptions:
+            self._schedule(subscription, self.interval(status))
+        if status != subscription.status:
+            old, subscription.status = subscription.status, status
+            await self._emit(StatusChange(target, old, status, data, None))
+
+    async def run(self) -> None:
+        """Poll until every subscription has finished, or stop() is called."""
+        if self._running:
+            raise RuntimeError('Tracker is already running')
+        own_client = self.client is None
+        if own_client:
+            from .aio import AsyncClient
+            self.client = AsyncClient()
+        self._running = True
+        self._stopped = False
+        self._wake = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: 'set[asyncio.Future[None]]' = set()
+        try:
+            while (self._subscriptions or tasks) and not self._stopped:
+                now = self._now()
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, subscription = heapq.heappop(self._heap)
+                    if self._subscriptions.get(subscription.target) is subscription:
+                        tasks.add(asyncio.ensure_future(self._poll(subscription, semaphore)))
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._wake.clear()
+                wake = asyncio.ensure_future(self._wake.wait())
+                done, _ = await asyncio.wait(tasks | {wake}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                wake.cancel()
+                for task in done - {wake}:
+                    tasks.discard(task)
+                    task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._running = False
+            self._wake = None
+            for queue in self._queues:
+                queue.put_nowait(None)
+            if own_client:
+                await self.client.close()
+                self.client = None
+
+    def stop(self) -> None:
+        """Make run() return after the polls in flight are cancelled."""
+        self._stopped = True
+        if self._wake is not None:
+            self._wake.set()
+
+    async def changes(self) -> AsyncIterator[StatusChange]:
+        """Yield status changes as they happen, running the poller if it isn't already."""
+        queue: 'asyncio.Queue[Optional[StatusChange]]' = asyncio.Queue()
+        self._queues.append(queue)
+        runner = None if self._running else asyncio.ensure_future(self.run())
+        try:
+            while True:
+                change = await queue.get()
+                if change is None:
+                    break
+                yield change
+            if runner is not None:
+                await runner
+        finally:
+            self._queues.remove(queue)
+            if runner is not None and not runner.done():
+                self.stop()
+                await runner
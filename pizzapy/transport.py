@@ -0,0 +1,251 @@
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, NamedTuple, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache import TTLCache
+from .codec import JsonCodec, default_codec
+from .instrumentation import RequestEvent
+from .singleflight import SingleFlight
+from .streaming import CHUNK_SIZE
+
+
+Timeout = Union[float, Tuple[float, float]]
+
+DEFAULT_TIMEOUT: Timeout = (3.05, 30)
+
+
+class Validated(NamedTuple):
+    """A response's value, with the ETag and Last-Modified it came with."""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    value: Any
+
+
+class Transport:
+    """A pooled HTTP transport shared by every call to the API.
+
+    The Transport wraps a requests.Session so that store lookups, menu
+    fetches and order calls reuse keep-alive connections instead of paying
+    for a new TCP+TLS handshake on every request. Connection pools are
+    sized per host, and idempotent requests (GET) are retried with
+    exponential backoff on connection errors and 5xx responses. POSTs are
+    never retried by the transport, so placing an order can't happen twice.
+
+    Pass a Transport to Address, Store, Order or the track functions to
+    route their calls through it, or use set_transport to replace the
+    process-wide default.
+
+    For conditional requests the Transport remembers each URL's ETag and
+    Last-Modified validators along with the decoded response, and answers
+    a 304 Not Modified with that response instead of downloading and
+    decoding the body again. Callers that keep parsed values themselves,
+    like Menu.from_store with the menu cache, use get_validated instead.
+
+    Identical JSON GETs made at the same time from different threads are
+    coalesced: one request goes out and every caller gets its (parsed)
+    result. Pass single_flight=False to turn this off.
+
+    Attributes:
+        session (requests.Session): The pooled session
+        timeout (float, tuple): (connect, read) timeout for every request
+        codec (JsonCodec): Decodes responses and encodes request bodies
+        validators (TTLCache): Validators and decoded responses, by URL
+        not_modified (int): Conditional requests answered with a 304
+        flights (SingleFlight): Coalesces concurrent GETs, or None
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        retries: int = 3,
+        backoff_factor: float = 0.3,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        headers: Optional[Dict[str, str]] = None,
+        max_validators: int = 256,
+        codec: Optional[JsonCodec] = None,
+        single_flight: bool = True,
+    ) -> None:
+        self.session: requests.Session = session or requests.Session()
+        self.timeout: Timeout = timeout
+        self.codec: JsonCodec = codec or default_codec
+        self.validators: TTLCache[Validated] = TTLCache(maxsize=max_validators, ttl=float('inf'))
+        self.not_modified = 0
+        self.flights: Optional[SingleFlight] = SingleFlight() if single_flight else None
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def __enter__(self) -> 'Transport':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def get_json(self, url: str, conditional: bool = False, parse: Optional[Callable[[Any], Any]] = None,
+                 event: Optional[RequestEvent] = None) -> Any:
+        """GET a URL and return its decoded JSON, run through parse if given.
+
+        If conditional is set, the request carries If-None-Match and
+        If-Modified-Since from the last response for this URL, and a 304
+        returns the JSON decoded from that response. Only the decoded JSON
+        is kept, so parse runs again for every caller.
+
+        Concurrent calls for the same URL with the same conditional and
+        parse share one request, and the value parsed by whichever of them
+        went first.
+
+        With an event, its status, size, network and parse times are
+        filled in (see pizzapy.instrumentation).
+        """
+        if self.flights is None:
+            return self._get_json(url, conditional, parse, event)
+        return self.flights.do((url, conditional, parse), lambda: self._get_json(url, conditional, parse, event))
+
+    def _get_json(self, url: str, conditional: bool, parse: Optional[Callable[[Any], Any]],
+                  event: Optional[RequestEvent] = None) -> Any:
+        if not conditional:
+            return self._fetch(url, None, parse, event).value
+        validated = self._fetch(url, self.validators.get(url), None, event)
+        if validated.etag or validated.last_modified:
+            self.validators.set(url, validated)
+        return validated.value if parse is None else parse(validated.value)
+
+    def get_validated(self, url: str, previous: Optional[Validated] = None,
+                      parse: Optional[Callable[[Any], Any]] = None, event: Optional[RequestEvent] = None,
+                      key: Optional[Hashable] = None) -> Validated:
+        """GET a URL, revalidating an earlier response to it.
+
+        previous is what an earlier call returned, or None. If the API
+        answers 304 Not Modified, previous is returned as it is; otherwise
+        the new response's JSON, run through parse if given, comes back
+        with its ETag and Last-Modified. The Transport keeps none of it,
+        so the caller decides how long a value and its validators live.
+
+        Concurrent calls with the same key share one request. Without a
+        key, calls share one when they have the same url, validators and
+        parse.
+        """
+        if self.flights is None:
+            return self._fetch(url, previous, parse, event)
+        if key is None:
+            key = (url, None, None, parse) if previous is None else (url, previous.etag, previous.last_modified, parse)
+        return self.flights.do(key, lambda: self._fetch(url, previous, parse, event))
+
+    def _fetch(self, url: str, previous: Optional[Validated], parse: Optional[Callable[[Any], Any]],
+               event: Optional[RequestEvent] = None) -> Validated:
+        headers = {}
+        if previous is not None:
+            if previous.etag:
+                headers['If-None-Match'] = previous.etag
+            if previous.last_modified:
+                headers['If-Modified-Since'] = previous.last_modified
+
+        started = time.perf_counter() if event is not None else 0.0
+        response = self.get(url, headers=headers)
+        if event is not None:
+            received = time.perf_counter()
+            event.responded(response.status_code, len(response.content), received - started)
+        if response.status_code == 304 and previous is not None:
+            self.not_modified += 1
+            if event is not None:
+                event.parse_time = 0.0
+            return previous
+        response.raise_for_status()
+
+        value = self.codec.loads(response.content)
+        if parse is not None:
+            value = parse(value)
+        if event is not None:
+            event.parse_time = time.perf_counter() - received
+        return Validated(response.headers.get('ETag'), response.headers.get('Last-Modified'), value)
+
+    def get_stream(self, url: str, chunk_size: int = CHUNK_SIZE,
+                   event: Optional[RequestEvent] = None) -> Iterator[bytes]:
+        """GET a URL and yield its body in chunks, without buffering it.
+
+        The connection goes back to the pool once the body has been read
+        or the iterator is closed. With an event, the time spent waiting
+        for the response and each chunk is its network time.
+        """
+        started = time.perf_counter() if event is not None else 0.0
+        response = self.get(url, stream=True)
+        if event is not None:
+            event.responded(response.status_code, 0, time.perf_counter() - started)
+        try:
+            response.raise_for_status()
+            if event is None:
+                yield from response.iter_content(chunk_size)
+                return
+            chunks = response.iter_content(chunk_size)
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                event.network_time = (event.network_time or 0.0) + time.perf_counter() - started
+                if chunk is None:
+                    break
+                event.bytes += len(chunk)
+                yield chunk
+        finally:
+            response.close()
+
+    def post_json(self, url: str, body: Any, headers: Optional[Dict[str, str]] = None,
+                  event: Optional[RequestEvent] = None) -> Any:
+        """POST body as JSON and return the decoded JSON response."""
+        headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+        data = self.codec.dumps(body)
+        started = time.perf_counter() if event is not None else 0.0
+        response = self.post(url, headers=headers, data=data)
+        if event is not None:
+            received = time.perf_counter()
+            event.responded(response.status_code, len(response.content), received - started)
+        response.raise_for_status()
+        value = self.codec.loads(response.content)
+        if event is not None:
+            event.parse_time = time.perf_counter() - received
+        return value
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_transport: Optional[Transport] = None
+
+
+def get_transport() -> Transport:
+    """Return the process-wide default Transport, creating it on first use."""
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = Transport()
+    return _default_transport
+
+
+def set_transport(transport: Optional[Transport]) -> None:
+    """Replace the process-wide default Transport.
+
+    Passing None drops the current default; a fresh one is created the
+    next time it is needed.
+    """
+    global _default_transport
+    _default_transport = transport
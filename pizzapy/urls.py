@@ -1,43 +1,97 @@
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
 COUNTRY_USA = 'us'
 COUNTRY_CANADA = 'ca'
 DOMAIN_BASE_US = 'https://order.dominos.com/'
 DOMAIN_BASE_CA = 'https://order.dominos.ca/'
+TRACKER_BASE_US = 'https://trkweb.dominos.com/'
+TRACKER_BASE_CA = 'https://trkweb.dominos.ca/'
+
+API_PATHS = {
+    'find_url' : 'power/store-locator?s={line1}&c={line2}&type={type}',
+    'info_url' : 'power/store/{store_id}/profile',
+    'menu_url' : 'power/store/{store_id}/menu?lang={lang}&structured=true',
+    'place_url' : 'power/place-order',
+    'price_url' : 'power/price-order',
+    'validate_url' : 'power/validate-order',
+    'coupon_url' : 'power/store/{store_id}/coupon/{couponid}?lang={lang}',
+}
+TRACKER_PATHS = {
+    'track_by_order' : 'orderstorage/GetTrackerData?StoreID={store_id}&OrderKey={order_key}',
+    'track_by_phone' : 'orderstorage/GetTrackerData?Phone={phone}',
+}
+
+_tables: Dict[str, Mapping[str, str]] = {}
+_instances: Dict[Tuple[type, str], 'Urls'] = {}
+_endpoints: Dict[str, Tuple[str, str]] = {}
+
+
+def register_country(country: str, base_url: str, tracker_url: Optional[str] = None) -> None:
+    """Register the endpoints for a country, or replace them.
+
+    Every endpoint is built once from base_url (and tracker_url for the
+    tracking endpoints, defaulting to base_url), so pointing a country at
+    a staging host or a local stub server is one call:
+
+        register_country('stub', 'http://127.0.0.1:8080/')
+        address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408', country='stub')
+    """
+    base_url = base_url if base_url.endswith('/') else base_url + '/'
+    tracker_url = tracker_url or base_url
+    tracker_url = tracker_url if tracker_url.endswith('/') else tracker_url + '/'
+    table = {name: base_url + path for name, path in API_PATHS.items()}
+    table.update((name, tracker_url + path) for name, path in TRACKER_PATHS.items())
+    for url in _tables.get(country, {}).values():
+        if _endpoints.get(url, ('',))[0] == country:
+            del _endpoints[url]
+    _tables[country] = MappingProxyType(table)
+    _endpoints.update((url, (country, name)) for name, url in table.items())
+
+
+def endpoint_of(url: str) -> Optional[Tuple[str, str]]:
+    """The (country, name) of an endpoint's URL template, like ('us', 'menu_url'), or None."""
+    return _endpoints.get(url)
+
+
+register_country(COUNTRY_USA, DOMAIN_BASE_US, TRACKER_BASE_US)
+register_country(COUNTRY_CANADA, DOMAIN_BASE_CA, TRACKER_BASE_CA)
+
 
 class Urls(object):
     """URLs for doing different things to the API.
 
-    This initializes some dicts that contain country-unique information
-    on how to interact with the API, and some getter methods for getting
-    to that information. These are handy to pass as a first argument to
+    There is one immutable endpoint table per country, built when the
+    country is registered (see register_country), and one shared Urls
+    object per country: Urls('us') always returns the same instance, so
+    holding one costs a reference. The getter methods return URL
+    templates that are handy to pass as a first argument to
     pizzapy.utils.request_[xml|json].
     """
-    def __init__(self, country: str=COUNTRY_USA) -> None:
-
-        self.country = country
-        self.urls = {
-            COUNTRY_USA: {
-                'find_url' : 'https://order.dominos.com/power/store-locator?s={line1}&c={line2}&type={type}',
-                'info_url' : 'https://order.dominos.com/power/store/{store_id}/profile',
-                'menu_url' : 'https://order.dominos.com/power/store/{store_id}/menu?lang={lang}&structured=true',
-                'place_url' : 'https://order.dominos.com/power/place-order',
-                'price_url' : 'https://order.dominos.com/power/price-order',
-                'track_by_order' : 'https://trkweb.dominos.com/orderstorage/GetTrackerData?StoreID={store_id}&OrderKey={order_key}',
-                'track_by_phone' : 'https://trkweb.dominos.com/orderstorage/GetTrackerData?Phone={phone}',
-                'validate_url' : 'https://order.dominos.com/power/validate-order',
-                'coupon_url' : 'https://order.dominos.com/power/store/{store_id}/coupon/{couponid}?lang={lang}',
-            },
-            COUNTRY_CANADA: {
-                'find_url' : 'https://order.dominos.ca/power/store-locator?s={line1}&c={line2}&type={type}',
-                'info_url' : 'https://order.dominos.ca/power/store/{store_id}/profile',
-                'menu_url' : 'https://order.dominos.ca/power/store/{store_id}/menu?lang={lang}&structured=true',
-                'place_url' : 'https://order.dominos.ca/power/place-order',
-                'price_url' : 'https://order.dominos.ca/power/price-order',
-                'track_by_order' : 'https://trkweb.dominos.ca/orderstorage/GetTrackerData?StoreID={store_id}&OrderKey={order_key}',
-                'track_by_phone' : 'https://trkweb.dominos.ca/orderstorage/GetTrackerData?Phone={phone}',
-                'validate_url' : 'https://order.dominos.ca/power/validate-order',
-                'coupon_url' : 'https://order.dominos.ca/power/store/{store_id}/coupon/{couponid}?lang={lang}',
-            }
-        }
+    __slots__ = ('country', 'urls')
+
+    country: str
+    urls: Mapping[str, Mapping[str, str]]
+
+    def __new__(cls, country: str = COUNTRY_USA) -> 'Urls':
+        instance = _instances.get((cls, country))
+        if instance is None:
+            if country not in _tables:
+                raise ValueError('Unknown country {!r}, see pizzapy.urls.register_country'.format(country))
+            instance = super().__new__(cls)
+            object.__setattr__(instance, 'country', country)
+            object.__setattr__(instance, 'urls', MappingProxyType(_tables))
+            instance = _instances.setdefault((cls, country), instance)
+        return instance
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Urls objects are shared and immutable')
+
+    def __reduce__(self) -> Tuple[type, Tuple[str]]:
+        return (type(self), (self.country,))
+
+    def __repr__(self) -> str:
+        return 'Urls({!r})'.format(self.country)
 
     def find_url(self) -> str:
         return self.urls[self.country]['find_url']
@@ -65,6 +119,3 @@ class Urls(object):
 
     def coupon_url(self) -> str:
         return self.urls[self.country]['coupon_url']
-
-
-
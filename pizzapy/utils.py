@@ -1,33 +1,77 @@
-from typing import Any, Dict, Union
-import requests
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Union
 import xmltodict
 
-def request_json(url: str, **kwargs: Any) -> Dict[str, Any]:
+from .instrumentation import RequestEvent, observe, start
+from .transport import Transport, Validated, get_transport
+
+def request_json(url: str, transport: Optional[Transport] = None, conditional: bool = False,
+                 parse: Optional[Callable[[Dict[str, Any]], Any]] = None, **kwargs: Any) -> Any:
     """Send a GET request to one of the API endpoints that returns JSON.
 
     Send a GET request to an endpoint, ideally a URL from the urls module.
-    The endpoint is formatted with the kwargs passed to it.
+    The endpoint is formatted with the kwargs passed to it. The request goes
+    through the given transport, or the shared default one.
+
+    With conditional=True the request is revalidated with the ETag and
+    Last-Modified of the previous response, and an unchanged resource is
+    returned from the transport without downloading it again. If parse is
+    given, the result of parse(data) is returned.
 
     This will error on an invalid request (requests.Request.raise_for_status()), but will otherwise return a dict.
     """
     formatted_url = url.format(**kwargs)
-    response = requests.get(formatted_url)
-    response.raise_for_status()
-    return response.json() # type: ignore
+    transport = transport or get_transport()
+    event = start('GET', url, formatted_url)
+    if event is None:
+        return transport.get_json(formatted_url, conditional, parse)
+    return observe(event, transport.get_json, formatted_url, conditional, parse, event)
+
+
+def request_validated(url: str, previous: Optional[Validated] = None, transport: Optional[Transport] = None,
+                      parse: Optional[Callable[[Dict[str, Any]], Any]] = None, key: Optional[Hashable] = None,
+                      **kwargs: Any) -> Validated:
+    """Send a GET request to a JSON endpoint, revalidating an earlier response.
+
+    Like request_json, but the caller keeps the validators: previous is
+    the Validated from an earlier call, and is returned as it is if the
+    API says it hasn't changed. See Transport.get_validated.
+    """
+    formatted_url = url.format(**kwargs)
+    transport = transport or get_transport()
+    event = start('GET', url, formatted_url)
+    if event is None:
+        return transport.get_validated(formatted_url, previous, parse, key=key)
+    return observe(event, transport.get_validated, formatted_url, previous, parse, event, key)
 
 
-def request_xml(url: str, **kwargs: Any) -> Dict[str, Any]:
+def request_xml(url: str, transport: Optional[Transport] = None, **kwargs: Any) -> Dict[str, Any]:
     """Send an XML request to one of the API endpoints that returns XML.
 
     This is in every respect identical to request_json.
     """
     formatted_url = url.format(**kwargs)
-    response = requests.get(formatted_url)
+    transport = transport or get_transport()
+    event = start('GET', url, formatted_url)
+    if event is None:
+        return _get_xml(transport, formatted_url)
+    return observe(event, _get_xml, transport, formatted_url, event)
+
+
+def _get_xml(transport: Transport, url: str, event: Optional[RequestEvent] = None) -> Dict[str, Any]:
+    started = time.perf_counter() if event is not None else 0.0
+    response = transport.get(url)
+    if event is not None:
+        received = time.perf_counter()
+        event.responded(response.status_code, len(response.content), received - started)
     response.raise_for_status()
-    return xmltodict.parse(response.text)
+    data: Dict[str, Any] = xmltodict.parse(response.text)
+    if event is not None:
+        event.parse_time = time.perf_counter() - received
+    return data
 
 
-def request_data(url: str, data_type: str = "json", **kwargs: Any) -> Dict[str, Any]:
+def request_data(url: str, data_type: str = "json", transport: Optional[Transport] = None, **kwargs: Any) -> Dict[str, Any]:
     """Send a GET request to one of the API endpoints that returns data in the specified format.
 
     This is a wrapper function for request_json and request_xml to handle both types of requests.
@@ -35,14 +79,16 @@ def request_data(url: str, data_type: str = "json", **kwargs: Any) -> Dict[str,
     Args:
         url: The endpoint URL, ideally from the urls module.
         data_type: The type of data expected in the response, either "json" or "xml".
+        transport: The Transport to send the request through. Defaults to the shared one.
         **kwargs: The keyword arguments to be passed to the endpoint URL.
 
     Returns:
         A dictionary containing the parsed response data.
     """
     if data_type.lower() == "json":
-        return request_json(url, **kwargs)
+        data: Dict[str, Any] = request_json(url, transport=transport, **kwargs)
+        return data
     elif data_type.lower() == "xml":
-        return request_xml(url, **kwargs)
+        return request_xml(url, transport=transport, **kwargs)
     else:
         raise ValueError("Invalid data_type value. Expected 'json' or 'xml'.")
@@ -134,10 +134,17 @@ setup(
         'requests', 
         'xmltodict',
     ],
+    # Optional dependencies, e.g. `pip install pizzapy[async]`
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+        'otel': ['opentelemetry-api'],
+    },
     include_package_data=True,
     tests_require=[
         'mock',
         'pytest',
+        'pytest-benchmark',
     ],
 
     # setup.py publish support.
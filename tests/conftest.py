@@ -0,0 +1,48 @@
+import json
+import os
+
+from pytest import fixture
+
+from pizzapy.address import Address
+from pizzapy.cache import set_locator_cache, set_menu_cache
+from pizzapy.customer import Customer
+from pizzapy.menu import Menu
+from pizzapy.order import Order
+from pizzapy.store import Store
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def fixture_bytes(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as fp:
+        return fp.read()
+
+
+def load_fixture(name):
+    return json.loads(fixture_bytes(name))
+
+
+def new_order(menu, country='us', transport=None, store_id='4336', phone='2024561111'):
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408', country=country)
+    customer = Customer('Barack', 'Obama', 'barack@whitehouse.gov', phone, address)
+    return Order(Store({'StoreID': store_id}, country, transport), customer, country=country, menu=menu)
+
+
+@fixture
+def menu_fixture():
+    return load_fixture('menu.json')
+
+
+@fixture
+def menu(menu_fixture):
+    return Menu(menu_fixture, lazy=True)
+
+
+@fixture(autouse=True)
+def fresh_caches():
+    set_menu_cache(None)
+    set_locator_cache(None)
+    yield
+    set_menu_cache(None)
+    set_locator_cache(None)
@@ -1,17 +1,16 @@
-import json
-import os
-
 from hamcrest import *
 from mock import patch
 from pytest import mark
 
 from pizzapy.address import Address
+from pizzapy.customer import Customer
+from pizzapy.store import Store, StoreList, StoreLocator, is_available
 from pizzapy.urls import Urls, COUNTRY_USA
 
+from tests.conftest import load_fixture
+
 
-fixture_path = os.path.join('tests', 'fixtures', 'stores.json')
-with open(fixture_path) as fp:
-    stores_fixture = json.load(fp)
+stores_fixture = load_fixture('stores.json')
 
 
 address_params = mark.parametrize(
@@ -66,35 +65,9 @@ def test_address_closest_store(mocked, street, city, region, zip):
     store = address.closest_store()
     assert_that(store, has_properties(
         id='4336',
-        data=has_entries(
-            AddressDescription='1300 L St Nw\nWashington, DC 20005',
-            AllowCarryoutOrders=True,
-            AllowDeliveryOrders=True,
-            HolidaysDescription='',
-            HoursDescription='Su-Th 10:00am-1:00am\nFr-Sa 10:00am-2:00am',
-            IsDeliveryStore=True,
-            IsNEONow=False,
-            IsOnlineCapable=True,
-            IsOnlineNow=True,
-            IsOpen=True,
-            IsSpanish=False,
-            LanguageLocationInfo=has_entries(
-                es=None
-            ),
-            LocationInfo=None,
-            MaxDistance=0.8,
-            MinDistance=0.8,
-            Phone='202-639-8700',
-            ServiceHoursDescription=has_entries(
-                Carryout='Su-Sa 10:00am-10:00pm',
-                Delivery='Su-Th 10:00am-1:00am\nFr-Sa 10:00am-2:00am'
-            ),
-            ServiceIsOpen=has_entries(
-                Carryout=True,
-                Delivery=True
-            ),
-            StoreID='4336'
-        )
+        address_description='1300 L St Nw\nWashington, DC 20005',
+        is_open=True,
+        data=none()
     ))
 
 
@@ -109,7 +82,7 @@ def test_address_nearby_stores(mocked, street, city, region, zip):
 
     stores = address.nearby_stores()
     assert_that(stores, has_length(12))
-    assert_that([x.data for x in stores], equal_to(stores_fixture['Stores']))
+    assert_that([x.id for x in stores], equal_to([x['StoreID'] for x in stores_fixture['Stores']]))
 
 
 # print 'Creating Order...'
@@ -141,3 +114,93 @@ def test_address_nearby_stores(mocked, street, city, region, zip):
 # # TODO: Add order tracking tests here
 #
 # print'Success\n\norder.data:', json.dumps(data, indent=4)
+
+
+def test_nearby_stores_batch():
+    calls = []
+
+    def request_json(url, **kwargs):
+        calls.append(kwargs['line1'])
+        if kwargs['line1'].startswith('0 '):
+            raise Exception('bad address')
+        return stores_fixture
+
+    addresses = [Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408') for _ in range(3)]
+    addresses += [Address('%d Main St' % i, 'Springfield', 'IL', '62701') for i in range(5)]
+
+    with patch('pizzapy.address.request_json', side_effect=request_json):
+        results = list(StoreLocator.nearby_stores_batch(addresses, max_workers=4))
+
+    assert_that(calls, has_length(6))
+    assert_that([r.address for r in results], contains_inanyorder(*addresses))
+    failed = [r for r in results if r.error]
+    assert_that(failed, contains_exactly(has_properties(address=addresses[3], stores=empty())))
+    assert_that([r for r in results if not r.error], only_contains(has_properties(stores=has_length(1))))
+
+
+def test_nearby_stores_batch_reports_bad_entries():
+    def request_json(url, **kwargs):
+        if kwargs['line1'].startswith('0 '):
+            return {'Stores': [{'StoreID': '1'}]}  # no IsOnlineNow, so the filter raises
+        return stores_fixture
+
+    addresses = [Address('%d Main St' % i, 'Springfield', 'IL', '62701') for i in range(3)]
+    with patch('pizzapy.address.request_json', side_effect=request_json):
+        results = list(StoreLocator.nearby_stores_batch(addresses, max_workers=2))
+
+    assert_that(results, has_length(3))
+    failed = [r for r in results if r.error]
+    assert_that(failed, contains_exactly(has_properties(address=addresses[0], stores=empty(),
+                                                        error=instance_of(KeyError))))
+
+
+def test_nearby_stores_are_cached_by_normalized_address():
+    with patch('pizzapy.address.request_json', return_value=stores_fixture) as mocked:
+        Address('700 Pennsylvania Avenue N.W.', 'Washington', 'DC', '20408-0001').nearby_stores()
+        Address('700  pennsylvania ave nw', 'WASHINGTON', 'dc', '20408').nearby_stores()
+        Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408').nearby_stores(service='Carryout')
+        customer = Customer(address=Address('700 Pennsylvania Ave NW', 'Washington', 'DC', '20408'))
+        StoreLocator.find_closest_store_to_customer(customer)
+        StoreLocator.find_k_closest_stores_to_customer(customer, 3)
+
+    assert_that(mocked.call_count, equal_to(2))
+
+
+def test_store_keeps_raw_data_on_request():
+    entry = stores_fixture['Stores'][0]
+    assert_that(Store(entry).data, none())
+    assert_that(Store(entry, keep_raw=True).data, same_instance(entry))
+    stores = StoreList(stores_fixture['Stores'], keep_raw=True)
+    assert_that(stores[0].data, same_instance(entry))
+    assert_that(repr(Store(entry)), equal_to('Store #4336\nAddress:1300 L St Nw\nWashington, DC 20005\nOpen Now: Yes'))
+
+
+def test_store_list_is_lazy():
+    seen = []
+
+    def predicate(x):
+        seen.append(x['StoreID'])
+        return x['IsOnlineNow'] and x['ServiceIsOpen']['Delivery']
+
+    stores = StoreList(stores_fixture['Stores'], predicate)
+    assert_that(bool(stores), is_(True))
+    assert_that(seen, has_length(1))
+    assert_that([s.id for s in stores[:2]], equal_to(['4336', '4344']))
+    assert_that(seen, has_length(2))
+    assert_that(stores[0], same_instance(stores[0]))
+
+    assert_that(len(stores), equal_to(12))
+    assert_that(seen, has_length(len(stores_fixture['Stores'])))
+    assert_that(stores[-1].id, equal_to(stores_fixture['Stores'][-1]['StoreID']))
+    assert_that([s.id for s in stores[::-1]], equal_to([s.id for s in reversed(list(stores))]))
+    assert_that(calling(stores.__getitem__).with_args(12), raises(IndexError))
+
+
+def test_store_list_filters():
+    entries = [dict(x, StoreID=str(n), IsOnlineNow=n % 2 == 0) for n, x in enumerate(stores_fixture['Stores'])]
+    stores = StoreList(entries, is_available('Delivery'))
+    assert_that([s.id for s in stores], equal_to([str(n) for n in range(0, len(entries), 2)]))
+    assert_that(StoreList(entries), has_length(len(entries)))
+    assert_that([s.id for s in stores.filter(lambda x: x['IsSpanish'])],
+                equal_to([x['StoreID'] for x in entries if x['IsOnlineNow'] and x['IsSpanish']]))
+    assert_that(bool(StoreList([], is_available('Delivery'))), is_(False))
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from hamcrest import *
+from pytest import importorskip
+
+importorskip('aiohttp')
+
+from pizzapy.address import Address
+from pizzapy.aio import AsyncClient
+from pizzapy.customer import Customer
+from pizzapy.instrumentation import Callbacks, add_hook, remove_hook
+from pizzapy.store import Store
+from pizzapy.urls import register_country
+
+from tests.conftest import load_fixture
+from tests.stub_server import StubServer
+
+
+stores_fixture = load_fixture('stores.json')
+menu_fixture = load_fixture('menu.json')
+
+TRACKER_XML = b'''<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+<soap:Body><GetTrackerDataResponse><OrderStatuses>
+<OrderStatus><StoreID>4336</StoreID><OrderStatus>Bake</OrderStatus></OrderStatus>
+</OrderStatuses></GetTrackerDataResponse></soap:Body></soap:Envelope>'''
+
+
+def price_order(handler):
+    order = json.loads(handler.body)['Order']
+    return (200, {}, {'Status': 0, 'Order': {'Amounts': {'Customer': 12.5}, 'Products': order['Products']}})
+
+
+def stub_routes():
+    return {
+        '/power/store-locator?s=700 Pennsylvania Avenue NW&c=Washington, DC, 20408&type=Delivery': (200, {}, stores_fixture),
+        '/power/store/4336/menu?lang=en&structured=true': (200, {}, menu_fixture),
+        '/power/store/4336/profile': (200, {}, {'StoreID': '4336', 'IsOpen': True}),
+        '/power/validate-order': (200, {}, {'Status': 1, 'Order': {}}),
+        '/power/price-order': price_order,
+        '/power/place-order': (200, {}, {'Status': 1, 'Order': {'OrderID': 'abc'}}),
+        '/orderstorage/GetTrackerData?Phone=2024561111': (200, {}, TRACKER_XML),
+        '/orderstorage/GetTrackerData?StoreID=4336&OrderKey=xyz': (200, {}, {'OrderStatus': 'Bake'}),
+    }
+
+
+def test_aio_order_flow():
+    async def flow(stub):
+        async with AsyncClient(backoff_factor=0) as client:
+            address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408', country='stub')
+            store = await client.closest_store(address)
+            details = await client.get_details(store)
+            customer = Customer('Barack', 'Obama', 'barack@whitehouse.gov', '2024561111', address)
+            order = await client.begin_customer_order(customer, store, country='stub')
+            order.add_item('P12IPAZA')
+            valid = await client.validate(order)
+            placed = await client.place(order, None)
+            by_phone = await client.track_by_phone('2024561111', country='stub')
+            by_order = await client.track_by_order('4336', 'xyz', country='stub')
+        return store, details, order, valid, placed, by_phone, by_order
+
+    with StubServer(stub_routes()) as stub:
+        register_country('stub', stub.url)
+        store, details, order, valid, placed, by_phone, by_order = asyncio.run(flow(stub))
+
+    assert_that(store.id, equal_to('4336'))
+    assert_that(details, has_entries(IsOpen=True))
+    assert_that(order.menu.variants, has_key('P12IPAZA'))
+    assert_that(valid, equal_to(True))
+    assert_that(order.data, has_entries(Amounts={'Customer': 12.5}, Payments=[{'Type': 'Cash'}]))
+    assert_that(placed, has_entries(Status=1))
+    assert_that(by_phone, contains_exactly(has_properties(store_id='4336', status='Bake')))
+    assert_that(by_order, has_entries(OrderStatus='Bake'))
+
+
+def test_aio_concurrent_requests_share_connections():
+    async def lookups():
+        async with AsyncClient(limit=10) as client:
+            address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408', country='stub')
+            return await asyncio.gather(*[client.nearby_stores(address) for _ in range(200)])
+
+    with StubServer(stub_routes()) as stub:
+        register_country('stub', stub.url)
+        results = asyncio.run(lookups())
+
+    assert_that(results, has_length(200))
+    assert_that(results, only_contains(has_length(1)))
+    assert_that(stub.connections, less_than_or_equal_to(10))
+
+
+def test_aio_instrumentation_marks_shared_responses():
+    events = []
+    hook = add_hook(Callbacks(after=events.append))
+
+    async def lookups():
+        async with AsyncClient() as client:
+            store = Store({'StoreID': '4336'}, 'stub')
+            return await asyncio.gather(*[client.get_details(store) for _ in range(5)])
+
+    try:
+        with StubServer(stub_routes()) as stub:
+            register_country('stub', stub.url)
+            asyncio.run(lookups())
+    finally:
+        remove_hook(hook)
+
+    assert_that(events, has_length(5))
+    assert_that(events, only_contains(has_properties(endpoint='info', country='stub', error=none())))
+    made = [event for event in events if not event.shared]
+    assert_that(made, contains_exactly(has_properties(status=200, network_time=greater_than(0),
+                                                      parse_time=greater_than_or_equal_to(0))))
+    assert_that([event for event in events if event.shared], only_contains(has_properties(status=none())))
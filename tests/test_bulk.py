@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+
+from hamcrest import *
+from pytest import raises
+
+from pizzapy.bulk import BulkPlacer, TokenBucket
+from pizzapy.transport import Transport
+from pizzapy.urls import register_country
+
+from tests.conftest import new_order
+from tests.stub_server import StubServer
+
+
+def test_token_bucket():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+    waits = [bucket.acquire() for _ in range(4)]
+    assert_that(waits, contains_exactly(0, 0, close_to(0.5, 1e-9), close_to(0.5, 1e-9)))
+    assert_that(now[0], close_to(1.0, 1e-9))
+
+
+def test_bulk_placer(menu):
+    lock = threading.Lock()
+    running, peaks, validate_calls, place_calls = {}, {}, [], []
+
+    def endpoint(status, body, calls=None, fail_first=None):
+        def handle(handler):
+            order = json.loads(handler.body)['Order']
+            store, phone = order['StoreID'], order['Phone']
+            with lock:
+                running[store] = running.get(store, 0) + 1
+                peaks[store] = max(peaks.get(store, 0), running[store])
+                if calls is not None:
+                    calls.append(phone)
+                first = calls is not None and calls.count(phone) == 1
+            time.sleep(0.01)
+            with lock:
+                running[store] -= 1
+            if fail_first and first and phone in fail_first:
+                return (503, {}, b'')
+            return (status, {}, body)
+        return handle
+
+    routes = {
+        '/power/validate-order': endpoint(200, {'Status': 1, 'Order': {}}, validate_calls, fail_first={'1'}),
+        '/power/price-order': endpoint(200, {'Status': 1, 'Order': {'Amounts': {'Customer': 10.99}}}),
+        '/power/place-order': endpoint(200, {'Status': 1, 'Order': {'OrderID': 'abc'}}, place_calls, fail_first={'2'}),
+    }
+    with StubServer(routes) as stub, Transport(pool_maxsize=20) as transport:
+        register_country('stub', stub.url)
+        orders = [new_order(menu, 'stub', transport, store_id=store, phone=str(n))
+                  for n, store in enumerate(['4336'] * 6 + ['4337'] * 6)]
+        for order in orders:
+            order.add_item('P12IPAZA')
+        placer = BulkPlacer(max_workers=6, per_store=2, rate_limits={'validate': 1000}, backoff_factor=0)
+        results = {result.order.customer.phone: result for result in placer.place_all(orders)}
+
+    assert_that(results, has_length(12))
+    assert_that(peaks, has_entries({'4336': less_than_or_equal_to(2), '4337': less_than_or_equal_to(2)}))
+    assert_that(results['1'], has_properties(placed=True, step='place', attempts=4,
+                                             response=has_entries(Order={'OrderID': 'abc'})))
+    assert_that(results['2'], has_properties(placed=False, step='place', attempts=3))
+    assert_that(place_calls.count('2'), equal_to(1))
+    assert_that([r for r in results.values() if r.placed], has_length(11))
+
+
+def test_bulk_placer_rejects_unknown_steps():
+    with raises(ValueError):
+        BulkPlacer(rate_limits={'track': 1})
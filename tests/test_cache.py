@@ -0,0 +1,86 @@
+from hamcrest import *
+from mock import patch
+from pytest import fixture
+
+from pizzapy.cache import MenuCache, TTLCache, set_menu_cache
+from pizzapy.menu import Menu
+from pizzapy.store import Store
+from pizzapy.transport import Validated
+from pizzapy.urls import Urls, COUNTRY_USA
+
+from tests.conftest import load_fixture
+
+
+menu_fixture = load_fixture('menu.json')
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def mocked_request_validated(url, previous, transport, parse, key, **kwargs):
+    assert_that(url, equal_to(Urls(COUNTRY_USA).menu_url()))
+    assert_that(kwargs, has_entries(store_id='4336', lang='en'))
+    return Validated(None, None, parse(menu_fixture))
+
+
+@fixture
+def menu_cache():
+    cache = MenuCache()
+    set_menu_cache(cache)
+    yield cache
+    set_menu_cache(None)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert_that(cache.get('a'), equal_to(1))
+    cache.set('c', 3)
+    assert_that(cache.get('b'), none())
+    assert_that(cache.get('a'), equal_to(1))
+    assert_that(cache.get('c'), equal_to(3))
+    assert_that(cache, has_properties(hits=3, misses=1))
+
+
+def test_ttl_cache_expires_entries():
+    clock = Clock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set('a', 1)
+    clock.now = 9.9
+    assert_that(cache.get('a'), equal_to(1))
+    clock.now = 10
+    assert_that(cache.get('a'), none())
+    assert_that(cache, has_length(0))
+
+
+@patch('pizzapy.menu.request_validated', side_effect=mocked_request_validated)
+def test_menu_from_store_is_cached(mocked, menu_cache):
+    menu = Menu.from_store('4336')
+    assert_that(Store({'StoreID': '4336'}).get_menu(), same_instance(menu))
+    assert_that(mocked.call_count, equal_to(1))
+    assert_that(menu_cache, has_properties(hits=1, misses=1))
+
+    assert_that(Menu.from_store('4336', refresh=True), is_not(same_instance(menu)))
+    assert_that(mocked.call_count, equal_to(2))
+
+
+@patch('pizzapy.menu.request_validated', side_effect=mocked_request_validated)
+def test_menu_cache_disk_tier(mocked, tmp_path):
+    set_menu_cache(MenuCache(directory=str(tmp_path)))
+    Menu.from_store('4336')
+
+    cache = MenuCache(directory=str(tmp_path))
+    set_menu_cache(cache)
+    try:
+        menu = Menu.from_store('4336')
+    finally:
+        set_menu_cache(None)
+    assert_that(mocked.call_count, equal_to(1))
+    assert_that(cache.disk_hits, equal_to(1))
+    assert_that(menu.variants, has_length(len(menu_fixture['Variants'])))
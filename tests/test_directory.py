@@ -0,0 +1,107 @@
+import math
+import random
+
+from hamcrest import *
+from mock import patch
+
+from pizzapy.address import Address
+from pizzapy.customer import Customer
+from pizzapy.directory import StoreDirectory, store_coordinates
+from pizzapy.store import StoreLocator
+
+from tests.conftest import load_fixture
+
+
+stores_fixture = load_fixture('stores.json')
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 3958.8 * math.asin(math.sqrt(a))
+
+
+def located(store_id, latitude, longitude, **data):
+    return dict(StoreID=store_id, StoreCoordinates={'StoreLatitude': str(latitude), 'StoreLongitude': str(longitude)},
+                **data)
+
+
+def random_directory(n, seed=7):
+    rng = random.Random(seed)
+    stores = [located(str(i), rng.uniform(25, 49), rng.uniform(-124, -67)) for i in range(n)]
+    return stores, StoreDirectory(stores)
+
+
+def test_store_coordinates():
+    assert_that(store_coordinates(located('1', 38.9, -77.03)), equal_to((38.9, -77.03)))
+    assert_that(store_coordinates(stores_fixture['Stores'][0]), none())
+    assert_that(store_coordinates({'StoreCoordinates': {'StoreLatitude': '', 'StoreLongitude': ''}}), none())
+
+
+def test_nearest_matches_brute_force():
+    stores, directory = random_directory(2000)
+    rng = random.Random(11)
+    for _ in range(50):
+        lat, lon = rng.uniform(25, 49), rng.uniform(-124, -67)
+        expected = sorted(stores, key=lambda s: haversine(lat, lon, *store_coordinates(s)))[:5]
+        found = directory.nearest(lat, lon, k=5)
+        assert_that([n.store.id for n in found], equal_to([s['StoreID'] for s in expected]))
+        assert_that(found[0].distance, close_to(haversine(lat, lon, *store_coordinates(expected[0])), 1e-6))
+
+
+def test_within_matches_brute_force():
+    stores, directory = random_directory(2000)
+    lat, lon = 38.9, -77.03
+    expected = {s['StoreID'] for s in stores if haversine(lat, lon, *store_coordinates(s)) <= 150}
+    found = directory.within(lat, lon, 150)
+    assert_that({n.store.id for n in found}, equal_to(expected))
+    assert_that([n.distance for n in found], equal_to(sorted(n.distance for n in found)))
+    assert_that(directory.nearest(lat, lon, k=len(stores), max_distance=150), has_length(len(expected)))
+
+
+def test_add_merges_by_store_id():
+    directory = StoreDirectory(stores_fixture['Stores'])
+    assert_that(len(directory), equal_to(len(stores_fixture['Stores'])))
+    assert_that(directory.nearest(38.9, -77.03), empty())
+
+    directory.add(located('4336', 38.9036, -77.0305))
+    assert_that(len(directory), equal_to(len(stores_fixture['Stores'])))
+    assert_that('4336' in directory, is_(True))
+    store = directory.nearest(38.9, -77.03)[0].store
+    assert_that(store.id, equal_to('4336'))
+    assert_that(store.data, has_entries(Phone='202-639-8700', StoreCoordinates=has_key('StoreLatitude')))
+    assert_that(directory.get('nope'), none())
+
+
+def test_nearby_stores_covered_locally():
+    directory = StoreDirectory([
+        located('1', 38.90, -77.03, AllowDeliveryOrders=True),
+        located('2', 38.91, -77.03, AllowDeliveryOrders=False),
+        located('3', 38.95, -77.03, AllowDeliveryOrders=True, ServiceIsOpen={'Delivery': False}),
+        located('4', 38.99, -77.03, AllowDeliveryOrders=True),
+    ])
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408', coordinates=(38.9, -77.03))
+    with patch('pizzapy.address.request_json') as request_json:
+        stores = directory.nearby_stores(address, k=5)
+        request_json.assert_not_called()
+    assert_that([s.id for s in stores], equal_to(['1', '4']))
+    assert_that(directory.fallbacks, equal_to(0))
+
+
+@patch('pizzapy.address.request_json', return_value=stores_fixture)
+def test_nearby_stores_falls_back_and_learns(request_json):
+    directory = StoreDirectory([located('1', 45.5, -122.6)])
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408', coordinates=(38.9, -77.03))
+    stores = directory.nearby_stores(address, k=2)
+    assert_that(request_json.call_count, equal_to(1))
+    assert_that(directory.fallbacks, equal_to(1))
+    assert_that([s.id for s in stores], equal_to([s.id for s in address._stores_from(stores_fixture, 'Delivery')][:2]))
+    assert_that(len(directory), equal_to(len(stores_fixture['Stores']) + 1))
+
+
+def test_find_k_closest_stores_to_customer_with_directory():
+    directory = StoreDirectory([located(str(i), 38.9 + i / 100, -77.03) for i in range(10)])
+    customer = Customer(address=Address('700 Pennsylvania Ave NW', 'Washington', 'DC', '20408',
+                                        coordinates=(38.9, -77.03)))
+    stores = StoreLocator.find_k_closest_stores_to_customer(customer, 3, directory=directory)
+    assert_that([s.id for s in stores], equal_to(['0', '1', '2']))
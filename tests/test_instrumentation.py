@@ -0,0 +1,189 @@
+import json
+import socket
+
+from hamcrest import *
+from pytest import fixture, raises
+import requests
+
+from pizzapy.address import Address
+from pizzapy.customer import Customer
+from pizzapy.instrumentation import (Callbacks, Hook, MetricsExporter, OpenTelemetryHook, StatsdExporter, add_hook,
+                                     get_hooks, remove_hook, start)
+from pizzapy.order import Order
+from pizzapy.store import Store
+from pizzapy.track import track_by_phone
+from pizzapy.transport import Transport
+from pizzapy.urls import Urls, register_country
+from pizzapy.utils import request_json, request_xml
+
+from tests.conftest import fixture_bytes, load_fixture
+from tests.stub_server import StubServer
+
+
+stores_fixture = load_fixture('stores.json')
+menu_fixture = load_fixture('menu.json')
+tracker_fixture = fixture_bytes('tracker.xml')
+
+
+@fixture(autouse=True)
+def no_hooks():
+    yield
+    for hook in get_hooks():
+        remove_hook(hook)
+
+
+def stub_routes():
+    return {
+        '/power/store-locator?s=700 Pennsylvania Avenue NW&c=Washington, DC, 20408&type=Delivery':
+            (200, {}, stores_fixture),
+        '/power/store/4336/menu?lang=en&structured=true': (200, {}, menu_fixture),
+        '/power/store/4336/profile': (500, {}, b''),
+        '/power/validate-order': (200, {}, {'Status': 1, 'Order': {}}),
+        '/power/price-order': (200, {}, {'Status': 1, 'Order': {'Amounts': {'Customer': 12.5}}}),
+        '/power/place-order': (200, {}, {'Status': 1, 'Order': {'OrderID': 'abc'}}),
+        '/orderstorage/GetTrackerData?Phone=2024561111': (200, {}, tracker_fixture),
+        '/orderstorage/GetTrackerData?StoreID=4336&OrderKey=xyz': (200, {}, tracker_fixture),
+    }
+
+
+def run_flow(transport):
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408', country='stub', transport=transport)
+    store = address.closest_store()
+    order = Order(store, Customer('Barack', 'Obama', 'barack@whitehouse.gov', '2024561111', address),
+                  country='stub')
+    order.add_item('P12IPAZA')
+    order.place(None)
+    order.validate()
+    with raises(requests.HTTPError):
+        store.get_details()
+    track_by_phone('2024561111', country='stub', transport=transport)
+    request_xml(Urls('stub').track_by_order(), transport=transport, store_id='4336', order_key='xyz')
+
+
+def test_no_hooks_no_events():
+    assert_that(start('GET', Urls('us').menu_url()), none())
+
+
+def test_events_for_every_endpoint():
+    seen = []
+    add_hook(Callbacks(before=lambda event: seen.append(('before', event.endpoint, event.status)),
+                       after=lambda event: seen.append(('after', event))))
+
+    with StubServer(stub_routes()) as stub, Transport(retries=0) as transport:
+        register_country('stub', stub.url)
+        run_flow(transport)
+
+    assert_that([entry[1] for entry in seen[::2]], equal_to(['find', 'menu', 'price', 'place', 'validate', 'info',
+                                                             'track', 'track']))
+    assert_that([entry[2] for entry in seen[::2]], only_contains(none()))
+    events = [entry[1] for entry in seen[1::2]]
+    assert_that(events, only_contains(has_properties(country='stub', latency=greater_than(0), shared=False)))
+    find, menu, price, place, validate, info, by_phone, by_order = events
+    assert_that(menu, has_properties(method='GET', status=200, bytes=len(json.dumps(menu_fixture)),
+                                     network_time=greater_than(0), parse_time=greater_than(0), error=none()))
+    assert_that(place, has_properties(method='POST', status=200, network_time=greater_than(0)))
+    assert_that(menu.network_time + menu.parse_time, less_than_or_equal_to(menu.latency))
+    assert_that(info, has_properties(status=500, error=instance_of(requests.HTTPError), parse_time=none()))
+    assert_that(by_phone, has_properties(status=200, bytes=len(tracker_fixture), parse_time=greater_than(0)))
+    assert_that(by_order, has_properties(status=200, bytes=len(tracker_fixture), parse_time=greater_than(0)))
+
+
+def test_failing_hook_does_not_fail_request():
+    class Broken(Hook):
+        def before(self, event):
+            raise ValueError('broken')
+
+        def after(self, event):
+            raise ValueError('broken')
+
+    add_hook(Broken())
+    with StubServer(stub_routes()) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        data = request_json(Urls('stub').menu_url(), transport=transport, store_id='4336', lang='en')
+    assert_that(data, equal_to(menu_fixture))
+
+
+def test_metrics_exporter():
+    metrics = add_hook(MetricsExporter(buckets=(0.001, 60)))
+
+    with StubServer(stub_routes()) as stub, Transport(retries=0) as transport:
+        register_country('stub', stub.url)
+        run_flow(transport)
+
+    assert_that(metrics.requests('menu'), equal_to(1))
+    assert_that(metrics.requests('info', 'stub', '500'), equal_to(1))
+    assert_that(metrics.requests('track'), equal_to(2))
+    text = metrics.prometheus()
+    assert_that(text, contains_string('pizzapy_requests_total{endpoint="place",country="stub",status="200"} 1\n'))
+    assert_that(text, contains_string('pizzapy_response_bytes_total{endpoint="menu",country="stub"} %d\n'
+                                      % len(json.dumps(menu_fixture))))
+    assert_that(text, contains_string('pizzapy_request_seconds_bucket{endpoint="track",country="stub",le="60"} 2\n'))
+    assert_that(text, contains_string('pizzapy_request_seconds_count{endpoint="track",country="stub"} 2\n'))
+    assert_that(text, contains_string('# TYPE pizzapy_parse_seconds_total counter\n'))
+
+
+def test_statsd_exporter():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(5)
+    statsd = add_hook(StatsdExporter(port=receiver.getsockname()[1], prefix='test'))
+
+    with StubServer(stub_routes()) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        request_json(Urls('stub').menu_url(), transport=transport, store_id='4336', lang='en')
+
+    lines = receiver.recv(4096).decode().split('\n')
+    receiver.close()
+    statsd.close()
+    assert_that(lines, has_items('test.stub.menu.requests.200:1|c',
+                                 'test.stub.menu.bytes:%d|c' % len(json.dumps(menu_fixture)),
+                                 starts_with('test.stub.menu.latency:'), starts_with('test.stub.menu.network:'),
+                                 starts_with('test.stub.menu.parse:')))
+
+
+class FakeSpan:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.exceptions = []
+        self.ended = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, error):
+        self.exceptions.append(error)
+
+    def set_status(self, status):
+        pass
+
+    def end(self):
+        self.ended = True
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, attributes=None, **kwargs):
+        span = FakeSpan(name, attributes or {})
+        self.spans.append(span)
+        return span
+
+
+def test_opentelemetry_hook():
+    tracer = FakeTracer()
+    add_hook(OpenTelemetryHook(tracer))
+
+    with StubServer(stub_routes()) as stub, Transport(retries=0) as transport:
+        register_country('stub', stub.url)
+        request_json(Urls('stub').menu_url(), transport=transport, store_id='4336', lang='en')
+        with raises(requests.HTTPError):
+            Store({'StoreID': '4336'}, 'stub', transport).get_details()
+
+    menu, info = tracer.spans
+    assert_that(menu, has_properties(name='pizzapy menu', ended=True, exceptions=empty(), attributes=has_entries({
+        'http.request.method': 'GET', 'http.response.status_code': 200, 'pizzapy.country': 'stub',
+        'pizzapy.network_time': greater_than(0), 'pizzapy.parse_time': greater_than(0)})))
+    assert_that(info, has_properties(name='pizzapy info', ended=True, exceptions=has_length(1),
+                                     attributes=has_entries({'http.response.status_code': 500})))
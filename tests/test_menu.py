@@ -1,5 +1,4 @@
 import json
-import os
 
 from hamcrest import *
 from mock import patch
@@ -8,10 +7,10 @@ from pytest import mark
 from pizzapy.menu import Menu
 from pizzapy.urls import Urls, COUNTRY_USA
 
+from tests.conftest import load_fixture
 
-fixture_path = os.path.join('tests', 'fixtures', 'menu.json')
-with open(fixture_path) as fp:
-    menu_fixture = json.load(fp)
+
+menu_fixture = load_fixture('menu.json')
 
 
 
@@ -25,3 +24,75 @@ def mocked_request_json(url, **kwargs):
 @patch('pizzapy.address.request_json', side_effect=mocked_request_json)
 def test_menu_from_store(store_id):
     pass
+
+
+def test_menu_init():
+    menu = Menu(menu_fixture)
+    assert_that(menu.variants, has_length(len(menu_fixture['Variants'])))
+    assert_that(menu.products, has_length(len(menu_fixture['Products'])))
+    assert_that(menu.coupons, has_length(len(menu_fixture['Coupons'])))
+    assert_that(menu.root_categories, has_entries(Food=has_properties(code='Food')))
+    assert_that(menu.get_item_count(), equal_to(
+        len(menu_fixture['Products']) + len(menu_fixture['Coupons']) + len(menu_fixture['PreconfiguredProducts'])))
+
+
+def test_lazy_menu_parses_on_first_access():
+    menu = Menu(menu_fixture, lazy=True)
+    assert_that(menu.variants['P12IPAZA'], has_entries(Code='P12IPAZA'))
+    assert_that(menu._menu_by_code, empty())
+
+    assert_that(menu.coupons, has_length(len(menu_fixture['Coupons'])))
+    eager = Menu(menu_fixture)
+    assert_that(menu.get_item_count(), equal_to(eager.get_item_count()))
+    assert_that([c.get_category_path() for c in menu.menu_by_code['S_PIZZA'].categories],
+                equal_to([c.get_category_path() for c in eager.menu_by_code['S_PIZZA'].categories]))
+
+
+def test_menu_search():
+    menu = Menu(menu_fixture, lazy=True)
+    variants_before = json.dumps(menu_fixture['Variants'], sort_keys=True)
+
+    cokes = menu.search('COKE')
+    assert_that([r.code for r in cokes], contains_inanyorder('20BCOKE', '20BDCOKE', 'D20BZRO', '2LDCOKE', '2LCOKE'))
+    assert_that(menu.search('pan piz', size='12'), has_item(has_properties(
+        code='P12IPAZA', product_type='Pizza', toppings=has_entries(X='1', C='1'))))
+    assert_that(menu.search('coke', size='2LTB', max_price=3), has_length(2))
+    assert_that(menu.search(product_type='drinks', min_price=2.5), only_contains(has_properties(price=2.99)))
+    assert_that(menu.search(code='p12ipaza'), contains_exactly(has_properties(code='P12IPAZA')))
+    assert_that(menu.search('nothing like this'), empty())
+    assert_that(json.dumps(menu_fixture['Variants'], sort_keys=True), equal_to(variants_before))
+
+
+def test_menu_keep_raw():
+    assert_that(Menu(menu_fixture).menu_by_code['S_PIZZA'].menu_data, none())
+    menu = Menu(menu_fixture, keep_raw=True)
+    assert_that(menu.menu_by_code['S_PIZZA'].menu_data, same_instance(menu_fixture['Products']['S_PIZZA']))
+    assert_that(menu.root_categories['Food'].menu_data, same_instance(menu_fixture['Categorization']['Food']))
+
+
+def test_menu_category_index():
+    menu = Menu(menu_fixture, lazy=True)
+    specialty = menu.categories_by_path['Food/Pizza/Specialty']
+    assert_that(specialty, has_properties(code='Specialty', path='Food/Pizza/Specialty', parent=menu.get_category('Pizza')))
+    assert_that(specialty.get_category_path(), equal_to('FoodPizzaSpecialty'))
+    assert_that(menu.get_category('Sandwich'), same_instance(menu.categories_by_path['Food/Sandwich']))
+
+    pizzas = menu.get_products('Food/Pizza')
+    assert_that([p.code for p in pizzas], has_items('S_PIZZA', 'S_ZZ'))
+    assert_that(pizzas, equal_to(menu.get_products('Food/Pizza/BuildYourOwn') + specialty.products))
+    assert_that(menu.get_products('Food'), has_length(len(set(menu.get_products('Food')))))
+    assert_that(menu.get_products('Nothing'), empty())
+
+
+def test_menu_deep_categories():
+    data = {'Code': 'Root', 'Name': '', 'Products': [], 'Categories': []}
+    leaf = data
+    for depth in range(2000):
+        child = {'Code': 'C%d' % depth, 'Name': '', 'Products': [], 'Categories': []}
+        leaf['Categories'].append(child)
+        leaf = child
+    leaf['Products'].append('S_PIZZA')
+
+    menu = Menu(dict(menu_fixture, Categorization={'Root': data}))
+    assert_that(menu.get_category('C1999').path, ends_with('C1998/C1999'))
+    assert_that(menu.get_products('Root'), contains_exactly(has_properties(code='S_PIZZA')))
@@ -0,0 +1,89 @@
+import json
+
+from hamcrest import *
+from pytest import raises
+
+from pizzapy.transport import Transport
+from pizzapy.urls import register_country
+
+from tests.conftest import new_order
+from tests.stub_server import StubServer
+
+
+def test_order_cart_lines(menu):
+    variant_before = json.dumps(menu.variants['P12IPAZA'], sort_keys=True)
+    order = new_order(menu)
+
+    pizza = order.add_item('P12IPAZA', options={'P': '1', 'C': '0'})
+    coke = order.add_item('2LCOKE', qty=2)
+    second = order.add_item('P12IPAZA', options=['M'])
+    assert_that([pizza.id, coke.id, second.id], equal_to([1, 2, 3]))
+    assert_that(order.update_quantity(coke.id, 3), has_properties(qty=3))
+
+    assert_that(order.remove_item('P12IPAZA'), same_instance(pizza))
+    assert_that(order.update_quantity(coke.id, 0), none())
+    with raises(KeyError):
+        order.remove_item('2LCOKE')
+
+    products = order._payload()['Order']['Products']
+    assert_that(products, contains_exactly(has_entries(
+        Code='P12IPAZA', ID=3, Qty=1, Options={'M': {'1/1': '1'}})))
+    assert_that(json.dumps(menu.variants['P12IPAZA'], sort_keys=True), equal_to(variant_before))
+    assert_that(repr(order), contains_string('with 1 items'))
+
+
+def test_orders_sharing_a_menu_do_not_interfere(menu):
+    first, second = new_order(menu), new_order(menu)
+    line = first.add_item('P12IPAZA')
+    line.data['Price'] = '0.00'
+    second.add_item('P12IPAZA', qty=4)
+
+    assert_that(first._payload()['Order']['Products'], contains_exactly(has_entries(Qty=1, Price='0.00')))
+    assert_that(second._payload()['Order']['Products'], contains_exactly(has_entries(Qty=4, Price='10.99')))
+
+
+def test_order_reprices_only_when_the_cart_changes(menu):
+    def price_order(handler):
+        products = json.loads(handler.body)['Order']['Products']
+        total = sum(float(p['Price']) * p['Qty'] for p in products)
+        return (200, {}, {'Status': 0, 'Order': {
+            'Amounts': {'Customer': total}, 'EstimatedWaitMinutes': '20-30', 'Products': products, 'Tags': {'x': 1}}})
+
+    with StubServer({'/power/price-order': price_order}) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        order = new_order(menu, 'stub', transport)
+        pizza = order.add_item('P12IPAZA')
+        order.pay_with(None)
+        order.pay_with(None)
+        assert_that(stub.requests, has_length(1))
+
+        order.update_quantity(pizza.id, 2)
+        order.pay_with(None)
+        assert_that(order.data['Amounts'], equal_to({'Customer': 21.98}))
+        order.update_quantity(pizza.id, 1)
+        order.pay_with(None)
+        assert_that(stub.requests, has_length(2))
+
+    assert_that(order.data, has_entries(Amounts={'Customer': 10.99}, EstimatedWaitMinutes='20-30', Tags={}))
+    assert_that(order.responses.hits, equal_to(2))
+
+
+def test_recalled_price_keeps_products_in_step_with_the_cart(menu):
+    def price_order(handler):
+        products = json.loads(handler.body)['Order']['Products']
+        total = sum(float(p['Price']) * p['Qty'] for p in products)
+        return (200, {}, {'Status': 0, 'Order': {'Amounts': {'Customer': total}}})
+
+    with StubServer({'/power/price-order': price_order}) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        order = new_order(menu, 'stub', transport)
+        order.add_item('P12IPAZA')
+        order.pay_with(None)
+        coke = order.add_item('2LCOKE')
+        order.pay_with(None)
+        order.remove_line(coke.id)
+        order.pay_with(None)
+
+    assert_that(stub.requests, has_length(2))
+    assert_that(order.data['Amounts'], equal_to({'Customer': 10.99}))
+    assert_that(order.data['Products'], contains_exactly(has_entries(Code='P12IPAZA')))
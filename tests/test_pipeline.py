@@ -0,0 +1,128 @@
+import json
+import time
+
+from hamcrest import *
+from pytest import raises
+
+from pizzapy.address import Address
+from pizzapy.customer import Customer
+from pizzapy.directory import StoreDirectory
+from pizzapy.order import Order
+from pizzapy.pipeline import OrderPipeline
+from pizzapy.transport import Transport
+from pizzapy.urls import register_country
+
+from tests.conftest import load_fixture
+from tests.stub_server import StubServer
+
+
+stores_fixture = load_fixture('stores.json')
+menu_fixture = load_fixture('menu.json')
+
+DELAY = 0.05
+
+
+def slow(status, body):
+    def handle(handler):
+        time.sleep(DELAY)
+        return (status, {}, body)
+    return handle
+
+
+def stub_routes(validate_status=1):
+    return {
+        '/power/store-locator?s=700 Pennsylvania Avenue NW&c=Washington, DC, 20408&type=Delivery':
+            slow(200, stores_fixture),
+        '/power/store/4336/menu?lang=en&structured=true': slow(200, menu_fixture),
+        '/power/store/4336/profile': slow(200, {'StoreID': '4336', 'IsOpen': True}),
+        '/power/validate-order': slow(200, {'Status': validate_status, 'Order': {'Status': validate_status}}),
+        '/power/price-order': slow(200, {'Status': 1, 'Order': {'Amounts': {'Customer': 12.5}, 'Status': 1}}),
+        '/power/place-order': slow(200, {'Status': 1, 'Order': {'OrderID': 'abc'}}),
+    }
+
+
+def new_customer(transport, coordinates=None):
+    address = Address('700 Pennsylvania Avenue NW', 'Washington', 'DC', '20408', country='stub',
+                      transport=transport, coordinates=coordinates)
+    return Customer('Barack', 'Obama', 'barack@whitehouse.gov', '2024561111', address)
+
+
+def paths(stub):
+    return [path for _, path, _, _ in stub.requests]
+
+
+def test_pipeline_overlaps_independent_stages():
+    with StubServer(stub_routes()) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        result = OrderPipeline().run(new_customer(transport), ['P12IPAZA', ('2LCOKE', 2)])
+
+    stages = result.stages
+    assert_that(stages, has_entries(menu=anything(), details=anything(), validate=anything(), place=anything()))
+    assert_that(stages['menu'].start, greater_than_or_equal_to(stages['locate'].end))
+    assert_that(stages['details'].start, less_than(stages['menu'].end))
+    assert_that(stages['details'].end, less_than(stages['validate'].end))
+    assert_that(stages['price'].start, greater_than_or_equal_to(stages['validate'].end))
+    assert_that(stages['place'].start, greater_than_or_equal_to(stages['price'].end))
+    # locate, menu, validate, price, place; details adds nothing
+    assert_that(result.elapsed, less_than(6 * DELAY))
+    assert_that(result, has_properties(prefetched=False, details=has_entries(IsOpen=True),
+                                       response=has_entries(Order=has_entries(OrderID='abc'))))
+    assert_that(result.store.id, equal_to('4336'))
+    assert_that(result.order.data, has_entries(Status=1, Amounts={'Customer': 12.5},
+                                               Payments=[{'Type': 'Cash'}]))
+    assert_that([p['Code'] for p in result.order.data['Products']], equal_to(['P12IPAZA', '2LCOKE']))
+    assert_that(result.report().splitlines(), has_length(len(stages) + 1))
+
+
+def test_pipeline_prefetches_for_expected_store():
+    directory = StoreDirectory([{'StoreID': '4336',
+                                 'StoreCoordinates': {'StoreLatitude': '38.9036', 'StoreLongitude': '-77.0305'}}])
+    with StubServer(stub_routes()) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        customer = new_customer(transport, coordinates=(38.8935, -77.0230))
+        result = OrderPipeline(directory=directory).run(customer, ['P12IPAZA'], place=False)
+
+    stages = result.stages
+    assert_that(result, has_properties(prefetched=True, response=none()))
+    assert_that(stages['menu'].start, less_than(stages['locate'].end))
+    assert_that(stages['details'].start, less_than(stages['locate'].end))
+    assert_that(stages, is_not(has_key('place')))
+    assert_that(paths(stub), is_not(has_item('/power/place-order')))
+
+
+def test_pipeline_refetches_after_wrong_guess():
+    with StubServer(stub_routes()) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        result = OrderPipeline().run(new_customer(transport), ['P12IPAZA'], store_id='9999', place=False)
+
+    assert_that(result, has_properties(prefetched=False, details=has_entries(StoreID='4336')))
+    assert_that(result.stages['menu'].start, greater_than_or_equal_to(result.stages['locate'].end))
+    assert_that(paths(stub), has_items('/power/store/9999/profile', '/power/store/4336/profile'))
+
+
+def test_pipeline_matches_validate_then_pay_with():
+    routes = stub_routes()
+    routes['/power/validate-order'] = (200, {}, {'Status': 1, 'Order': {'Status': 1, 'OrderID': 'v-1'}})
+    with StubServer(routes) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        customer = new_customer(transport)
+        result = OrderPipeline().run(customer, ['P12IPAZA', ('2LCOKE', 2)], place=False)
+
+        order = Order(result.store, customer, country='stub', menu=result.order.menu)
+        order.add_item('P12IPAZA')
+        order.add_item('2LCOKE', 2)
+        order.validate()
+        order.pay_with(None)
+
+    priced = [json.loads(body)['Order'] for _, path, _, body in stub.requests if path == '/power/price-order']
+    assert_that(priced, only_contains(has_entries(OrderID='v-1', Status=1)))
+    assert_that(result.order.data, equal_to(order.data))
+
+
+def test_pipeline_does_not_place_invalid_order():
+    with StubServer(stub_routes(validate_status=-1)) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        with raises(Exception, match='validation failed'):
+            OrderPipeline().run(new_customer(transport), ['P12IPAZA'])
+
+    assert_that(paths(stub), is_not(has_item('/power/place-order')))
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hamcrest import *
+from pytest import importorskip
+
+from pizzapy.menu import Menu
+from pizzapy.singleflight import AsyncSingleFlight, SingleFlight
+from pizzapy.transport import Transport
+from pizzapy.urls import register_country
+
+from tests.conftest import fixture_bytes
+from tests.stub_server import StubServer
+
+
+menu_bytes = fixture_bytes('menu.json')
+
+
+def slow(body):
+    def handle(handler):
+        time.sleep(0.2)
+        return (200, {}, body)
+    return handle
+
+
+def test_concurrent_menu_fetches_share_one_request():
+    routes = {'/power/store/4336/menu?lang=en&structured=true': slow(menu_bytes)}
+    with StubServer(routes) as stub, Transport(pool_maxsize=20) as transport:
+        register_country('stub', stub.url)
+        with ThreadPoolExecutor(20) as executor:
+            menus = list(executor.map(lambda _: Menu.from_store('4336', country='stub', transport=transport), range(20)))
+
+    assert_that(stub.requests, has_length(1))
+    assert_that(transport.flights, has_properties(calls=20, coalesced=19))
+    assert_that(set(map(id, menus)), has_length(1))
+
+
+def test_requests_with_different_parse_are_not_coalesced():
+    routes = {'/power/store/4336/menu?lang=en&structured=true': slow(menu_bytes)}
+    with StubServer(routes) as stub, Transport(pool_maxsize=20) as transport:
+        register_country('stub', stub.url)
+        url = stub.url + '/power/store/4336/menu?lang=en&structured=true'
+        with ThreadPoolExecutor(4) as executor:
+            menu = executor.submit(Menu.from_store, '4336', country='stub', transport=transport)
+            data = executor.submit(transport.get_json, url)
+            codes = [executor.submit(transport.get_json, url, parse=sorted) for _ in range(2)]
+            menu, data, codes = menu.result(), data.result(), [future.result() for future in codes]
+
+    assert_that(menu, instance_of(Menu))
+    assert_that(data, instance_of(dict))
+    assert_that(codes, only_contains(equal_to(sorted(data))))
+    assert_that(stub.requests, has_length(3))
+
+
+def test_single_flight_shares_errors_and_forgets_finished_calls():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait()
+        raise ValueError('boom')
+
+    errors = []
+
+    def call():
+        try:
+            flights.do('key', fail)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flights.calls < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert_that(errors, has_length(4))
+    assert_that(flights.coalesced, equal_to(3))
+    assert_that(flights.do('key', lambda: 'fresh'), equal_to('fresh'))
+
+
+def test_async_single_flight():
+    importorskip('aiohttp')
+    from pizzapy.aio import AsyncClient
+
+    async def fetch(stub):
+        async with AsyncClient() as client:
+            results = await asyncio.gather(*[
+                client.request_json(stub.url + '/power/store/{store_id}/profile', store_id='4336') for _ in range(10)])
+            return client.flights, results
+
+    with StubServer({'/power/store/4336/profile': slow({'StoreID': '4336'})}) as stub:
+        flights, results = asyncio.run(fetch(stub))
+
+    assert_that(stub.requests, has_length(1))
+    assert_that(flights, has_properties(calls=10, coalesced=9))
+    assert_that(results, only_contains(has_entries(StoreID='4336')))
+
+
+def test_async_single_flight_survives_leader_cancellation():
+    async def run():
+        flights = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        leader = asyncio.ensure_future(flights.do('key', work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do('key', work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert_that(asyncio.run(run()), equal_to('done'))
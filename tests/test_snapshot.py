@@ -0,0 +1,48 @@
+import json
+
+from hamcrest import *
+from pytest import raises
+
+from pizzapy.menu import Menu
+from pizzapy.snapshot import MenuSnapshot
+
+from tests.conftest import new_order
+
+
+def test_menu_snapshot_round_trip(tmp_path, menu_fixture):
+    path = str(tmp_path / 'menu.snapshot')
+    menu = Menu(menu_fixture)
+    menu.export_snapshot(path, store_id='4336')
+
+    with MenuSnapshot(path) as snapshot:
+        assert_that(snapshot.meta, equal_to({'store_id': '4336', 'country': 'us'}))
+        sections = snapshot.data()
+        assert_that(list(sections['Variants']), equal_to(list(menu_fixture['Variants'])))
+        assert_that({name: dict(section) for name, section in sections.items()},
+                    equal_to({name: value for name, value in menu_fixture.items() if isinstance(value, dict)}))
+        assert_that(snapshot.category_products('Food/Pizza'), equal_to([p.code for p in menu.get_products('Food/Pizza')]))
+        assert_that(snapshot.category_products('Nothing'), empty())
+
+        loaded = Menu.from_snapshot(snapshot)
+        pizzas = loaded.get_products('Food/Pizza')
+        assert_that([p.code for p in pizzas], equal_to([p.code for p in menu.get_products('Food/Pizza')]))
+        assert_that([p.name for p in pizzas], equal_to([p.name for p in menu.get_products('Food/Pizza')]))
+        assert_that(loaded.get_products('Food/Pizza'), same_instance(pizzas))
+        assert_that(loaded._parsed, is_(False))
+        assert_that(loaded.get_products('Pizza'), has_length(len(pizzas)))
+        assert_that(loaded.get_products('Nothing'), empty())
+        assert_that(loaded.variants, has_key('P12IPAZA'))
+        assert_that(loaded.variants, is_not(has_key('NOPE')))
+        assert_that(loaded.get_item_count(), equal_to(menu.get_item_count()))
+        assert_that(loaded.search('coke'), equal_to(menu.search('coke')))
+
+        order = new_order(loaded)
+        order.add_item('P12IPAZA')
+        assert_that(order._payload()['Order']['Products'], contains_exactly(has_entries(Code='P12IPAZA', Price='10.99')))
+
+
+def test_menu_snapshot_rejects_other_files(tmp_path, menu_fixture):
+    path = tmp_path / 'menu.json'
+    path.write_text(json.dumps(menu_fixture))
+    with raises(ValueError):
+        MenuSnapshot(str(path))
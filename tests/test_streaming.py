@@ -0,0 +1,78 @@
+import io
+import json
+import tracemalloc
+
+from hamcrest import *
+from pytest import mark, raises
+
+from pizzapy.menu import MENU_SECTIONS, Menu
+from pizzapy.streaming import iter_members, load_menu
+from pizzapy.transport import Transport
+from pizzapy.urls import register_country
+
+from tests.conftest import fixture_bytes
+from tests.stub_server import StubServer
+
+
+menu_bytes = fixture_bytes('menu.json')
+menu_fixture = json.loads(menu_bytes)
+
+
+@mark.parametrize('chunk_size', [1, 7, 4096, 1 << 20])
+def test_load_menu_matches_json(chunk_size):
+    assert_that(load_menu(io.BytesIO(menu_bytes), chunk_size=chunk_size), equal_to(menu_fixture))
+
+
+def test_load_menu_skips_sections():
+    skip = ('CookingInstructions', 'UnsupportedProducts', 'Flavors')
+    data = load_menu(io.BytesIO(menu_bytes), skip=skip)
+    assert_that(data, is_not(has_key(is_in(skip))))
+    assert_that(data['Variants'], equal_to(menu_fixture['Variants']))
+
+    data = load_menu(io.BytesIO(menu_bytes), keep=MENU_SECTIONS)
+    assert_that(sorted(data), equal_to(sorted(MENU_SECTIONS)))
+
+
+def test_skipped_sections_are_not_buffered():
+    big = {'P%d' % i: {'Code': 'P%d' % i, 'Name': 'x' * 40, 'Tags': {'a': 'b\\"c'}} for i in range(12000)}
+    body = json.dumps({'Big': big, 'Variants': {'A': {'Code': 'A'}}}).encode()
+
+    tracemalloc.start()
+    try:
+        data = load_menu(io.BytesIO(body), skip=('Big',))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert_that(data, equal_to({'Variants': {'A': {'Code': 'A'}}}))
+    assert_that(len(body), greater_than(1 << 20))
+    assert_that(peak, less_than(len(body) // 4))
+
+
+def test_iter_members_handles_strings_and_split_characters():
+    text = '{"a": "x\\"}{,", "b": [1, {"c": "\\\\"}], "n": 12.5, "t": true, "e": {}, "u": "é中"}'
+    for chunk_size in (1, 2, 3, 100):
+        chunks = [text.encode()[i:i + chunk_size] for i in range(0, len(text.encode()), chunk_size)]
+        assert_that(dict(iter_members(chunks, depth=2)), equal_to(json.loads(text)))
+    assert_that(dict(iter_members(io.StringIO(text))), equal_to(json.loads(text)))
+
+    with raises(ValueError):
+        dict(iter_members(io.BytesIO(b'{"a": [1, 2')))
+
+
+def test_menu_from_stream():
+    menu = Menu.from_stream(io.BytesIO(menu_bytes), keep=('Variants', 'Products'))
+    assert_that(menu.variants, has_length(len(menu_fixture['Variants'])))
+    assert_that(menu.products, has_length(len(menu_fixture['Products'])))
+    assert_that(menu.coupons, empty())
+
+
+def test_menu_from_store_streams():
+    routes = {'/power/store/4336/menu?lang=en&structured=true': (200, {}, menu_bytes)}
+    with StubServer(routes) as stub, Transport() as transport:
+        register_country('stub', stub.url)
+        menu = Menu.from_store('4336', country='stub', transport=transport, stream=True)
+        assert_that(Menu.from_store('4336', country='stub', transport=transport, stream=True), same_instance(menu))
+
+    assert_that(stub.requests, has_length(1))
+    assert_that(menu.get_item_count(), equal_to(Menu(menu_fixture).get_item_count()))
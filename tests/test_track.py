@@ -0,0 +1,49 @@
+import xmltodict
+from hamcrest import *
+
+from pizzapy.track import OrderStatus, parse_order_statuses, track_by_phone
+from pizzapy.transport import Transport
+from pizzapy.urls import register_country
+
+from tests.conftest import fixture_bytes
+from tests.stub_server import StubServer
+
+
+tracker_xml = fixture_bytes('tracker.xml')
+
+SINGLE = b'''<?xml version="1.0"?><soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>
+<GetTrackerDataResponse xmlns="http://www.dominos.com/message/"><OrderStatuses>
+<OrderStatus><StoreID>4336</StoreID><OrderStatus>Bake</OrderStatus></OrderStatus>
+</OrderStatuses></GetTrackerDataResponse></soap:Body></soap:Envelope>'''
+
+EMPTY = SINGLE.replace(b'<OrderStatus><StoreID>4336</StoreID><OrderStatus>Bake</OrderStatus></OrderStatus>', b'')
+
+
+def test_parse_order_statuses():
+    statuses = parse_order_statuses(tracker_xml)
+    assert_that(statuses, contains_exactly(
+        has_properties(order_key='12345678', status='Out the Door', driver_name='Sam', delivery_time=None,
+                       description='1 Medium (12") Handmade Pan Pizza & 1 2-Liter Coke®'),
+        equal_to(OrderStatus(store_id='4336', order_id='2017-06-02#51301', order_key='12345699', phone='2024561111',
+                             service_method='Carryout', status='Bake', description='1 Large (14") Hand Tossed Pizza',
+                             start_time='2017-06-02T19:25:00', oven_time='2017-06-02T19:29:30')),
+    ))
+
+    raw = xmltodict.parse(tracker_xml)['soap:Envelope']['soap:Body']['GetTrackerDataResponse']
+    assert_that([s.status for s in statuses], equal_to([r['OrderStatus'] for r in raw['OrderStatuses']['OrderStatus']]))
+
+
+def test_parse_order_statuses_shapes():
+    assert_that(parse_order_statuses(SINGLE), contains_exactly(OrderStatus(store_id='4336', status='Bake')))
+    assert_that(parse_order_statuses(EMPTY), empty())
+    chunks = [tracker_xml[i:i + 5] for i in range(0, len(tracker_xml), 5)]
+    assert_that(parse_order_statuses(chunks), equal_to(parse_order_statuses(tracker_xml)))
+
+
+def test_track_by_phone():
+    with StubServer({'/orderstorage/GetTrackerData?Phone=2024561111': (200, {}, SINGLE)}) as stub, \
+            Transport() as transport:
+        register_country('stub', stub.url)
+        statuses = track_by_phone(' 2024561111 ', country='stub', transport=transport)
+
+    assert_that(statuses, contains_exactly(has_properties(status='Bake')))
@@ -0,0 +1,89 @@
+import asyncio
+import random
+
+from hamcrest import *
+from pytest import importorskip
+
+importorskip('aiohttp')
+
+from pizzapy.aio import AsyncClient
+from pizzapy.tracker import Target, Tracker, status_of
+from pizzapy.urls import register_country
+
+from tests.stub_server import StubServer
+
+
+def progress(*statuses):
+    polls = []
+
+    def handle(handler):
+        polls.append(handler.path)
+        return (200, {}, {'OrderStatus': statuses[min(len(polls), len(statuses)) - 1]})
+    return handle
+
+
+def test_status_of():
+    assert_that(status_of({'OrderStatus': 'Bake'}), equal_to('Bake'))
+    assert_that(status_of([{'OrderStatus': 'Bake'}, {'OrderStatus': 'Complete'}]), equal_to('Complete'))
+    assert_that(status_of([]), none())
+
+
+def test_tracker_follows_orders_until_they_finish():
+    routes = {
+        '/orderstorage/GetTrackerData?StoreID=4336&OrderKey=a': progress('Bake', 'Bake', 'Out the Door', 'Complete'),
+        '/orderstorage/GetTrackerData?StoreID=4336&OrderKey=b': progress('Prep', 'Complete'),
+        '/orderstorage/GetTrackerData?Phone=2024561111': (404, {}, b''),
+    }
+
+    async def follow(stub):
+        async with AsyncClient(retries=0) as client:
+            tracker = Tracker(client, concurrency=2, intervals={'Bake': 0.02}, default_interval=0.01,
+                              max_errors=2, rng=random.Random(0))
+            seen = []
+            tracker.on_change(seen.append)
+            first = tracker.track_order('4336', 'a', country='stub')
+            tracker.track_order('4336', 'b', country='stub')
+            tracker.track_phone('2024561111', country='stub')
+            changes = [change async for change in tracker.changes()]
+            return first, tracker, seen, changes
+
+    with StubServer(routes) as stub:
+        register_country('stub', stub.url)
+        first, tracker, seen, changes = asyncio.run(follow(stub))
+
+    assert_that(first, equal_to(Target('4336', 'a', None, 'stub')))
+    assert_that(changes, equal_to(seen))
+    assert_that([(c.old, c.new) for c in changes if c.target == first],
+                contains_exactly((None, 'Bake'), ('Bake', 'Out the Door'), ('Out the Door', 'Complete')))
+    assert_that(changes, has_item(has_properties(target=has_properties(phone='2024561111'), new=None,
+                                                 error=instance_of(Exception))))
+    assert_that(tracker, has_length(0))
+    assert_that(tracker.polls, equal_to(4 + 2 + 2))
+
+
+def test_tracker_keeps_running_when_a_callback_raises():
+    routes = {'/orderstorage/GetTrackerData?StoreID=4336&OrderKey=a': progress('Bake', 'Out the Door', 'Complete')}
+
+    async def follow(stub):
+        async with AsyncClient(retries=0) as client:
+            tracker = Tracker(client, default_interval=0.01, intervals={}, rng=random.Random(0))
+            seen = []
+
+            def broken(change):
+                raise ValueError('broken')
+
+            async def broken_async(change):
+                raise ValueError('broken')
+
+            tracker.on_change(broken)
+            tracker.on_change(broken_async)
+            tracker.on_change(seen.append)
+            tracker.track_order('4336', 'a', country='stub')
+            await tracker.run()
+            return seen
+
+    with StubServer(routes) as stub:
+        register_country('stub', stub.url)
+        seen = asyncio.run(follow(stub))
+
+    assert_that([change.new for change in seen], contains_exactly('Bake', 'Out the Door', 'Complete'))
@@ -0,0 +1,154 @@
+import json
+import os
+import subprocess
+import sys
+
+from hamcrest import *
+from pytest import mark, importorskip, raises
+
+from pizzapy.cache import MenuCache, set_menu_cache
+from pizzapy.codec import CODECS, get_codec
+from pizzapy.menu import Menu
+from pizzapy.urls import register_country
+from pizzapy.transport import Transport, get_transport, set_transport
+from pizzapy.utils import request_json
+
+from tests.stub_server import StubServer
+
+
+def test_transport_reuses_connections():
+    routes = {'/power/store/4336/profile': (200, {'Content-Type': 'application/json'}, {'StoreID': '4336'})}
+    with StubServer(routes) as stub, Transport() as transport:
+        for _ in range(5):
+            data = request_json(stub.url + '/power/store/{store_id}/profile', transport=transport, store_id='4336')
+            assert_that(data, has_entries(StoreID='4336'))
+
+    assert_that(stub.requests, has_length(5))
+    assert_that(stub.connections, equal_to(1))
+
+
+def test_transport_retries_idempotent_requests():
+    attempts = []
+
+    def flaky(handler):
+        attempts.append(handler.path)
+        if len(attempts) < 3:
+            return (503, {}, b'')
+        return (200, {}, {'Status': 0})
+
+    with StubServer({'/flaky': flaky, '/place': (503, {}, b'')}) as stub, Transport(backoff_factor=0) as transport:
+        assert_that(request_json(stub.url + '/flaky', transport=transport), has_entries(Status=0))
+        assert_that(transport.post(stub.url + '/place').status_code, equal_to(503))
+
+    assert_that(attempts, has_length(3))
+    assert_that([r for r in stub.requests if r[0] == 'POST'], has_length(1))
+
+
+def test_set_transport_replaces_default():
+    transport = Transport()
+    set_transport(transport)
+    try:
+        assert_that(get_transport(), same_instance(transport))
+    finally:
+        set_transport(None)
+    assert_that(get_transport(), is_not(same_instance(transport)))
+
+
+def test_conditional_get_reuses_parsed_menu():
+    menu_path = '/power/store/4336/menu?lang=en&structured=true'
+    etag = '"v1"'
+
+    def menu(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return (304, {'ETag': etag}, b'')
+        return (200, {'ETag': etag}, {'Variants': {}})
+
+    set_menu_cache(MenuCache())
+    try:
+        with StubServer({menu_path: menu}) as stub, Transport() as transport:
+            register_country('stub', stub.url)
+            first = Menu.from_store('4336', country='stub', transport=transport)
+            second = Menu.from_store('4336', country='stub', transport=transport, refresh=True)
+    finally:
+        set_menu_cache(None)
+
+    assert_that(second, same_instance(first))
+    assert_that(transport.not_modified, equal_to(1))
+    assert_that([r[2].get('If-None-Match') for r in stub.requests], equal_to([None, etag]))
+
+
+def test_menu_validators_stay_with_menu_cache():
+    menu_path = '/power/store/4336/menu?lang=en&structured=true'
+    etag = '"v1"'
+    clock = [0.0]
+
+    def menu(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return (304, {'ETag': etag}, b'')
+        return (200, {'ETag': etag}, {'Variants': {}})
+
+    set_menu_cache(MenuCache(ttl=10, clock=lambda: clock[0]))
+    try:
+        with StubServer({menu_path: menu}) as stub, Transport() as transport:
+            register_country('stub', stub.url)
+            first = Menu.from_store('4336', country='stub', transport=transport)
+            assert_that(transport.validators, has_length(0))
+            clock[0] = 10
+            second = Menu.from_store('4336', country='stub', transport=transport)
+            plain = [request_json(stub.url + menu_path, transport=transport, conditional=True) for _ in range(2)]
+
+            set_menu_cache(MenuCache(maxsize=0))
+            uncached = [Menu.from_store('4336', country='stub', transport=transport) for _ in range(2)]
+    finally:
+        set_menu_cache(None)
+
+    assert_that(second, same_instance(first))
+    assert_that(plain, only_contains(equal_to({'Variants': {}})))
+    assert_that(uncached[1], is_not(same_instance(uncached[0])))
+    assert_that([r[2].get('If-None-Match') for r in stub.requests], equal_to([None, etag, None, etag, None, None]))
+
+
+def test_conditional_get_uses_last_modified():
+    last_modified = 'Sat, 17 Oct 2026 10:00:00 GMT'
+
+    def profile(handler):
+        if handler.headers.get('If-Modified-Since') == last_modified:
+            return (304, {}, b'')
+        return (200, {'Last-Modified': last_modified}, {'StoreID': '4336'})
+
+    with StubServer({'/profile': profile}) as stub, Transport() as transport:
+        first = request_json(stub.url + '/profile', transport=transport, conditional=True)
+        second = request_json(stub.url + '/profile', transport=transport, conditional=True)
+        third = request_json(stub.url + '/profile', transport=transport)
+
+    assert_that(second, same_instance(first))
+    assert_that(third, all_of(equal_to(first), is_not(same_instance(first))))
+    assert_that(transport.not_modified, equal_to(1))
+
+
+@mark.parametrize('name', list(CODECS))
+def test_transport_codec(name):
+    importorskip(name)
+    codec = get_codec(name)
+    body = {'Order': {'Products': [{'Code': '20BCOKE', 'Qty': 1}], 'Address': {'City': 'Washington'}}}
+
+    def echo(handler):
+        return (200, {}, handler.body)
+
+    with StubServer({'/echo': echo}) as stub, Transport(codec=codec) as transport:
+        response = transport.post_json(stub.url + '/echo', body)
+
+    assert_that(response, equal_to(body))
+    method, path, headers, sent = stub.requests[0]
+    assert_that(json.loads(sent), equal_to(body))
+    assert_that(headers, has_entries({'Content-Type': 'application/json'}))
+
+
+def test_unknown_codec():
+    with raises(ValueError, match='expected one of: json, orjson, ujson'):
+        get_codec('simplejson')
+
+    result = subprocess.run([sys.executable, '-c', 'import pizzapy'], capture_output=True, text=True,
+                            env=dict(os.environ, PIZZAPY_JSON='simplejson'))
+    assert_that(result.returncode, is_not(0))
+    assert_that(result.stderr, contains_string("ValueError: unknown JSON codec 'simplejson'"))
@@ -0,0 +1,24 @@
+from hamcrest import *
+from pytest import raises
+
+from pizzapy.address import Address
+from pizzapy.store import Store
+from pizzapy.urls import Urls, COUNTRY_USA, COUNTRY_CANADA, register_country
+
+
+def test_urls_are_shared_per_country():
+    assert_that(Urls(COUNTRY_USA), same_instance(Urls()))
+    assert_that(Address('1 Main St', 'Springfield').urls, same_instance(Store().urls))
+    assert_that(Urls(COUNTRY_CANADA), is_not(same_instance(Urls(COUNTRY_USA))))
+    assert_that(Urls(COUNTRY_CANADA).find_url(), starts_with('https://order.dominos.ca/power/store-locator'))
+    with raises(AttributeError):
+        Urls().country = COUNTRY_CANADA
+
+
+def test_register_country():
+    register_country('staging', 'http://127.0.0.1:8080', 'http://127.0.0.1:8081/')
+    urls = Urls('staging')
+    assert_that(urls.menu_url(), equal_to('http://127.0.0.1:8080/power/store/{store_id}/menu?lang={lang}&structured=true'))
+    assert_that(urls.track_by_phone(), equal_to('http://127.0.0.1:8081/orderstorage/GetTrackerData?Phone={phone}'))
+    with raises(ValueError):
+        Urls('nowhere')
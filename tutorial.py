@@ -8,7 +8,8 @@ def searchMenu(menu):
 	if len(item) > 1:
 		item = item[0].upper() + item[1:]
 		print(f"Results for: {item}\n")
-		menu.search(Name=item)
+		for result in menu.search(item):
+			print(f"{result.code}\t{result.name}\t${result.price}")
 		print()
 	else:
 		print("No Results")